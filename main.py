@@ -3,37 +3,199 @@
 Smart Study Assistant - CLI tool for study help powered by Google Gemini
 """
 
+import time
+
+# Module imports are the first phase reported by --profile
+_STARTED, _STARTED_CPU, _STARTED_PROCESS_CPU = time.perf_counter(), time.thread_time(), time.process_time()
+
 import os
 import sys
+from contextlib import contextmanager
+from itertools import islice
 import click
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
+from rich.table import Table
 
 # Add the src directory to the path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "src")))
 
-from src.assistant import SmartStudyAssistant
+from src.assistant import SmartStudyAssistant, SUMMARY_SINGLE_CALL_CHARS
+from src.cache_warmer import CacheWarmer, KINDS, load_syllabus, syllabus_entries
 from src.config import load_config
+from src.export import (EXPORT_FORMATS, DEFAULT_DECK, export_format, export_items,
+                        iter_bank_items, iter_syllabus_items)
+from src.deadline import Deadline, DeadlineExceeded, RequestCancelled, deadline_scope
+from src.file_watcher import watch_file
+from src.ingest import ExtractionError, extract_sections, DOCUMENT_EXTENSIONS
+from src.output import ResultWriter, OUTPUT_MODES
+from src.profiler import Profiler, phase, profile_scope
+from src.replay import DEFAULT_REPLAY_WORKERS, replay
+from src.session_log import SessionLog
+from src.tips_catalog import COMMON_CHALLENGES, LEARNING_STYLES
+from src.traffic_recorder import load_traffic
+
+_IMPORTED, _IMPORTED_CPU = time.perf_counter(), time.thread_time()
+
+class ProfiledConsole(Console):
+    """Console whose output is timed as the "render" phase under --profile."""
+
+    def print(self, *args, **kwargs):
+        with phase("render"):
+            super().print(*args, **kwargs)
+
+console = ProfiledConsole()
+
+@contextmanager
+def request_scope(ctx):
+    """Apply the command deadline and turn Ctrl-C into a clean cancellation."""
+    deadline = Deadline(ctx.obj["timeout"])
+    with deadline_scope(deadline):
+        try:
+            yield deadline
+        except KeyboardInterrupt:
+            # Stops queued work; in-flight calls finish on daemon workers
+            # that nothing waits for, so the command exits right away
+            deadline.cancel()
+            console.print("[bold red]Cancelled.[/]")
+            ctx.exit(130)
+        except (DeadlineExceeded, RequestCancelled) as e:
+            console.print(f"[bold red]Stopped: {e}.[/]")
+            ctx.exit(1)
+
+def prefetch_followups(ctx, assistant, response, exclude, limit=None):
+    """Prefetch likely follow-up topics without holding up the command's output."""
+    queued = assistant.prefetch_followups(response, exclude, limit)
+    if queued and not ctx.meta.get("prefetch_pending"):
+        ctx.meta["prefetch_pending"] = True
+        ctx.call_on_close(lambda: finish_prefetch(assistant))
+    return queued
+
+def finish_prefetch(assistant):
+    """Give queued prefetches a bounded time to land in the cache before exiting."""
+    # The response cache is on disk, so answers warmed now serve the next
+    # command or interactive session; whatever is left when the wait is over
+    # (or on Ctrl-C) is dropped, and a call in flight dies with the process
+    timeout = assistant.client.config.get("prefetch_exit_wait", 10.0)
+    try:
+        with console.status("[dim]Prefetching follow-up topics...[/]"):
+            assistant.prefetcher.wait(timeout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        assistant.prefetcher.cancel()
 
-console = Console()
+def result_writer(ctx):
+    """Create the writer for the results of the current command; error results fail the command."""
+    writer = ResultWriter(ctx.obj["output"], ctx.info_name, console)
+    ctx.obj.setdefault("writers", []).append(writer)
+    return writer
+
+def print_profile(profiler):
+    """Print the wall and CPU time of each phase of the command."""
+    rows = profiler.breakdown()
+    total_wall = rows[-1]["wall"] or 1e-9
+    table = Table(title="⏱️ Profile", caption="Phases nest and overlap, so they don't add up to the "
+                  "total; the total's CPU includes worker threads")
+    table.add_column("Phase")
+    table.add_column("Calls", justify="right")
+    table.add_column("Wall (ms)", justify="right")
+    table.add_column("CPU (ms)", justify="right")
+    table.add_column("% of wall", justify="right")
+    for row in rows:
+        # The command is the only request in the process, so its total is the process's CPU
+        cpu = row.get("process_cpu", row["cpu"])
+        table.add_row(row["name"], str(row["count"]), f"{row['wall'] * 1000:.1f}",
+                      f"{cpu * 1000:.1f}", f"{row['wall'] / total_wall:.0%}")
+    console.print(table)
 
 @click.group()
 @click.version_option(version="0.1.0")
-def cli():
+@click.option("--timeout", type=float, default=None,
+              help="Give up on a command after this many seconds")
+@click.option("--output", "-o", type=click.Choice(OUTPUT_MODES), default="rich",
+              help="rich panels, or raw Markdown / JSON Lines on stdout for scripts")
+@click.option("--profile", is_flag=True,
+              help="Print the wall and CPU time of each phase when the command ends")
+@click.option("--profile-trace", type=click.Path(dir_okay=False),
+              help="Write the phases as a Chrome trace (chrome://tracing, Perfetto) to this file")
+@click.option("--profile-cprofile", type=click.Path(dir_okay=False),
+              help="Write a cProfile profile of the command to this file")
+@click.pass_context
+def cli(ctx, timeout, output, profile, profile_trace, profile_cprofile):
     """Smart Study Assistant - Your AI-powered study companion."""
-    pass
+    ctx.obj = {"timeout": timeout, "output": output}
+    if output != "rich":
+        # stdout carries only results; progress and notes go to stderr
+        console.stderr = True
+        ctx.call_on_close(lambda: setattr(console, "stderr", False))
+    if not (profile or profile_trace or profile_cprofile):
+        return
+    
+    profiler = Profiler(cprofile=bool(profile_cprofile), started=_STARTED, started_cpu=_STARTED_CPU,
+                        started_process_cpu=_STARTED_PROCESS_CPU)
+    profiler.record("imports", _STARTED, _IMPORTED - _STARTED, _IMPORTED_CPU - _STARTED_CPU)
+    
+    def report():
+        profiler.stop()
+        if profile:
+            print_profile(profiler)
+        if profile_trace:
+            profiler.write_trace(profile_trace)
+            console.print(f"[dim]Trace written to {profile_trace}[/]")
+        if profile_cprofile:
+            profiler.write_cprofile(profile_cprofile)
+            console.print(f"[dim]cProfile profile written to {profile_cprofile}[/]")
+    
+    # Runs after the command, even when it exits early
+    ctx.call_on_close(report)
+    ctx.with_resource(profile_scope(profiler))
+    profiler.start()
+
+@cli.result_callback()
+def exit_status(result, **kwargs):
+    """Exit with status 1 when the command's result was an error message."""
+    ctx = click.get_current_context()
+    if any(writer.failed for writer in ctx.obj.get("writers", [])):
+        ctx.exit(1)
 
 @cli.command()
-@click.argument("query")
-def explain(query):
-    """Get a clear explanation of a concept or topic."""
-    with console.status("[bold green]Getting explanation..."):
+@click.argument("queries", nargs=-1, required=True)
+@click.option("--prefetch", is_flag=True, help="Prefetch explanations of related concepts")
+@click.pass_context
+def explain(ctx, queries, prefetch):
+    """Get a clear explanation of one or more concepts or topics."""
+    writer = result_writer(ctx)
+    with request_scope(ctx):
+        with console.status("[bold green]Getting explanation..."):
+            config = load_config()
+            config["prefetch"] = prefetch or config["prefetch"]
+            assistant = SmartStudyAssistant(config)
+            writer.track(assistant.client)
+            results = assistant.explain_concepts(list(queries))
+        
+        for query, result in zip(queries, results):
+            writer.write(result, title=f"📚 Explanation: {query}", query=query)
+        prefetch_followups(ctx, assistant, "\n\n".join(results), list(queries))
+
+@cli.command(name="map")
+@click.argument("concepts", nargs=-1, required=True)
+@click.pass_context
+def concept_map(ctx, concepts):
+    """Map how a list of concepts relate to each other."""
+    if len(concepts) < 2:
+        click.echo("Error: Please provide at least two concepts", err=True)
+        return
+    
+    writer = result_writer(ctx)
+    with request_scope(ctx), console.status(f"[bold green]Mapping {len(concepts)} concepts..."):
         config = load_config()
         assistant = SmartStudyAssistant(config)
-        result = assistant.explain_concept(query)
+        writer.track(assistant.client)
+        result = assistant.map_concepts(list(concepts))
     
-    console.print(Panel(Markdown(result), title=f"📚 Explanation: {query}", expand=False))
+    writer.write(result, title="🕸️ Concept Map", concepts=list(concepts))
 
 @cli.command()
 @click.argument("topic")
@@ -41,64 +203,370 @@ def explain(query):
 @click.option("--difficulty", "-d", default="medium", 
               type=click.Choice(["easy", "medium", "hard"]), 
               help="Difficulty level of the quiz")
-def quiz(topic, questions, difficulty):
+@click.pass_context
+def quiz(ctx, topic, questions, difficulty):
     """Generate a quiz on a specific topic."""
-    with console.status(f"[bold green]Creating a {difficulty} quiz with {questions} questions..."):
+    writer = result_writer(ctx)
+    with request_scope(ctx), console.status(f"[bold green]Creating a {difficulty} quiz with {questions} questions..."):
         config = load_config()
         assistant = SmartStudyAssistant(config)
+        writer.track(assistant.client)
         result = assistant.generate_quiz(topic, questions, difficulty)
     
-    console.print(Panel(Markdown(result), title=f"🎯 Quiz: {topic}", expand=False))
+    writer.write(result, title=f"🎯 Quiz: {topic}", topic=topic, difficulty=difficulty)
 
 @cli.command()
 @click.argument("subject")
 @click.option("--days", "-d", default=7, help="Number of days for the study plan")
 @click.option("--hours-per-day", "-h", default=1, help="Hours to study per day")
 @click.option("--goal", "-g", default="mastery", help="Your study goal")
-def plan(subject, days, hours_per_day, goal):
+@click.option("--prefetch", is_flag=True, help="Prefetch explanations of the plan's subtopics")
+@click.pass_context
+def plan(ctx, subject, days, hours_per_day, goal, prefetch):
     """Create a personalized study plan."""
-    with console.status(f"[bold green]Creating a {days}-day study plan..."):
+    writer = result_writer(ctx)
+    with request_scope(ctx):
+        with console.status(f"[bold green]Creating a {days}-day study plan..."):
+            config = load_config()
+            config["prefetch"] = prefetch or config["prefetch"]
+            assistant = SmartStudyAssistant(config)
+            writer.track(assistant.client)
+            # Long plans arrive in blocks; show each one as soon as it is ready
+            title = f"📆 Study Plan: {subject}"
+            # One prefetch budget for the whole plan, however many blocks it has
+            budget = config["prefetch_budget"]
+            for section in assistant.stream_study_plan(subject, days, hours_per_day, goal):
+                writer.write(section, title=title, final=False, subject=subject)
+                # Start on each block's subtopics while later blocks are written
+                budget -= prefetch_followups(ctx, assistant, section, [subject], budget)
+                title = None
+            writer.finish(subject=subject)
+
+@cli.command()
+@click.argument("subject")
+@click.option("--topic", "-t", "topics", multiple=True, required=True,
+              help="A topic to prioritize (repeat for each topic)")
+@click.option("--hours", "-h", default=10, help="Total hours available")
+@click.option("--goal", "-g", default="mastery", help="Your study goal")
+@click.pass_context
+def prioritize(ctx, subject, topics, hours, goal):
+    """Prioritize topics and split the available study time between them."""
+    writer = result_writer(ctx)
+    with request_scope(ctx), console.status("[bold green]Prioritizing topics..."):
         config = load_config()
         assistant = SmartStudyAssistant(config)
-        result = assistant.create_study_plan(subject, days, hours_per_day, goal)
+        writer.track(assistant.client)
+        result = assistant.prioritize_topics(subject, list(topics), hours, goal)
     
-    console.print(Panel(Markdown(result), title=f"📆 Study Plan: {subject}", expand=False))
+    writer.write(result, title=f"🗂️ Priorities: {subject}", subject=subject)
 
 @cli.command()
-@click.option("--file", "-f", type=click.File("r"), help="File to summarize")
+@click.option("--file", "-f", "files", type=click.Path(exists=True, dir_okay=False), multiple=True,
+              help="File to summarize: text, Markdown, PDF, DOCX or HTML (repeat for a course pack)")
 @click.option("--text", "-t", help="Text to summarize")
-def summarize(file, text):
+@click.option("--watch", "-w", is_flag=True, help="Summarize the file again whenever it changes")
+@click.pass_context
+def summarize(ctx, files, text, watch):
     """Summarize study content."""
-    if not file and not text:
-        click.echo("Error: Please provide either a file or text to summarize")
+    if not files and not text:
+        click.echo("Error: Please provide either a file or text to summarize", err=True)
+        return
+    if watch and len(files) != 1:
+        click.echo("Error: --watch needs exactly one file to watch", err=True)
         return
     
-    content = text if text else file.read()
+    config = load_config()
+    assistant = SmartStudyAssistant(config)
     
-    with console.status("[bold green]Summarizing content..."):
+    def run():
+        writer = result_writer(ctx)
+        writer.track(assistant.client)
+        with request_scope(ctx), console.status("[bold green]Summarizing content..."):
+            if text:
+                content = text
+            elif len(files) == 1 and os.path.splitext(files[0])[1].lower() not in DOCUMENT_EXTENSIONS:
+                with open(files[0], "r", encoding="utf-8") as f:
+                    content = f.read()
+            else:
+                # Documents are extracted in parallel and streamed into the chunker
+                content = extract_sections(files)
+            
+            if isinstance(content, str) and len(content) <= SUMMARY_SINGLE_CALL_CHARS:
+                result, stats = assistant.summarize_content(content), None
+            else:
+                # Long documents only re-summarize the chunks that changed
+                result, stats = assistant.summarize_document(content)
+        writer.write(result, title="📝 Summary", **(stats or {}))
+        if stats:
+            console.print(f"[dim]{stats['summarized']} of {stats['chunks']} sections "
+                          f"summarized, {stats['reused']} reused[/]")
+    
+    try:
+        run()
+    except ExtractionError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+    if not watch:
+        return
+    console.print(f"[dim]Watching {files[0]} for changes (Ctrl-C to stop)...[/]")
+    try:
+        for _ in watch_file(files[0]):
+            try:
+                run()
+            except ExtractionError as e:
+                # Often a file caught mid-save; the next change retries
+                click.echo(f"Error: {e}", err=True)
+    except KeyboardInterrupt:
+        console.print("[bold green]Stopped watching.[/]")
+
+@cli.command()
+@click.option("--file", "-f", type=click.Path(exists=True, dir_okay=False),
+              help="File to simplify: text, Markdown, PDF, DOCX or HTML")
+@click.option("--text", "-t", help="Text to simplify")
+@click.option("--audience", "-a", default="student", help="Who the simplified text is for")
+@click.pass_context
+def simplify(ctx, file, text, audience):
+    """Rewrite complex study material in simpler language."""
+    if not file and not text:
+        click.echo("Error: Please provide either a file or text to simplify", err=True)
+        return
+
+    try:
+        if text:
+            content = text
+        elif os.path.splitext(file)[1].lower() not in DOCUMENT_EXTENSIONS:
+            with open(file, "r", encoding="utf-8") as f:
+                content = f.read()
+        else:
+            content = "\n\n".join(extract_sections([file]))
+    except ExtractionError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+
+    writer = result_writer(ctx)
+    with request_scope(ctx), console.status("[bold green]Simplifying..."):
         config = load_config()
         assistant = SmartStudyAssistant(config)
-        result = assistant.summarize_content(content)
-    
-    console.print(Panel(Markdown(result), title="📝 Summary", expand=False))
+        writer.track(assistant.client)
+        # Long texts arrive in parts, in order; show each one as soon as it is ready
+        title = "🧩 Simplified"
+        for part in assistant.stream_simplified_text(content, audience):
+            writer.write(part, title=title, final=False, audience=audience)
+            title = None
+        writer.finish(audience=audience)
 
 @cli.command()
 @click.argument("topic", required=False)
-def tips(topic):
+@click.option("--style", "-s", type=click.Choice(LEARNING_STYLES),
+              help="Tips for a learning style")
+@click.option("--challenge", "-c",
+              help=f"Strategies for a study challenge, e.g. {', '.join(COMMON_CHALLENGES[:3])}")
+@click.pass_context
+def tips(ctx, topic, style, challenge):
     """Get evidence-based study technique recommendations."""
-    with console.status("[bold green]Finding study tips..."):
+    if sum(bool(value) for value in (topic, style, challenge)) > 1:
+        click.echo("Error: Please provide only one of a topic, --style or --challenge", err=True)
+        return
+    
+    writer = result_writer(ctx)
+    with request_scope(ctx), console.status("[bold green]Finding study tips..."):
+        config = load_config()
+        assistant = SmartStudyAssistant(config)
+        writer.track(assistant.client)
+        if style:
+            result = assistant.get_tips_for_learning_style(style)
+        elif challenge:
+            result = assistant.overcome_challenge(challenge)
+        else:
+            result = assistant.get_study_tips(topic)
+    
+    writer.write(result, title="💡 Study Tips", topic=topic, style=style, challenge=challenge)
+
+@cli.command(name="refresh-tips")
+@click.pass_context
+def refresh_tips(ctx):
+    """Regenerate the offline catalog of general study tips."""
+    writer = result_writer(ctx)
+    with request_scope(ctx), console.status("[bold green]Generating study tips catalog..."):
+        config = load_config()
+        assistant = SmartStudyAssistant(config)
+        writer.track(assistant.client)
+        try:
+            result = assistant.refresh_tips_catalog()
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            return
+    
+    writer.write_data(result, lambda: console.print(
+        f"[bold green]Catalog {result['version']}[/] ({result['model']}): "
+        f"{result['entries']} entries written, {result['failed']} failed"
+    ))
+
+@cli.command()
+@click.argument("syllabus", type=click.Path(exists=True, dir_okay=False))
+@click.option("--check", is_flag=True, help="Only report coverage, without generating anything")
+@click.pass_context
+def warm(ctx, syllabus, check):
+    """Precompute answers for every item of a syllabus (JSON or YAML)."""
+    try:
+        entries = syllabus_entries(load_syllabus(syllabus), os.path.dirname(syllabus))
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+    
+    writer = result_writer(ctx)
+    with request_scope(ctx):
         config = load_config()
         assistant = SmartStudyAssistant(config)
-        result = assistant.get_study_tips(topic)
+        writer.track(assistant.client)
+        done = 0
+        with console.status(f"[bold green]Warming {len(entries)} entries...") as status:
+            def progress(entry, result):
+                nonlocal done
+                done += 1
+                status.update(f"[bold green]Warming entries... {done}/{len(entries)}")
+            report = CacheWarmer(assistant).warm(entries, check_only=check, on_progress=progress)
     
-    console.print(Panel(Markdown(result), title="💡 Study Tips", expand=False))
+    def render():
+        table = Table(title="Cache coverage")
+        for column in ["Kind", "Total", "Fresh", "Warmed", "Missing", "Failed"]:
+            table.add_column(column, justify="left" if column == "Kind" else "right")
+        for kind in KINDS:
+            counts = report["kinds"].get(kind)
+            if counts:
+                table.add_row(kind, *(str(counts[key]) for key in
+                                      ["total", "fresh", "warmed", "missing", "failed"]))
+        console.print(table)
+        for subject, counts in report["subjects"].items():
+            console.print(f"{subject}: {counts['covered']}/{counts['total']} covered")
+        console.print(f"[bold]Coverage: {report['coverage']:.0%}[/] "
+                      f"({report['covered']} of {report['total']} entries)")
+        for label in report["failed"]:
+            console.print(f"[red]Failed: {label}[/]")
+    
+    writer.write_data(report, render)
 
 @cli.command()
-def interactive():
+@click.argument("syllabus", type=click.Path(exists=True, dir_okay=False), required=False)
+@click.option("--out", "-O", "out", type=click.Path(dir_okay=False), required=True,
+              help="File to write: .csv, .jsonl, or .txt for Anki")
+@click.option("--format", "-F", "export_as", type=click.Choice(EXPORT_FORMATS),
+              help="Export format (by default taken from the file extension)")
+@click.option("--bank", is_flag=True, help="Export the question bank instead of a syllabus")
+@click.option("--topic", "-t", help="Only export bank questions on this topic")
+@click.option("--difficulty", "-d", type=click.Choice(["easy", "medium", "hard"]),
+              help="Only export bank questions of this difficulty")
+@click.option("--deck", default=DEFAULT_DECK, help="Deck name for Anki files")
+@click.pass_context
+def export(ctx, syllabus, out, export_as, bank, topic, difficulty, deck):
+    """Export flashcards and quiz questions to CSV, JSON Lines or Anki."""
+    if bool(syllabus) == bank:
+        click.echo("Error: Please provide either a syllabus or --bank", err=True)
+        return
+    try:
+        export_as = export_format(out, export_as)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+    
+    writer = result_writer(ctx)
+    failed = []
+    with request_scope(ctx):
+        config = load_config()
+        assistant = SmartStudyAssistant(config)
+        writer.track(assistant.client)
+        if bank:
+            question_bank = assistant.quiz_generator.question_bank
+            if question_bank is None:
+                click.echo("Error: No question bank is configured", err=True)
+                return
+            items = iter_bank_items(question_bank, topic, difficulty)
+        else:
+            try:
+                entries = syllabus_entries(load_syllabus(syllabus), os.path.dirname(syllabus))
+            except ValueError as e:
+                click.echo(f"Error: {e}", err=True)
+                return
+            items = iter_syllabus_items(assistant, entries, failed)
+        
+        with console.status("[bold green]Exporting...") as status:
+            def progress(written):
+                status.update(f"[bold green]Exporting... {written} items written")
+            written = export_items(items, out, export_as, deck, on_item=progress)
+    
+    def render():
+        console.print(f"[bold green]Exported {written} items to {out}[/]")
+        for label in failed:
+            click.echo(f"Error: Could not generate {label}", err=True)
+    
+    # Missing topics leave the deck incomplete, so the command fails
+    writer.failed = writer.failed or bool(failed)
+    writer.write_data({"path": out, "items": written, "failed": failed}, render)
+
+@cli.command(name="replay")
+@click.argument("log", type=click.Path(exists=True, dir_okay=False))
+@click.option("--speed", "-x", type=click.FloatRange(1, 100), default=10.0,
+              help="Speed-up over the recorded timing (1-100)")
+@click.option("--workers", "-w", default=DEFAULT_REPLAY_WORKERS,
+              help="Requests handled concurrently; the rest wait in a queue")
+@click.option("--keys", "-k", default=1, help="Number of simulated API keys")
+@click.option("--rpm", type=float, help="Rate limit of each simulated key (requests per minute)")
+@click.option("--limit", "-n", type=int, help="Only replay the first N requests")
+@click.pass_context
+def replay_traffic(ctx, log, speed, workers, keys, rpm, limit):
+    """Replay a recorded traffic log against a simulated model backend."""
+    records = list(islice(load_traffic(log), limit))
+    if not records:
+        click.echo(f"Error: No requests recorded in {log}", err=True)
+        return
+    try:
+        base_config = load_config()
+    except ValueError:
+        # Replay never calls the API, so a key is not needed
+        base_config = None
+
+    writer = result_writer(ctx)
+    with console.status(f"[bold green]Replaying {len(records)} requests at {speed:g}x..."):
+        report = replay(records, speed, workers, keys, rpm, base_config)
+
+    def render():
+        latency = report["latency"]
+        table = Table(title=f"Replay of {report['requests']} requests at {speed:g}x")
+        table.add_column("Metric")
+        table.add_column("Value", justify="right")
+        table.add_row("Throughput", f"{report['throughput']:.1f} req/s")
+        for name in ["p50", "p95", "p99", "max"]:
+            table.add_row(f"Latency {name}", f"{latency[name]:.3f} s")
+        table.add_row("Cache hit rate", f"{report['cache_hit_rate']:.0%} "
+                      f"(recorded {report['recorded_cache_hit_rate']:.0%})")
+        table.add_row("Queue depth", f"max {report['queue_depth']['max']}, "
+                      f"mean {report['queue_depth']['mean']:.1f}")
+        table.add_row("In flight", f"max {report['in_flight']['max']}, "
+                      f"mean {report['in_flight']['mean']:.1f}")
+        table.add_row("Backend calls", f"{report['backend_calls']} "
+                      f"({report['prefetches']} prefetches)")
+        table.add_row("Errors", str(report["errors"]))
+        console.print(table)
+        console.print("[dim]Latencies are in recorded time (scaled back by the speed-up).[/]")
+
+    writer.write_data(report, render)
+
+@cli.command()
+@click.option("--session", "-s", help="Name of a session to save and resume later")
+@click.option("--prefetch", is_flag=True, help="Prefetch answers to likely follow-up questions")
+@click.pass_context
+def interactive(ctx, session, prefetch):
     """Start an interactive session with the study assistant."""
     config = load_config()
+    config["prefetch"] = prefetch or config["prefetch"]
     assistant = SmartStudyAssistant(config)
     
+    session_log = None
+    if session:
+        session_log = SessionLog.for_session(config["sessions_dir"], session)
+        if assistant.resume_session(session_log):
+            console.print(f"[bold green]Resumed session '{session}'.[/]")
+    
     console.print(Panel(
         "Welcome to Smart Study Assistant! Ask me anything about your studies.\n"
         "Type 'exit' or 'quit' to end the session.",
@@ -107,16 +575,42 @@ def interactive():
     ))
     
     while True:
-        query = click.prompt("\n[bold blue]You[/]", prompt_suffix="")
+        with phase("input"):
+            # Only answers go to stdout outside of rich mode
+            query = click.prompt("\n[bold blue]You[/]", prompt_suffix="",
+                                 err=ctx.obj["output"] != "rich")
         if query.lower() in ["exit", "quit", "bye"]:
+            if assistant.prefetcher is not None:
+                stats = assistant.prefetcher.stats()
+                console.print(f"[dim]Prefetch hit rate: {stats['hit_rate']:.0%} "
+                              f"({stats['used']} of {stats['prefetched']} prefetched answers used)[/]")
             console.print("[bold green]Goodbye! Happy studying![/]")
             break
         
-        with console.status("[bold green]Thinking..."):
-            response = assistant.chat(query)
+        # Each question gets its own deadline; Ctrl-C cancels it but keeps the session
+        # A failed answer doesn't fail the session, so the writer isn't registered
+        writer = ResultWriter(ctx.obj["output"], ctx.info_name, console)
+        writer.track(assistant.client)
+        deadline = Deadline(ctx.obj["timeout"])
+        try:
+            with deadline_scope(deadline), console.status("[bold green]Thinking..."):
+                if session_log is not None:
+                    response = assistant.chat_in_session(session_log, query)
+                else:
+                    response = assistant.chat(query)
+        except KeyboardInterrupt:
+            deadline.cancel()
+            console.print("[bold red]Cancelled.[/]")
+            continue
+        except (DeadlineExceeded, RequestCancelled) as e:
+            console.print(f"[bold red]Stopped: {e}.[/]")
+            continue
         
-        console.print(f"\n[bold green]Assistant[/]")
-        console.print(Markdown(response))
+        if ctx.obj["output"] == "rich":
+            console.print(f"\n[bold green]Assistant[/]")
+            console.print(Markdown(response))
+        else:
+            writer.write(response, question=query)
 
 if __name__ == "__main__":
     # If no arguments provided, start interactive mode
@@ -2,8 +2,112 @@
 Core Smart Study Assistant implementation
 """
 
-from typing import Dict, Any, List, Optional
-from src.gemini_client import GeminiClient
+import itertools
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+from src.batcher import MicroBatcher, DEFAULT_ITEM_TOKENS, DEFAULT_MAX_BATCH
+from src.chunk_summaries import ChunkSummaryStore, iter_chunks
+from src.concept_graph import ConceptGraph
+from src.concurrency import ordered_map, DEFAULT_MAX_WORKERS
+from src.gemini_client import GeminiClient, STALE_NOTICE
+from src.features.concept_explainer import ConceptExplainer
+from src.features.quiz_generator import QuizGenerator
+from src.features.study_planner import StudyPlanner, SINGLE_CALL_MAX_DAYS
+from src.features.study_tips import StudyTips
+from src.prefetcher import Prefetcher, DEFAULT_BUDGET, extract_followups
+from src.profiler import phase
+from src.question_bank import QuestionBank
+from src.response_cache import cache_key
+from src.session_log import SessionLog, to_history
+from src.tips_catalog import TipsCatalog, DEFAULT_CATALOG_PATH, build_tips_catalog
+
+GENERAL_STUDY_TIPS_PROMPT = """
+            Provide general evidence-based study techniques that can improve learning effectiveness.
+            
+            Include:
+            1. 3-5 practical, specific techniques
+            2. The science behind why each technique works
+            3. How to implement each technique effectively
+            4. Common mistakes to avoid
+            
+            Format your response using Markdown with clear headings and bullet points.
+            """
+
+EXPLAIN_CONCEPT_PROMPT = """
+        Explain the concept of "{concept}" in a clear, educational way.
+        
+        Follow these guidelines:
+        1. Start with a simple definition
+        2. Explain the core principles
+        3. Use analogies or examples to make it more understandable
+        4. Mention any important related concepts
+        5. Keep your explanation concise but thorough
+        
+        Format your response using Markdown.
+        """
+
+QUIZ_PROMPT = """
+        Create a {difficulty} difficulty quiz about "{topic}" with {num_questions} questions.
+        
+        For each question:
+        1. Write a clear, specific question
+        2. Provide multiple choice options (A, B, C, D)
+        3. Indicate the correct answer
+        4. Include a brief explanation of why the answer is correct
+        
+        Format the quiz using Markdown with each question numbered, followed by choices,
+        then the answer and explanation in a collapsed details section.
+        
+        Example format:
+        ```
+        ## {topic} Quiz
+        
+        ### Question 1
+        What is...?
+        A) Option 1
+        B) Option 2
+        C) Option 3
+        D) Option 4
+        
+        <details>
+        <summary>Answer</summary>
+        
+        **Correct Answer: B**
+        
+        Explanation: This is correct because...
+        </details>
+        ```
+        """
+
+# Longer content is summarized chunk by chunk, reusing summaries of unchanged chunks
+SUMMARY_SINGLE_CALL_CHARS = 8000
+
+CHUNK_SUMMARY_PROMPT = """
+        Summarize the following section of a longer study document.
+        Keep every key concept, definition, relationship and example, and leave out
+        repetition and filler. Use Markdown bullet points.
+        
+        Section:
+        ```
+        {chunk}
+        ```
+        """
+
+COMBINE_SUMMARIES_PROMPT = """
+        Below are summaries of consecutive sections of one study document. Combine them
+        into a single concise summary of the whole document, preserving the key points.
+        Focus on the main concepts and their relationships.
+        
+        Use the following format:
+        1. Main topic and core idea (1-2 sentences)
+        2. Key points (bullet points)
+        3. Important relationships or connections
+        4. Questions to test understanding
+        
+        Format your response using Markdown.
+        
+        Section summaries:
+        {sections}
+        """
 
 class SmartStudyAssistant:
     """
@@ -18,14 +122,49 @@ class SmartStudyAssistant:
         Args:
             config: Configuration dictionary
         """
-        self.client = GeminiClient(config)
+        with phase("client_init"):
+            self.client = GeminiClient(config)
+        
+        # Small prompts (answer checks, single explanations) share calls under bursty load
+        self.batcher = None
+        if config.get("batch_window"):
+            self.batcher = MicroBatcher(self.client, config["batch_window"],
+                                        config.get("max_batch_size", DEFAULT_MAX_BATCH),
+                                        item_tokens=config.get("batch_item_tokens",
+                                                               DEFAULT_ITEM_TOKENS))
+        
+        self.study_planner = StudyPlanner(self.client, config.get("topic_dependency_cache_path"))
+        
+        question_bank = None
+        if config.get("question_bank_path"):
+            question_bank = QuestionBank(config["question_bank_path"])
+        self.quiz_generator = QuizGenerator(self.client, question_bank, self.batcher)
+        
+        concept_graph = None
+        if config.get("concept_graph_path"):
+            concept_graph = ConceptGraph(config["concept_graph_path"])
+        self.concept_explainer = ConceptExplainer(self.client, concept_graph, self.batcher)
+        
+        self.tips_catalog = None
+        if config.get("tips_catalog_path"):
+            self.tips_catalog = TipsCatalog(config["tips_catalog_path"], DEFAULT_CATALOG_PATH)
+        self.study_tips = StudyTips(self.client, self.tips_catalog, self.batcher)
+        
+        self.chunk_store = ChunkSummaryStore(config.get("chunk_summary_path"))
+        
+        # Opt-in: answer likely follow-up questions before they are asked
+        self.prefetcher = None
+        if config.get("prefetch"):
+            self.prefetcher = Prefetcher(self.client, config.get("prefetch_budget", DEFAULT_BUDGET))
     
-    def chat(self, message: str) -> str:
+    def chat(self, message: str, history: Optional[List[Dict[str, Any]]] = None) -> str:
         """
         Have a conversation with the study assistant
         
         Args:
             message: User's message
+            history: Optional chat history to use instead of the client's own,
+                e.g. one session's history when serving many students
             
         Returns:
             Assistant's response
@@ -37,7 +176,138 @@ class SmartStudyAssistant:
         """
         
         prompt = f"{system_context}\n\nUser: {message}"
-        return self.client.chat(prompt)
+        if self.prefetcher is None or history is not None:
+            return self.client.chat(prompt, history=history)
+        
+        response = self._answer_prefetched(prompt, message)
+        if response is None:
+            response = self.client.chat(prompt)
+        if not response.startswith("Error"):
+            self.prefetch_followups(response, exclude=[message])
+        return response
+    
+    def prefetch_followups(self, response: str, exclude: Optional[List[str]] = None,
+                           limit: Optional[int] = None) -> int:
+        """
+        Prefetch explanations of the topics a response is likely to lead to
+        
+        Does nothing unless prefetching is enabled.
+        
+        Args:
+            response: A finished plan, explanation or chat answer
+            exclude: Topics not worth prefetching, such as the one just covered
+            limit: Maximum number of topics to queue, e.g. what is left of the
+                budget of a command; defaults to the prefetch budget
+            
+        Returns:
+            Number of follow-up topics queued
+        """
+        if self.prefetcher is None:
+            return 0
+        limit = self.prefetcher.budget if limit is None else min(limit, self.prefetcher.budget)
+        if limit <= 0:
+            return 0
+        topics = extract_followups(response, limit, exclude or [])
+        return self.prefetcher.schedule(topics, lambda topic: EXPLAIN_CONCEPT_PROMPT.format(concept=topic))
+    
+    def _answer_prefetched(self, prompt: str, message: str) -> Optional[str]:
+        """
+        Answer a chat message from a prefetched explanation, if one matches
+        
+        Args:
+            prompt: The chat prompt, recorded in the history with the answer
+            message: User's message
+            
+        Returns:
+            The cached explanation, or None if the message was not prefetched
+        """
+        prefetched = self.prefetcher.match(message)
+        if prefetched is None:
+            return None
+        response = self.client.generate_text(prefetched)
+        if response.startswith("Error"):
+            return None
+        # Keep the conversation context as if the answer had come from the chat
+        self.client.history.append({"role": "user", "parts": [prompt]})
+        self.client.history.append({"role": "model", "parts": [response]})
+        return response
+    
+    def resume_session(self, session_log: SessionLog) -> bool:
+        """
+        Restore the chat context of a saved session
+        
+        Only the latest summary snapshot and the turns after it are loaded.
+        
+        Args:
+            session_log: Log of the session to resume
+            
+        Returns:
+            True if there was earlier context to restore
+        """
+        summary, turns = session_log.load()
+        self.client.history = to_history(summary, turns)
+        return bool(summary or turns)
+    
+    def chat_in_session(self, session_log: SessionLog, message: str) -> str:
+        """
+        Chat and record the exchange in a saved session
+        
+        Every few turns the conversation is condensed into a summary snapshot,
+        which also replaces the in-memory chat history to keep prompts small.
+        
+        Args:
+            session_log: Log of the current session
+            message: User's message
+            
+        Returns:
+            Assistant's response
+        """
+        response = self.chat(message)
+        if response.startswith("Error"):
+            return response
+        
+        session_log.append_turn(message, response)
+        if session_log.snapshot_due():
+            summary, turns = session_log.load()
+            summary = self.summarize_conversation(summary, turns)
+            if not summary.startswith("Error"):
+                session_log.write_snapshot(summary)
+                self.client.history = to_history(summary, [])
+        return response
+    
+    def summarize_conversation(self, summary: Optional[str], turns: List[Dict[str, str]]) -> str:
+        """
+        Condense a conversation into a summary for later context
+        
+        Args:
+            summary: Summary of the conversation before these turns, if any
+            turns: Turns to fold into the summary, each with "user" and "model" keys
+            
+        Returns:
+            The updated summary
+        """
+        turns_formatted = "\n\n".join(
+            f"Student: {turn['user']}\nAssistant: {turn['model']}" for turn in turns
+        )
+        
+        prompt = f"""
+        Update the summary of a study conversation between a student and an assistant.
+        
+        Summary so far:
+        {summary or "(none)"}
+        
+        New exchanges:
+        {turns_formatted}
+        
+        Write a concise summary (at most 300 words) that keeps:
+        1. The topics the student is studying and their goals
+        2. Key explanations, facts and answers already given
+        3. Open questions, difficulties and agreed next steps
+        
+        Respond with the summary only.
+        """
+        
+        return self.client.generate_text(prompt)
     
     def explain_concept(self, concept: str) -> str:
         """
@@ -49,20 +319,55 @@ class SmartStudyAssistant:
         Returns:
             An explanation of the concept
         """
-        prompt = f"""
-        Explain the concept of "{concept}" in a clear, educational way.
+        prompt = EXPLAIN_CONCEPT_PROMPT.format(concept=concept)
+        return self._complete("explain_concept", prompt)
+    
+    def explain_concepts(self, concepts: List[str]) -> List[str]:
+        """
+        Explain several concepts at once, such as the terms of a glossary
         
-        Follow these guidelines:
-        1. Start with a simple definition
-        2. Explain the core principles
-        3. Use analogies or examples to make it more understandable
-        4. Mention any important related concepts
-        5. Keep your explanation concise but thorough
+        Args:
+            concepts: The concepts to explain
+            
+        Returns:
+            The explanations, in the same order as the concepts
+        """
+        if self.batcher is not None:
+            max_workers = self.batcher.max_batch
+        else:
+            max_workers = self.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+        return list(ordered_map(self.explain_concept, concepts, max_workers))
+    
+    def map_concepts(self, concepts: List[str]) -> str:
+        """
+        Map the relationships among a list of concepts
         
-        Format your response using Markdown.
+        Relationships already in the concept graph are reused; the rest are
+        classified in a few batched calls.
+        
+        Args:
+            concepts: The concepts to relate to each other
+            
+        Returns:
+            A Markdown concept map
         """
+        if len(concepts) == 2:
+            return self.concept_explainer.explain_relationships(*concepts)
         
-        return self.client.generate_text(prompt)
+        edges = self.concept_explainer.map_relationships(concepts)
+        related = [edge for edge in edges if edge["relation"] not in (None, "unrelated")]
+        if not related:
+            return "No direct relationships were found among these concepts."
+        
+        rows = "\n".join(
+            f"| {edge['source']} | {edge['relation']} | {edge['target']} | {edge['description']} |"
+            for edge in related
+        )
+        return (
+            "| Concept | Relation | Concept | How they relate |\n"
+            "|---|---|---|---|\n"
+            f"{rows}"
+        )
     
     def generate_quiz(self, topic: str, num_questions: int = 5, difficulty: str = "medium") -> str:
         """
@@ -76,38 +381,12 @@ class SmartStudyAssistant:
         Returns:
             A formatted quiz with questions and answers
         """
-        prompt = f"""
-        Create a {difficulty} difficulty quiz about "{topic}" with {num_questions} questions.
-        
-        For each question:
-        1. Write a clear, specific question
-        2. Provide multiple choice options (A, B, C, D)
-        3. Indicate the correct answer
-        4. Include a brief explanation of why the answer is correct
-        
-        Format the quiz using Markdown with each question numbered, followed by choices,
-        then the answer and explanation in a collapsed details section.
-        
-        Example format:
-        ```
-        ## {topic} Quiz
-        
-        ### Question 1
-        What is...?
-        A) Option 1
-        B) Option 2
-        C) Option 3
-        D) Option 4
+        # Serve from the question bank when one is configured
+        if self.quiz_generator.question_bank is not None:
+            return self.quiz_generator.generate_quiz(topic, num_questions, difficulty)
         
-        <details>
-        <summary>Answer</summary>
-        
-        **Correct Answer: B**
-        
-        Explanation: This is correct because...
-        </details>
-        ```
-        """
+        prompt = QUIZ_PROMPT.format(topic=topic, difficulty=difficulty,
+                                    num_questions=num_questions)
         
         return self.client.generate_text(prompt)
     
@@ -125,6 +404,29 @@ class SmartStudyAssistant:
         Returns:
             A formatted study plan
         """
+        return "\n\n".join(self.stream_study_plan(subject, days, hours_per_day, goal))
+    
+    def stream_study_plan(self, subject: str, days: int = 7,
+                          hours_per_day: int = 1, goal: str = "mastery") -> Iterator[str]:
+        """
+        Create a personalized study plan, yielding it section by section
+        
+        Long plans are outlined first and then expanded block by block
+        concurrently by the StudyPlanner.
+        
+        Args:
+            subject: The subject to study
+            days: Number of days for the plan
+            hours_per_day: Hours to study per day
+            goal: Study goal (e.g., "exam preparation", "mastery")
+            
+        Returns:
+            An iterator over Markdown sections of the study plan, in order
+        """
+        if days > SINGLE_CALL_MAX_DAYS:
+            yield from self.study_planner.stream_study_plan(subject, days, hours_per_day, goal)
+            return
+        
         prompt = f"""
         Create a {days}-day study plan for "{subject}" with {hours_per_day} hour(s) per day.
         The goal is: {goal}.
@@ -140,7 +442,23 @@ class SmartStudyAssistant:
         Format the study plan using Markdown with clear headings, days, and activities.
         """
         
-        return self.client.generate_text(prompt)
+        yield self.client.generate_text(prompt)
+    
+    def prioritize_topics(self, subject: str, topics: List[str],
+                          time_available: int, goal: str = "mastery") -> str:
+        """
+        Prioritize topics and allocate the available study time between them
+        
+        Args:
+            subject: The main subject
+            topics: List of topics within the subject
+            time_available: Available time in hours
+            goal: Study goal (e.g., "exam preparation", "general understanding")
+            
+        Returns:
+            Prioritized list of topics with time allocation
+        """
+        return self.study_planner.prioritize_topics(subject, topics, time_available, goal)
     
     def summarize_content(self, content: str) -> str:
         """
@@ -152,6 +470,9 @@ class SmartStudyAssistant:
         Returns:
             A concise summary of the content
         """
+        if len(content) > SUMMARY_SINGLE_CALL_CHARS:
+            return self.summarize_document(content)[0]
+        
         prompt = f"""
         Summarize the following study material concisely while preserving the key points.
         Focus on the main concepts and their relationships.
@@ -172,6 +493,84 @@ class SmartStudyAssistant:
         
         return self.client.generate_text(prompt)
     
+    def summarize_document(self, content: Union[str, Iterable[str]]) -> Tuple[str, Dict[str, int]]:
+        """
+        Summarize a long document, re-summarizing only chunks that changed
+        
+        The document is split into chunks at content-defined boundaries. Chunks
+        seen before reuse their stored summaries, new ones are summarized
+        concurrently, and the partial summaries are combined in one final call.
+        A document that fits in one chunk gets a normal summary instead.
+        
+        Args:
+            content: The document text, or its sections in order as they are
+                extracted (see src.ingest)
+            
+        Returns:
+            The summary, and counts of chunks in total, summarized and reused
+        """
+        sections = [content] if isinstance(content, str) else content
+        
+        def summarize(chunk: str) -> Tuple[str, bool]:
+            prompt = CHUNK_SUMMARY_PROMPT.format(chunk=chunk)
+            key = cache_key(self.client.config, prompt)
+            partial = self.chunk_store.get(key)
+            if partial is not None:
+                return partial, True
+            text = self.client.generate_text(prompt)
+            if not text.startswith("Error") and not text.startswith(STALE_NOTICE):
+                self.chunk_store.set(key, text)
+            return text, False
+        
+        chunks = iter_chunks(sections)
+        head = list(itertools.islice(chunks, 2))
+        if len(head) == 1:
+            # A chunk summary is written as part of a longer document
+            return self.summarize_content(head[0]), {"chunks": 1, "summarized": 1, "reused": 0}
+        
+        # Chunks are summarized as extraction produces them, without waiting
+        # for the whole document
+        max_workers = self.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+        partials = []
+        stats = {"chunks": 0, "summarized": 0, "reused": 0}
+        for text, reused in ordered_map(summarize, itertools.chain(head, chunks), max_workers):
+            if text.startswith("Error") or text.startswith(STALE_NOTICE):
+                return f"Error summarizing part {len(partials) + 1}: {text}", {}
+            partials.append(text)
+            stats["chunks"] += 1
+            stats["reused" if reused else "summarized"] += 1
+        
+        if not partials:
+            return "Error summarizing content: the document contains no text", {}
+        sections = "\n\n".join(f"Part {i}:\n{partial}" for i, partial in enumerate(partials, 1))
+        return self.client.generate_text(COMBINE_SUMMARIES_PROMPT.format(sections=sections)), stats
+    
+    def simplify_text(self, text: str, audience: str = "student") -> str:
+        """
+        Rewrite complex study material in simpler language
+        
+        Args:
+            text: The text to simplify
+            audience: Who the simplified text is for
+            
+        Returns:
+            The simplified text, covering the whole original
+        """
+        return self.concept_explainer.simplify_complex_text(text, audience)
+    
+    def stream_simplified_text(self, text: str, audience: str = "student") -> Iterator[str]:
+        """
+        Rewrite complex study material in simpler language, yielding it part by part
+        
+        Args:
+            text: The text to simplify
+            audience: Who the simplified text is for
+            
+        Returns:
+            An iterator over the simplified parts, in order
+        """
+        return self.concept_explainer.stream_simplified_text(text, audience)
+    
     def get_study_tips(self, topic: Optional[str] = None) -> str:
         """
         Get evidence-based study technique recommendations
@@ -195,16 +594,71 @@ class SmartStudyAssistant:
             Format your response using Markdown with clear headings and bullet points.
             """
         else:
-            prompt = """
-            Provide general evidence-based study techniques that can improve learning effectiveness.
+            prompt = GENERAL_STUDY_TIPS_PROMPT
+            if self.tips_catalog is not None:
+                cached = self.tips_catalog.get(prompt)
+                if cached is not None:
+                    return cached
+            return self.client.generate_text(prompt)
+        
+        return self._complete("study_tips", prompt)
+    
+    def get_tips_for_learning_style(self, learning_style: str) -> str:
+        """
+        Get study tips customized for a learning style, from the catalog when possible
+        
+        Args:
+            learning_style: Learning style (visual, auditory, reading/writing, kinesthetic)
             
-            Include:
-            1. 3-5 practical, specific techniques
-            2. The science behind why each technique works
-            3. How to implement each technique effectively
-            4. Common mistakes to avoid
+        Returns:
+            Learning style-specific tips
+        """
+        return self.study_tips.get_tips_for_learning_style(learning_style)
+    
+    def overcome_challenge(self, challenge: str) -> str:
+        """
+        Get strategies to overcome a study challenge, from the catalog when possible
+        
+        Args:
+            challenge: Study challenge (e.g., "procrastination", "test anxiety")
             
-            Format your response using Markdown with clear headings and bullet points.
-            """
+        Returns:
+            Strategies to overcome the challenge
+        """
+        return self.study_tips.overcome_challenge(challenge)
+    
+    def refresh_tips_catalog(self) -> Dict[str, Any]:
+        """
+        Regenerate the offline study tips catalog
+        
+        The new catalog is written to the configured catalog path in the data
+        directory, never over the one shipped with the package.
+        
+        Returns:
+            Metadata of the new catalog (version, model, entry and failure counts)
+            
+        Raises:
+            ValueError: If no catalog path is configured
+        """
+        if self.tips_catalog is None:
+            raise ValueError("No tips catalog path is configured")
+        path = self.tips_catalog.path
+        result = build_tips_catalog(self.client, path, extra_prompts=[GENERAL_STUDY_TIPS_PROMPT])
+        self.tips_catalog = TipsCatalog(path, DEFAULT_CATALOG_PATH)
+        self.study_tips.catalog = self.tips_catalog
+        return result
+    
+    def _complete(self, kind: str, prompt: str) -> str:
+        """
+        Answer a small prompt, through the batcher when one is configured
         
-        return self.client.generate_text(prompt)
\ No newline at end of file
+        Args:
+            kind: Request type; only prompts of the same kind are batched together
+            prompt: The prompt to answer
+            
+        Returns:
+            The response text
+        """
+        if self.batcher is not None:
+            return self.batcher.submit(kind, prompt)
+        return self.client.generate_text(prompt)
@@ -0,0 +1,225 @@
+"""
+Micro-batching of small model requests for the Smart Study Assistant
+
+Short prompts of the same kind (checking one answer, explaining one glossary
+term, tips for one topic) that arrive within a short window are packed into a
+single model call. Each prompt is sent under a delimited item ID and the model
+answers with a JSON object keyed by those IDs, which is split back to the
+individual callers. Anything that cannot be matched to its ID falls back to an
+individual call, so batching never changes what a caller gets back.
+
+Each packed item gets its own output budget (BATCH_ITEM_TOKENS, which is
+smaller than max_tokens since batched prompts have short answers), and
+batches are kept small enough for the packed call to fit the model's output
+limit; an answer cut off by the budget falls back to an individual call.
+Batching is opt-in (BATCH_WINDOW), since a lone request still waits out the
+window, and is turned off when no more than one item fits the output limit.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.deadline import DeadlineExceeded, RequestCancelled, current_deadline
+from src.gemini_client import GeminiClient
+from src.response_cache import cache_key
+
+DEFAULT_BATCH_WINDOW = 0.05
+DEFAULT_MAX_BATCH = 8
+# Output tokens each packed item may use
+DEFAULT_ITEM_TOKENS = 1024
+# Most output tokens one call may ask for
+DEFAULT_OUTPUT_LIMIT = 8192
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting caller re-checks its deadline for cancellation
+_POLL_INTERVAL = 0.1
+
+PACKED_PROMPT = """
+Answer each of the following independent requests separately. Each request is
+enclosed between "<<<item-N>>>" and "<<<end item-N>>>" markers.
+
+Respond with a single JSON object that maps every item ID (for example "item-1")
+to the complete answer to that request, as a Markdown string. Follow the
+formatting instructions inside each request for its answer. Do not merge,
+skip or add items.
+
+{items}
+"""
+
+class _Pending:
+    """A caller waiting for its prompt to be answered as part of a batch"""
+
+    __slots__ = ("prompt", "result", "done")
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.result: Optional[str] = None
+        self.done = threading.Event()
+
+class MicroBatcher:
+    """
+    Collect small compatible requests and answer them with one model call
+    """
+
+    def __init__(self, client: GeminiClient, window: float = DEFAULT_BATCH_WINDOW,
+                 max_batch: int = DEFAULT_MAX_BATCH, output_limit: int = DEFAULT_OUTPUT_LIMIT,
+                 item_tokens: int = DEFAULT_ITEM_TOKENS):
+        """
+        Initialize the batcher
+
+        Args:
+            client: GeminiClient instance for API calls
+            window: Seconds the first request of a batch waits for others to join
+            max_batch: Maximum number of requests packed into one call
+            output_limit: Most output tokens the model allows in one call
+            item_tokens: Output tokens each packed item may use, at most max_tokens
+        """
+        self.client = client
+        self.window = window
+        self.item_tokens = min(item_tokens, client.config["max_tokens"])
+        self.max_batch = max(1, min(max_batch, output_limit // self.item_tokens))
+        if self.max_batch == 1:
+            logger.warning("Micro-batching is disabled: only one item of %d output tokens "
+                           "fits the output limit of %d", self.item_tokens, output_limit)
+
+        self._queues: Dict[str, List[_Pending]] = {}
+        self._cond = threading.Condition()
+        self._stats = {"submitted": 0, "batches": 0, "batched_items": 0, "fallbacks": 0}
+
+    def submit(self, kind: str, prompt: str) -> str:
+        """
+        Answer a prompt, batching it with concurrent prompts of the same kind
+
+        The first caller of a batch waits up to the window for others to join,
+        then sends the packed prompt on behalf of all of them. A lone request is
+        sent as is, and so is every request when batches hold only one.
+
+        Args:
+            kind: Name of the request type; only prompts of the same kind are packed together
+            prompt: The prompt to answer
+
+        Returns:
+            The response text, as generate_text would return it
+        """
+        with self._cond:
+            self._stats["submitted"] += 1
+        # Cached prompts gain nothing from batching, and without room for a
+        # second item there is nothing to wait for
+        if self.max_batch == 1 or self.client.is_cached(prompt):
+            return self.client.generate_text(prompt)
+
+        pending = _Pending(prompt)
+        with self._cond:
+            queue = self._queues.setdefault(kind, [])
+            queue.append(pending)
+            leader = len(queue) == 1
+            if len(queue) >= self.max_batch:
+                self._cond.notify_all()
+            if leader:
+                batch = self._collect(kind)
+
+        if leader:
+            self._run(batch)
+        else:
+            self._wait(pending)
+
+        if pending.result is None:
+            return self.client.generate_text(prompt)
+        return pending.result
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get batching counters
+
+        Returns:
+            Requests submitted, packed calls sent, requests answered through
+            them and requests that fell back to an individual call
+        """
+        with self._cond:
+            return dict(self._stats)
+
+    def _collect(self, kind: str) -> List[_Pending]:
+        """Wait for the window or a full batch, then take the queue; caller holds the lock"""
+        end = time.monotonic() + self.window
+        while len(self._queues[kind]) < self.max_batch:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+        batch = self._queues.pop(kind)
+        # Callers beyond the limit start the next batch themselves
+        if len(batch) > self.max_batch:
+            self._queues[kind] = batch[self.max_batch:]
+            batch = batch[:self.max_batch]
+            self._queues[kind][0].done.set()
+        return batch
+
+    def _wait(self, pending: _Pending) -> None:
+        """Block until the batch holding this request was answered or it became a leader"""
+        deadline = current_deadline()
+        while not pending.done.wait(_POLL_INTERVAL):
+            if deadline is not None:
+                try:
+                    deadline.check()
+                except (DeadlineExceeded, RequestCancelled):
+                    self._withdraw(pending)
+                    raise
+        # Woken without a result while still queued: this request leads the next batch
+        with self._cond:
+            for kind, queue in self._queues.items():
+                if queue and queue[0] is pending:
+                    pending.done.clear()
+                    batch = self._collect(kind)
+                    break
+            else:
+                return
+        self._run(batch)
+
+    def _withdraw(self, pending: _Pending) -> None:
+        """Remove a request that gave up waiting, handing its lead to the next one in line"""
+        with self._cond:
+            for kind, queue in list(self._queues.items()):
+                if pending in queue:
+                    was_head = queue[0] is pending
+                    queue.remove(pending)
+                    if not queue:
+                        del self._queues[kind]
+                    elif was_head:
+                        queue[0].done.set()
+                    return
+
+    def _run(self, batch: List[_Pending]) -> None:
+        """Answer a batch with one packed call and release its callers"""
+        try:
+            if len(batch) > 1:
+                self._answer(batch)
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+    def _answer(self, batch: List[_Pending]) -> None:
+        """Send the packed prompt and hand each answer to its caller"""
+        items = "\n\n".join(
+            f"<<<item-{i}>>>\n{pending.prompt.strip()}\n<<<end item-{i}>>>"
+            for i, pending in enumerate(batch, 1)
+        )
+        data = self.client.generate_json(PACKED_PROMPT.format(items=items),
+                                         max_output_tokens=self.item_tokens * len(batch))
+        if not isinstance(data, dict):
+            data = {}
+
+        answered = 0
+        for i, pending in enumerate(batch, 1):
+            answer = data.get(f"item-{i}")
+            if isinstance(answer, str) and answer.strip():
+                pending.result = answer.strip()
+                # Stored like any other answer, as a fallback or for response caching
+                self.client.cache.set(cache_key(self.client.config, pending.prompt), pending.result)
+                answered += 1
+        with self._cond:
+            self._stats["batches"] += 1
+            self._stats["batched_items"] += answered
+            self._stats["fallbacks"] += len(batch) - answered
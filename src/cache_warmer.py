@@ -0,0 +1,257 @@
+"""
+Syllabus-driven cache warming for the Smart Study Assistant
+
+Before a semester starts, every concept, topic and reading of the syllabus can
+be answered ahead of time, so students never wait on a cold entry. Each item
+expands into the requests students are expected to make (explanations, quizzes
+at each difficulty, flashcards, study notes); items whose answers are already
+fresh are skipped and the rest run concurrently within the key pool's rate limits.
+
+A syllabus is a JSON or YAML file:
+
+    subjects:
+      - name: Biology
+        concepts: [Osmosis, Mitosis]
+        topics: [Cell division]
+        materials: [readings/cells.md]   # relative to the syllabus file
+    defaults:
+      difficulties: [easy, medium, hard]
+      quiz_questions: 5
+      flashcards: 10
+
+A single subject may also be given at the top level, without "subjects".
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from src.assistant import SmartStudyAssistant, EXPLAIN_CONCEPT_PROMPT, QUIZ_PROMPT
+from src.concurrency import ordered_map, DEFAULT_MAX_WORKERS
+from src.features.content_summarizer import ContentSummarizer
+from src.features.quiz_generator import QuizGenerator, DEFAULT_QUESTION_TYPES
+
+DEFAULT_DIFFICULTIES = ["easy", "medium", "hard"]
+DEFAULT_QUIZ_QUESTIONS = 5
+DEFAULT_FLASHCARDS = 10
+
+KINDS = ["explanation", "quiz", "flashcards", "study_notes"]
+
+def load_syllabus(path: str) -> Dict[str, Any]:
+    """
+    Read a syllabus file
+
+    Args:
+        path: Path of a .json, .yaml or .yml file
+
+    Returns:
+        The syllabus as a dictionary
+
+    Raises:
+        ValueError: If the file cannot be parsed or has the wrong shape
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("Reading YAML syllabi requires PyYAML (pip install pyyaml)")
+        try:
+            syllabus = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML in {path}: {e}")
+    else:
+        try:
+            syllabus = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON in {path}: {e}")
+    if not isinstance(syllabus, dict):
+        raise ValueError(f"{path} must contain a mapping with subjects, concepts or topics")
+    return syllabus
+
+class WarmEntry:
+    """
+    One precomputable request derived from a syllabus
+    """
+
+    def __init__(self, kind: str, subject: str, target: str, **params: Any):
+        """
+        Initialize the entry
+
+        Args:
+            kind: One of KINDS
+            subject: Subject the item belongs to, for the report
+            target: The concept, topic or material path
+            params: Request options (difficulty, question or card count)
+        """
+        self.kind = kind
+        self.subject = subject
+        self.target = target
+        self.params = params
+
+    def label(self) -> str:
+        """Describe the entry for the report"""
+        details = ", ".join(f"{key}={value}" for key, value in self.params.items())
+        return f"{self.kind}: {self.target}" + (f" ({details})" if details else "")
+
+def syllabus_entries(syllabus: Dict[str, Any], base_dir: str = ".") -> List[WarmEntry]:
+    """
+    Expand a syllabus into the requests to precompute
+
+    Args:
+        syllabus: The loaded syllabus
+        base_dir: Directory that material paths are relative to
+
+    Returns:
+        The entries, grouped by subject
+    """
+    defaults = syllabus.get("defaults") or {}
+    difficulties = defaults.get("difficulties", DEFAULT_DIFFICULTIES)
+    num_questions = int(defaults.get("quiz_questions", DEFAULT_QUIZ_QUESTIONS))
+    num_cards = int(defaults.get("flashcards", DEFAULT_FLASHCARDS))
+
+    subjects = syllabus.get("subjects") or [syllabus]
+    entries = []
+    for subject in subjects:
+        name = subject.get("name") or "General"
+        for concept in subject.get("concepts") or []:
+            entries.append(WarmEntry("explanation", name, str(concept)))
+        for topic in subject.get("topics") or []:
+            for difficulty in difficulties:
+                entries.append(WarmEntry("quiz", name, str(topic), difficulty=difficulty,
+                                         questions=num_questions))
+            entries.append(WarmEntry("flashcards", name, str(topic), cards=num_cards))
+        for material in subject.get("materials") or []:
+            entries.append(WarmEntry("study_notes", name, os.path.join(base_dir, str(material))))
+    return entries
+
+class _PromptProbe:
+    """
+    Client stand-in that captures the prompt a feature method would send
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.prompt = None
+
+    def generate_text(self, prompt: str) -> str:
+        self.prompt = prompt
+        return ""
+
+class CacheWarmer:
+    """
+    Precompute the responses a syllabus calls for
+    """
+
+    def __init__(self, assistant: SmartStudyAssistant):
+        """
+        Initialize the cache warmer
+
+        Args:
+            assistant: SmartStudyAssistant whose caches are warmed
+        """
+        self.assistant = assistant
+        self.client = assistant.client
+
+    def warm(self, entries: List[WarmEntry], check_only: bool = False,
+             on_progress: Optional[Callable[[WarmEntry, str], None]] = None) -> Dict[str, Any]:
+        """
+        Precompute every entry that is not already fresh
+
+        Args:
+            entries: Entries from syllabus_entries
+            check_only: Only report coverage, without generating anything
+            on_progress: Optional callback receiving each entry and its status
+
+        Returns:
+            A coverage report: per-kind counts of entries that were already
+            fresh, warmed, missing or failed, per-subject coverage, the overall
+            coverage ratio and the labels of failed entries
+        """
+        def process(entry: WarmEntry) -> str:
+            status = self._process(entry, check_only)
+            if on_progress is not None:
+                on_progress(entry, status)
+            return status
+
+        # Rate limits are enforced per key, so more keys allow more workers
+        max_workers = self.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+        max_workers *= len(self.client.key_pool)
+        statuses = list(ordered_map(process, entries, max_workers))
+
+        kinds, subjects = {}, {}
+        for entry, status in zip(entries, statuses):
+            counts = kinds.setdefault(entry.kind, {"total": 0, "fresh": 0, "warmed": 0,
+                                                   "missing": 0, "failed": 0})
+            counts["total"] += 1
+            counts[status] += 1
+            subject = subjects.setdefault(entry.subject, {"total": 0, "covered": 0})
+            subject["total"] += 1
+            subject["covered"] += status in ("fresh", "warmed")
+        covered = sum(counts["fresh"] + counts["warmed"] for counts in kinds.values())
+        return {
+            "kinds": kinds,
+            "subjects": subjects,
+            "total": len(entries),
+            "covered": covered,
+            "coverage": covered / len(entries) if entries else 1.0,
+            "failed": [entry.label() for entry, status in zip(entries, statuses)
+                       if status == "failed"],
+        }
+
+    def _process(self, entry: WarmEntry, check_only: bool) -> str:
+        """Check and, if needed, precompute one entry"""
+        try:
+            if self._is_fresh(entry):
+                return "fresh"
+            if check_only:
+                return "missing"
+            return "warmed" if self._generate(entry) else "failed"
+        except (OSError, UnicodeDecodeError):
+            # Unreadable study material
+            return "failed"
+
+    def _is_fresh(self, entry: WarmEntry) -> bool:
+        """Whether a student request for this entry would be served without a model call"""
+        if entry.kind == "quiz" and self.assistant.quiz_generator.question_bank is not None:
+            return len(self._servable(entry)) >= entry.params["questions"]
+        return self.client.is_cached(self._prompt(entry))
+
+    def _servable(self, entry: WarmEntry) -> List[Dict[str, Any]]:
+        """Bank questions the next quiz for a quiz entry would be built from"""
+        return self.assistant.quiz_generator.question_bank.sample(
+            entry.target, entry.params["difficulty"], DEFAULT_QUESTION_TYPES,
+            entry.params["questions"])
+
+    def _generate(self, entry: WarmEntry) -> bool:
+        """Precompute an entry; True if it is now fresh"""
+        quiz_generator = self.assistant.quiz_generator
+        if entry.kind == "quiz" and quiz_generator.question_bank is not None:
+            # Stock the bank without serving anything, so the questions are
+            # still unseen when a student asks for the quiz
+            servable = self._servable(entry)
+            avoid = ([q["question"] for q in servable]
+                     + quiz_generator.question_bank.recently_served(entry.target))
+            quiz_generator.stock_questions(entry.target, entry.params["questions"] - len(servable),
+                                           entry.params["difficulty"], avoid=avoid)
+            return self._is_fresh(entry)
+        # Stored as prepared, so it is served even with response caching off
+        return self.client.prefetch(self._prompt(entry)) and self._is_fresh(entry)
+
+    def _prompt(self, entry: WarmEntry) -> str:
+        """Build the exact prompt the student-facing request would send"""
+        if entry.kind == "explanation":
+            return EXPLAIN_CONCEPT_PROMPT.format(concept=entry.target)
+        if entry.kind == "quiz":
+            return QUIZ_PROMPT.format(topic=entry.target, difficulty=entry.params["difficulty"],
+                                      num_questions=entry.params["questions"])
+
+        probe = _PromptProbe(self.client.config)
+        if entry.kind == "flashcards":
+            QuizGenerator(probe).generate_flashcards(entry.target, entry.params["cards"])
+        else:
+            with open(entry.target, "r", encoding="utf-8") as f:
+                content = f.read()
+            ContentSummarizer(probe).create_study_notes(content)
+        return probe.prompt
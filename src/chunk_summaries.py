@@ -0,0 +1,159 @@
+"""
+Content-hash chunk cache for incremental summarization
+
+Long documents are split into chunks at content-defined paragraph boundaries:
+a chunk ends after a paragraph whose hash hits a fixed pattern (or at a
+heading, or when it grows too large), so editing one paragraph only changes the
+chunk that contains it and the boundaries after it stay where they were. Each
+chunk's summary is stored under a hash of its summarization prompt, so an
+unchanged chunk is never sent to the model again.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional
+
+# Chunks are cut at a boundary paragraph once they reach MIN_CHUNK_CHARS and
+# always before they exceed MAX_CHUNK_CHARS
+MIN_CHUNK_CHARS = 2000
+MAX_CHUNK_CHARS = 6000
+
+# One paragraph in BOUNDARY_DIVISOR ends a chunk, on average
+BOUNDARY_DIVISOR = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_HEADING = re.compile(r"^#{1,3}\s")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunk_summaries (
+    key TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+def _paragraphs(content: str, max_chars: int) -> Iterator[str]:
+    """Yield the paragraphs of a text, splitting any longer than max_chars"""
+    for paragraph in _PARAGRAPH_BREAK.split(content):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind("\n", 0, max_chars)
+            if cut <= 0:
+                cut = paragraph.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            yield paragraph[:cut].strip()
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            yield paragraph
+
+def _is_boundary(paragraph: str) -> bool:
+    """Whether a chunk may end after this paragraph, decided by its content alone"""
+    digest = hashlib.sha256(paragraph.encode("utf-8")).digest()
+    return digest[0] % BOUNDARY_DIVISOR == 0
+
+def iter_chunks(sections: Iterable[str], min_chars: int = MIN_CHUNK_CHARS,
+                max_chars: int = MAX_CHUNK_CHARS) -> Iterator[str]:
+    """
+    Chunk a document arriving section by section, with boundaries that survive local edits
+
+    Args:
+        sections: The document's text in order, e.g. pages streamed from extraction
+        min_chars: Size a chunk must reach before it can end at a boundary paragraph
+        max_chars: Size at which a chunk is always cut
+
+    Returns:
+        An iterator over the chunks in document order
+    """
+    current, size = [], 0
+    for section in sections:
+        for paragraph in _paragraphs(section, max_chars):
+            # Headings start new chunks once the current one is big enough,
+            # and no chunk grows past the limit
+            if current and (size + len(paragraph) > max_chars
+                            or (_HEADING.match(paragraph) and size >= min_chars)):
+                yield "\n\n".join(current)
+                current, size = [], 0
+            current.append(paragraph)
+            size += len(paragraph) + 2
+            if size >= min_chars and _is_boundary(paragraph):
+                yield "\n\n".join(current)
+                current, size = [], 0
+    if current:
+        yield "\n\n".join(current)
+
+def split_chunks(content: str, min_chars: int = MIN_CHUNK_CHARS,
+                 max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """
+    Split a document into chunks whose boundaries survive local edits
+
+    Args:
+        content: The document text
+        min_chars: Size a chunk must reach before it can end at a boundary paragraph
+        max_chars: Size at which a chunk is always cut
+
+    Returns:
+        The chunks in document order
+    """
+    return list(iter_chunks([content], min_chars, max_chars))
+
+class ChunkSummaryStore:
+    """
+    SQLite store of chunk summaries keyed by content hash
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (or create) a chunk summary store
+
+        Args:
+            path: Path of the SQLite database file; None keeps the store in memory
+        """
+        path = path or ":memory:"
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a chunk summary
+
+        Args:
+            key: Hash of the chunk's summarization prompt
+
+        Returns:
+            The stored summary, or None if the chunk was never summarized
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM chunk_summaries WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, summary: str) -> None:
+        """
+        Store a chunk summary
+
+        Args:
+            key: Hash of the chunk's summarization prompt
+            summary: The summary text
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_summaries (key, summary, created_at) VALUES (?, ?, ?)",
+                (key, summary, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
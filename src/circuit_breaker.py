@@ -0,0 +1,154 @@
+"""
+Circuit breaker around the Gemini backend
+
+The breaker watches a sliding window of recent calls. When too many of them
+failed or were too slow, it opens and callers stop waiting on the backend.
+After a cooldown it lets a single probe request through (half-open); the probe
+closes the circuit on success or reopens it on failure.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Track backend health and decide whether requests may be sent
+    """
+
+    def __init__(self, window_size: int = 20, min_calls: int = 5,
+                 failure_threshold: float = 0.5, slow_call_seconds: float = 30.0,
+                 cooldown_seconds: float = 30.0):
+        """
+        Initialize the circuit breaker
+
+        Args:
+            window_size: Number of recent calls considered
+            min_calls: Calls needed in the window before the circuit can open
+            failure_threshold: Fraction of failed or slow calls that opens the circuit
+            slow_call_seconds: Latency above which a successful call counts as bad
+            cooldown_seconds: Time the circuit stays open before a probe is allowed
+        """
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown_seconds = cooldown_seconds
+
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str], None]] = []
+        self._stats = {"opened": 0, "probes": 0, "rejected": 0}
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """
+        Register a callback invoked with the new state on every state change
+
+        Args:
+            listener: Callback taking the new state name
+        """
+        self._listeners.append(listener)
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether a request may be sent to the backend now
+
+        Returns:
+            True if the request may proceed; when half-open only one probe at a
+            time is allowed through
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._stats["probes"] += 1
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        """
+        Record a completed backend call
+
+        Args:
+            latency: Call duration in seconds
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._outcomes.clear()
+                self._transition(CLOSED)
+                return
+            self._outcomes.append(latency <= self.slow_call_seconds)
+            self._check_threshold()
+
+    def record_failure(self) -> None:
+        """Record a failed backend call"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._open()
+                return
+            self._outcomes.append(False)
+            self._check_threshold()
+
+    def release_probe(self) -> None:
+        """
+        Record a call that ended without an outcome from the backend
+
+        A half-open probe that was cancelled, ran out of time or was interrupted
+        before the backend answered says nothing about its health; the state
+        stays as it is and the next request may probe instead.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the breaker state for metrics
+
+        Returns:
+            State name, recent failure rate, window size and transition counters
+        """
+        with self._lock:
+            bad = sum(1 for ok in self._outcomes if not ok)
+            return dict(
+                self._stats,
+                state=self.state,
+                failure_rate=bad / len(self._outcomes) if self._outcomes else 0.0,
+                window=len(self._outcomes),
+            )
+
+    def _check_threshold(self) -> None:
+        """Open the circuit if the window has too many bad calls; caller holds the lock"""
+        if self.state != CLOSED or len(self._outcomes) < self.min_calls:
+            return
+        bad = sum(1 for ok in self._outcomes if not ok)
+        if bad / len(self._outcomes) >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        """Open the circuit; caller holds the lock"""
+        self._opened_at = time.monotonic()
+        self._stats["opened"] += 1
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        """Change state and notify listeners; caller holds the lock"""
+        if state == self.state:
+            return
+        self.state = state
+        for listener in self._listeners:
+            listener(state)
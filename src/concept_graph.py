@@ -0,0 +1,204 @@
+"""
+Persistent concept relationship graph for the Smart Study Assistant
+
+Relationships between concepts are stored as edges in SQLite, so pairwise
+questions and neighborhood lookups can be answered without calling the model
+again. Edges are undirected for lookup purposes but remember the direction the
+relationship was stated in (e.g. "A is a prerequisite of B").
+"""
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Relation types the model is asked to choose from
+RELATIONS = [
+    "prerequisite of",
+    "part of",
+    "example of",
+    "similar to",
+    "contrasts with",
+    "related to",
+    "unrelated",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS edges (
+    node_a TEXT NOT NULL,
+    node_b TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    relation TEXT,
+    description TEXT NOT NULL DEFAULT '',
+    explanation TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (node_a, node_b)
+);
+CREATE INDEX IF NOT EXISTS edges_node_b ON edges (node_b);
+"""
+
+def normalize_concept(concept: str) -> str:
+    """
+    Normalize a concept name for use as a graph node key
+
+    Args:
+        concept: The concept name
+
+    Returns:
+        The lowercased name with collapsed whitespace
+    """
+    return " ".join(concept.lower().split())
+
+def _node_pair(first: str, second: str) -> Tuple[str, str]:
+    """Return the order-independent key of the edge between two concepts"""
+    return tuple(sorted((normalize_concept(first), normalize_concept(second))))
+
+class ConceptGraph:
+    """
+    On-disk adjacency store of relationships between concepts
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) a concept graph
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def add_edge(self, source: str, target: str, relation: Optional[str] = None,
+                 description: str = "", explanation: Optional[str] = None) -> None:
+        """
+        Store (or update) the relationship between two concepts
+
+        Args:
+            source: Concept the relation is stated from
+            target: Concept the relation points to
+            relation: One of RELATIONS, or None if the relation was not classified
+            description: One or two sentence description of the relationship
+            explanation: Optional full Markdown explanation of the relationship
+        """
+        node_a, node_b = _node_pair(source, target)
+        with self._lock:
+            existing = self._conn.execute(
+                "SELECT * FROM edges WHERE node_a = ? AND node_b = ?", (node_a, node_b)
+            ).fetchone()
+            if existing is not None:
+                # Keep what we already know when the update only adds part of it;
+                # a kept relation keeps the direction it was stated in
+                if relation is None:
+                    relation = existing["relation"]
+                    source, target = existing["source"], existing["target"]
+                description = description or existing["description"]
+                explanation = explanation or existing["explanation"]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO edges (node_a, node_b, source, target, relation, "
+                "description, explanation, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (node_a, node_b, source, target, relation, description, explanation, time.time()),
+            )
+            self._conn.commit()
+
+    def get_edge(self, first: str, second: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the relationship between two concepts
+
+        Args:
+            first: First concept
+            second: Second concept
+
+        Returns:
+            The edge dict, or None if the relationship is not known yet
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM edges WHERE node_a = ? AND node_b = ?", _node_pair(first, second)
+            ).fetchone()
+        return self._row_to_edge(row) if row is not None else None
+
+    def neighbors(self, concept: str) -> List[Dict[str, Any]]:
+        """
+        List the known relationships of a concept, excluding unrelated pairs
+
+        Args:
+            concept: The concept to look up
+
+        Returns:
+            Edge dicts touching the concept
+        """
+        node = normalize_concept(concept)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM edges WHERE (node_a = ? OR node_b = ?) "
+                "AND (relation IS NULL OR relation != 'unrelated') ORDER BY source, target",
+                (node, node),
+            ).fetchall()
+        return [self._row_to_edge(row) for row in rows]
+
+    def edges_among(self, concepts: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        List the known relationships among a set of concepts
+
+        Args:
+            concepts: The concepts to consider
+
+        Returns:
+            Edge dicts between any two of the concepts, in pair order
+        """
+        edges = []
+        for first, second in itertools.combinations(self._unique(concepts), 2):
+            edge = self.get_edge(first, second)
+            if edge is not None:
+                edges.append(edge)
+        return edges
+
+    def missing_pairs(self, concepts: Iterable[str]) -> List[Tuple[str, str]]:
+        """
+        Find the pairs of concepts whose relationship is not classified yet
+
+        Args:
+            concepts: The concepts to consider
+
+        Returns:
+            Pairs of concept names with no edge or an unclassified edge
+        """
+        missing = []
+        for first, second in itertools.combinations(self._unique(concepts), 2):
+            edge = self.get_edge(first, second)
+            if edge is None or edge["relation"] is None:
+                missing.append((first, second))
+        return missing
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _unique(concepts: Iterable[str]) -> List[str]:
+        """Drop concepts that normalize to the same node, keeping the first spelling"""
+        seen = {}
+        for concept in concepts:
+            seen.setdefault(normalize_concept(concept), concept)
+        return list(seen.values())
+
+    @staticmethod
+    def _row_to_edge(row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a database row into an edge dict"""
+        return {
+            "source": row["source"],
+            "target": row["target"],
+            "relation": row["relation"],
+            "description": row["description"],
+            "explanation": row["explanation"],
+        }
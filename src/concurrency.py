@@ -0,0 +1,112 @@
+"""
+Concurrency helpers for the Smart Study Assistant
+"""
+
+import collections
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Iterable, Iterator
+
+from src.deadline import current_deadline
+
+DEFAULT_MAX_WORKERS = 4
+
+# How often a waiting consumer re-checks its deadline for cancellation
+_POLL_INTERVAL = 0.1
+
+def _work(tasks: "queue.Queue") -> None:
+    """Run queued calls until a stop marker arrives"""
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        future, context, func, item = task
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            result = context.run(func, item)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+def ordered_map(func: Callable[[Any], Any], items: Iterable[Any],
+                max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[Any]:
+    """
+    Run a function over items concurrently and yield results in input order
+
+    Result N is yielded as soon as results 1..N are all available, so callers
+    can stream the head of the output while the tail is still being computed.
+    Items are taken from the iterable as the window of calls in flight (twice
+    the workers) has room, so a lazy source is consumed as it is produced and
+    only the window's results are held at a time. Workers run in a copy of the
+    caller's context, so they share its deadline; when that deadline is
+    cancelled or exceeded, queued items are dropped and the consumer stops
+    waiting on running ones. Workers are daemon threads, so a call still
+    running after a cancellation never holds up interpreter exit.
+
+    Args:
+        func: Function to apply to each item
+        items: Items to process; errors raised by the iterable itself reach
+            the caller
+        max_workers: Maximum number of concurrent calls
+
+    Returns:
+        An iterator over the results, in the same order as the items
+
+    Raises:
+        RequestCancelled: If the current deadline is cancelled
+        DeadlineExceeded: If the current deadline passes
+    """
+    deadline = current_deadline()
+
+    def run(item: Any) -> Any:
+        if deadline is not None:
+            deadline.check()
+        return func(item)
+
+    items = iter(items)
+    max_workers = max(1, max_workers)
+    window = max_workers * 2
+    tasks = queue.Queue()
+    pending = collections.deque()
+    workers = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future = Future()
+                tasks.put((future, contextvars.copy_context(), run, item))
+                pending.append(future)
+                if workers < max_workers:
+                    threading.Thread(target=_work, args=(tasks,), daemon=True).start()
+                    workers += 1
+            if not pending:
+                return
+            # Dropped before waiting, so finished results are not kept around
+            future = pending.popleft()
+            if deadline is None:
+                yield future.result()
+                continue
+            while True:
+                deadline.check()
+                try:
+                    result = future.result(timeout=_POLL_INTERVAL)
+                    break
+                except FutureTimeout:
+                    continue
+            yield result
+    finally:
+        # Don't start queued work if the consumer stopped early; running
+        # calls end on their own timeouts without anyone waiting for them
+        for future in pending:
+            future.cancel()
+        for _ in range(workers):
+            tasks.put(None)
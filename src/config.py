@@ -7,6 +7,8 @@ import os
 from typing import Dict, Any
 from dotenv import load_dotenv
 
+from src.profiler import phase
+
 def load_config() -> Dict[str, Any]:
     """
     Load configuration from environment variables
@@ -15,7 +17,8 @@ def load_config() -> Dict[str, Any]:
         Dict[str, Any]: Configuration dictionary
     """
     # Load environment variables from .env file
-    load_dotenv()
+    with phase("config"):
+        load_dotenv()
     
     # Required configuration
     api_key = os.getenv("GEMINI_API_KEY")
@@ -25,12 +28,65 @@ def load_config() -> Dict[str, Any]:
             "Please create a .env file based on .env.example."
         )
     
+    # Extra keys or projects spread the load beyond a single key's quota
+    api_keys = [api_key] + [
+        key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",")
+        if key.strip() and key.strip() != api_key
+    ]
+    requests_per_minute = os.getenv("REQUESTS_PER_MINUTE")
+    
+    data_dir = os.path.expanduser(os.getenv("DATA_DIR", "~/.smart_study_assistant"))
+    traffic_log = os.getenv("TRAFFIC_LOG")
+    
     # Optional configuration with defaults
     config = {
         "api_key": api_key,
+        "api_keys": api_keys,
+        "requests_per_minute": float(requests_per_minute) if requests_per_minute else None,
         "model": os.getenv("MODEL_NAME", "gemini-2.0-flash"),
         "max_tokens": int(os.getenv("MAX_TOKENS", "2048")),
         "temperature": float(os.getenv("TEMPERATURE", "0.7")),
+        "max_concurrency": int(os.getenv("MAX_CONCURRENCY", "4")),
+        "prefetch": os.getenv("PREFETCH", "").lower() in ("1", "true", "yes"),
+        "prefetch_budget": int(os.getenv("PREFETCH_BUDGET", "5")),
+        "prefetch_exit_wait": float(os.getenv("PREFETCH_EXIT_WAIT", "10")),
+        # Seconds small requests wait to be packed together; 0 turns batching off
+        "batch_window": float(os.getenv("BATCH_WINDOW", "0")),
+        "max_batch_size": int(os.getenv("MAX_BATCH_SIZE", "8")),
+        "batch_item_tokens": int(os.getenv("BATCH_ITEM_TOKENS", "1024")),
+        "timeouts": {
+            "generate_text": float(os.getenv("REQUEST_TIMEOUT", "60")),
+            "chat": float(os.getenv("CHAT_TIMEOUT", "90")),
+        },
+        "data_dir": data_dir,
+        # Stored responses back up failed calls; serving them directly is opt-in
+        "response_cache": os.getenv("RESPONSE_CACHE", "").lower() in ("1", "true", "yes"),
+        "response_cache_path": os.path.join(data_dir, "response_cache.db"),
+        "cache_ttl": int(os.getenv("CACHE_TTL", str(7 * 24 * 3600))),
+        "slow_call_seconds": float(os.getenv("SLOW_CALL_SECONDS", "30")),
+        "circuit_cooldown": float(os.getenv("CIRCUIT_COOLDOWN", "30")),
+        "question_bank_path": os.getenv(
+            "QUESTION_BANK_PATH", os.path.join(data_dir, "question_bank.db")
+        ),
+        "concept_graph_path": os.getenv(
+            "CONCEPT_GRAPH_PATH", os.path.join(data_dir, "concept_graph.db")
+        ),
+        "topic_dependency_cache_path": os.path.join(data_dir, "topic_dependencies.json"),
+        "max_sessions": int(os.getenv("MAX_SESSIONS", "1000")),
+        "session_ttl": int(os.getenv("SESSION_TTL", "3600")),
+        "session_memory_budget": int(os.getenv("SESSION_MEMORY_BUDGET", str(64 * 1024 * 1024))),
+        "session_spill_dir": os.path.join(data_dir, "session_spill"),
+        "chunk_summary_path": os.path.join(data_dir, "chunk_summaries.db"),
+        "sessions_dir": os.path.join(data_dir, "sessions"),
+        "profile": os.getenv("PROFILE", "").lower() in ("1", "true", "yes"),
+        "profile_dir": os.getenv("PROFILE_DIR", os.path.join(data_dir, "profiles")),
+        "traffic_log": os.path.expanduser(traffic_log) if traffic_log else None,
+        "traffic_salt": os.getenv("TRAFFIC_SALT") or None,
+        "traffic_salt_path": os.path.join(data_dir, "traffic_salt"),
+        # Refreshed catalog; the one shipped in src/data is used until it exists
+        "tips_catalog_path": os.getenv(
+            "TIPS_CATALOG_PATH", os.path.join(data_dir, "tips_catalog.json.gz")
+        ),
     }
     
     return config
\ No newline at end of file
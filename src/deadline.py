@@ -0,0 +1,121 @@
+"""
+Request deadlines and cooperative cancellation for the Smart Study Assistant
+
+A Deadline is set once at the entry point (a CLI command or a server request)
+and travels implicitly through the call stack in a context variable, so the
+assistant, the feature classes and worker threads started by ordered_map all
+see the same deadline. The Gemini client turns the remaining time into a
+per-request timeout and refuses to start calls once it is exceeded or cancelled.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs past its deadline"""
+
+class RequestCancelled(Exception):
+    """Raised when a request was cancelled by the caller"""
+
+class Deadline:
+    """
+    Absolute time limit for a request, with cooperative cancellation
+    """
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["Deadline"] = None):
+        """
+        Initialize the deadline
+
+        Args:
+            timeout: Seconds from now until the deadline; None for no time limit
+            parent: Optional enclosing deadline; this one never outlives it and
+                is cancelled along with it
+        """
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        if parent is not None and parent.expires_at is not None:
+            if self.expires_at is None or parent.expires_at < self.expires_at:
+                self.expires_at = parent.expires_at
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> Optional[float]:
+        """
+        Get the time left before the deadline
+
+        Returns:
+            Seconds remaining (possibly negative), or None if there is no time limit
+        """
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def cancel(self) -> None:
+        """Cancel the request and every child deadline"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether this deadline or an enclosing one was cancelled"""
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def check(self) -> None:
+        """
+        Raise if the request should not continue
+
+        Raises:
+            RequestCancelled: If the request was cancelled
+            DeadlineExceeded: If the deadline has passed
+        """
+        if self.cancelled:
+            raise RequestCancelled("request was cancelled")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("request deadline exceeded")
+
+    def timeout_for(self, default: Optional[float]) -> Optional[float]:
+        """
+        Compute the timeout for one backend call
+
+        Args:
+            default: The method's default timeout in seconds, if any
+
+        Returns:
+            The smaller of the default and the time remaining
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        if default is None:
+            return remaining
+        return min(default, remaining)
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    Get the deadline of the request being handled
+
+    Returns:
+        The current deadline, or None outside of any deadline scope
+    """
+    return _current.get()
+
+@contextmanager
+def deadline_scope(deadline: Deadline) -> Iterator[Deadline]:
+    """
+    Make a deadline current for the duration of a block
+
+    Args:
+        deadline: The deadline to apply
+
+    Returns:
+        A context manager yielding the deadline
+    """
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
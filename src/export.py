@@ -0,0 +1,276 @@
+"""
+Bulk export of flashcards and quiz questions for the Smart Study Assistant
+
+Items (flashcards and quiz questions) are written one at a time to CSV, JSON
+Lines or an Anki text import file, so exporting a whole course takes constant
+memory however many cards it has. Items come from the question bank, streamed
+straight from SQLite, or are generated for every topic of a syllabus in one
+pass, with topics processed concurrently and written in syllabus order.
+
+Anki files use the text import headers of Anki 2.1.55 and later (File >
+Import): tab-separated front, back and tags of the Basic note type.
+"""
+
+import csv
+import html
+import itertools
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from src.cache_warmer import WarmEntry
+from src.concurrency import ordered_map, DEFAULT_MAX_WORKERS
+from src.gemini_client import STALE_NOTICE
+from src.question_bank import QuestionBank
+
+EXPORT_FORMATS = ["csv", "jsonl", "anki"]
+
+CSV_COLUMNS = ["kind", "topic", "difficulty", "type", "question", "options", "answer", "explanation"]
+
+DEFAULT_DECK = "Smart Study Assistant"
+
+_FORMAT_BY_EXTENSION = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl",
+                        ".txt": "anki", ".tsv": "anki"}
+
+_CARD = re.compile(r"^#{2,4}\s*Card\s+\d+.*$", re.I | re.M)
+_FRONT = re.compile(r"\*\*Front:?\*\*:?\s*(.+?)(?=<details>|\*\*Back|\Z)", re.S | re.I)
+_BACK_DETAILS = re.compile(r"<details>\s*<summary>.*?</summary>(.*?)</details>", re.S | re.I)
+_BACK_PLAIN = re.compile(r"\*\*Back:?\*\*:?\s*(.+)", re.S | re.I)
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_TAG_CHARS = re.compile(r"[^\w:-]+")
+
+def parse_flashcards(markdown: str, topic: str) -> List[Dict[str, Any]]:
+    """
+    Extract flashcards from the Markdown produced by generate_flashcards
+
+    Args:
+        markdown: Flashcards in the "### Card N / **Front:** / <details>" format
+        topic: Topic the cards belong to
+
+    Returns:
+        Flashcard items; cards without both a front and a back are skipped
+    """
+    cards = []
+    for block in _CARD.split(markdown)[1:]:
+        front = _FRONT.search(block)
+        back = _BACK_DETAILS.search(block) or _BACK_PLAIN.search(block)
+        if front and back and front.group(1).strip() and back.group(1).strip():
+            cards.append({"kind": "flashcard", "topic": topic,
+                          "question": front.group(1).strip(), "answer": back.group(1).strip()})
+    return cards
+
+def question_item(question: Dict[str, Any], topic: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Turn a structured quiz question into an export item
+
+    Args:
+        question: Question dict from the question bank or generate_questions
+        topic: Topic to record when the question does not carry one
+
+    Returns:
+        A question item
+    """
+    return {
+        "kind": "question",
+        "topic": question.get("topic") or topic,
+        "difficulty": question.get("difficulty"),
+        "type": question.get("type"),
+        "question": question["question"],
+        "options": list(question.get("options") or []),
+        "answer": question.get("answer", ""),
+        "explanation": question.get("explanation", ""),
+    }
+
+def iter_bank_items(bank: QuestionBank, topic: Optional[str] = None,
+                    difficulty: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the questions of a question bank as export items
+
+    Args:
+        bank: The question bank
+        topic: Optional topic filter
+        difficulty: Optional difficulty filter
+
+    Returns:
+        An iterator over question items, in the order they were stored
+    """
+    for question in bank.iter_questions(topic, difficulty):
+        yield question_item(question)
+
+def iter_syllabus_items(assistant: Any, entries: List[WarmEntry],
+                        failed: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Generate the flashcards and quiz questions of a syllabus and stream them
+
+    Flashcard decks go through the response cache, so decks warmed with the
+    warm command cost nothing. Quizzes are topped up in the question bank when
+    one is configured and then streamed from it; without a bank the questions
+    are generated directly. Entries whose generation failed (an error or a
+    stale answer from the backend, or nothing that parses) are skipped.
+
+    Args:
+        assistant: SmartStudyAssistant providing the quiz generator
+        entries: Syllabus entries; only flashcards and quiz entries are exported
+        failed: Optional list receiving the labels of the skipped entries
+
+    Returns:
+        An iterator over items, in syllabus order
+    """
+    generator = assistant.quiz_generator
+    bank = generator.question_bank
+    entries = [entry for entry in entries if entry.kind in ("flashcards", "quiz")]
+
+    def generate(entry: WarmEntry) -> Optional[List[Dict[str, Any]]]:
+        if entry.kind == "flashcards":
+            markdown = generator.generate_flashcards(entry.target, entry.params["cards"])
+            if markdown.startswith("Error") or markdown.startswith(STALE_NOTICE):
+                return []
+            return parse_flashcards(markdown, entry.target)
+        difficulty, count = entry.params["difficulty"], entry.params["questions"]
+        if bank is not None:
+            stored = [q["question"] for q in
+                      itertools.islice(bank.iter_questions(entry.target, difficulty), count)]
+            if len(stored) < count:
+                # Stocked without being marked as served, so exporting a
+                # syllabus doesn't make its questions look used to students
+                added = generator.stock_questions(entry.target, count - len(stored), difficulty,
+                                                  avoid=stored)
+                if not stored and not added:
+                    return []
+            # Streamed from the bank by the consumer, not held here
+            return None
+        questions = generator.generate_questions(entry.target, count, difficulty) or []
+        return [dict(question_item(question, entry.target), difficulty=difficulty)
+                for question in questions]
+
+    max_workers = assistant.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+    for entry, items in zip(entries, ordered_map(generate, entries, max_workers)):
+        if items is None:
+            yield from itertools.islice(
+                iter_bank_items(bank, entry.target, entry.params["difficulty"]),
+                entry.params["questions"])
+        elif items:
+            yield from items
+        elif failed is not None:
+            failed.append(entry.label())
+
+class CsvExporter:
+    """
+    Write items as CSV rows with one column per field
+    """
+
+    def __init__(self, stream: TextIO):
+        self._writer = csv.DictWriter(stream, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, item: Dict[str, Any]) -> None:
+        row = dict(item, options=" | ".join(item.get("options") or []))
+        self._writer.writerow(row)
+
+class JsonlExporter:
+    """
+    Write items as JSON Lines, one object per item
+    """
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+
+    def write(self, item: Dict[str, Any]) -> None:
+        self._stream.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+class AnkiExporter:
+    """
+    Write items as an Anki text import file of Basic notes
+    """
+
+    def __init__(self, stream: TextIO, deck: str = DEFAULT_DECK):
+        self._stream = stream
+        for header in ("#separator:tab", "#html:true", "#notetype:Basic",
+                       f"#deck:{deck}", "#tags column:3"):
+            stream.write(header + "\n")
+
+    def write(self, item: Dict[str, Any]) -> None:
+        front = _to_html(item["question"])
+        if item["kind"] == "question" and item.get("type") != "true/false":
+            front += "".join(f"<br>{chr(ord('A') + i)}) {_to_html(option)}"
+                             for i, option in enumerate(item.get("options") or []))
+        if item["kind"] == "question":
+            back = f"<b>{_to_html(item['answer'])}</b>"
+            if item.get("explanation"):
+                back += "<br><br>" + _to_html(item["explanation"])
+        else:
+            back = _to_html(item["answer"])
+        tags = [_tag(item.get("topic"))]
+        if item.get("difficulty"):
+            tags.append("difficulty::" + _tag(item["difficulty"]))
+        self._stream.write(f"{front}\t{back}\t{' '.join(tag for tag in tags if tag)}\n")
+
+def _to_html(text: str) -> str:
+    """Escape text for an Anki HTML field, keeping line breaks and bold"""
+    text = html.escape(str(text).strip(), quote=False)
+    text = _BOLD.sub(r"<b>\1</b>", text)
+    return text.replace("\t", " ").replace("\r\n", "\n").replace("\n", "<br>")
+
+def _tag(value: Optional[str]) -> str:
+    """Turn a topic or difficulty into an Anki tag"""
+    return _TAG_CHARS.sub("_", (value or "").strip().lower()).strip("_")
+
+def export_format(path: str, format: Optional[str] = None) -> str:
+    """
+    Pick the export format for a file
+
+    Args:
+        path: Output path
+        format: Explicit format, one of EXPORT_FORMATS
+
+    Returns:
+        The format
+
+    Raises:
+        ValueError: If no format is given and the extension is not recognized
+    """
+    if format:
+        return format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in _FORMAT_BY_EXTENSION:
+        raise ValueError(f"Cannot tell the export format of {path}; pass one of "
+                         f"{', '.join(EXPORT_FORMATS)}")
+    return _FORMAT_BY_EXTENSION[extension]
+
+def export_items(items: Iterable[Dict[str, Any]], path: str, format: Optional[str] = None,
+                 deck: str = DEFAULT_DECK,
+                 on_item: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Write items to a file, one at a time
+
+    Args:
+        items: Items to export, e.g. from iter_bank_items or iter_syllabus_items
+        path: Output file
+        format: One of EXPORT_FORMATS; inferred from the extension by default
+        deck: Deck name for Anki files
+        on_item: Optional callback receiving the number of items written so far
+
+    Returns:
+        The number of items written
+
+    Raises:
+        ValueError: If the format cannot be determined
+    """
+    format = export_format(path, format)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as stream:
+        if format == "csv":
+            exporter = CsvExporter(stream)
+        elif format == "jsonl":
+            exporter = JsonlExporter(stream)
+        else:
+            exporter = AnkiExporter(stream, deck)
+        for item in items:
+            exporter.write(item)
+            written += 1
+            if on_item is not None:
+                on_item(written)
+    return written
@@ -2,22 +2,41 @@
 Concept explanation functionality for Smart Study Assistant
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from src.concept_graph import ConceptGraph, RELATIONS
+from src.batcher import MicroBatcher
+from src.chunk_summaries import split_chunks
+from src.concurrency import ordered_map, DEFAULT_MAX_WORKERS
 from src.gemini_client import GeminiClient
 
+# Number of concept pairs classified per model call when mapping relationships
+PAIRS_PER_BATCH = 40
+
+# Texts longer than this are simplified in segments of MIN to MAX characters
+SIMPLIFY_SEGMENT_MIN_CHARS = 1500
+SIMPLIFY_SEGMENT_MAX_CHARS = 3000
+
+# Characters of neighbouring original text shown around each segment
+SIMPLIFY_CONTEXT_CHARS = 400
+
 class ConceptExplainer:
     """
     Generate clear explanations of concepts for effective learning
     """
     
-    def __init__(self, client: GeminiClient):
+    def __init__(self, client: GeminiClient, concept_graph: Optional[ConceptGraph] = None,
+                 batcher: Optional[MicroBatcher] = None):
         """
         Initialize the concept explainer
         
         Args:
             client: GeminiClient instance for API calls
+            concept_graph: Optional graph to answer relationship questions from
+            batcher: Optional batcher packing concurrent explanations into one call
         """
         self.client = client
+        self.concept_graph = concept_graph
+        self.batcher = batcher
     
     def explain_concept(self, concept: str, detail_level: str = "medium", 
                         audience: str = "student") -> str:
@@ -47,8 +66,33 @@ class ConceptExplainer:
         and emphasis for key terms.
         """
         
+        if self.batcher is not None:
+            return self.batcher.submit("explain_concept", prompt)
         return self.client.generate_text(prompt)
     
+    def explain_concepts(self, concepts: List[str], detail_level: str = "medium",
+                         audience: str = "student") -> List[str]:
+        """
+        Explain a list of concepts, such as the terms of a glossary
+        
+        The explanations are requested concurrently, so with a batcher several
+        of them share one model call.
+        
+        Args:
+            concepts: The concepts to explain
+            detail_level: How detailed the explanations should be (basic, medium, advanced)
+            audience: Target audience
+            
+        Returns:
+            The explanations, in the same order as the concepts
+        """
+        if self.batcher is not None:
+            max_workers = self.batcher.max_batch
+        else:
+            max_workers = self.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+        explain = lambda concept: self.explain_concept(concept, detail_level, audience)
+        return list(ordered_map(explain, concepts, max_workers))
+    
     def explain_relationships(self, concept1: str, concept2: str) -> str:
         """
         Explain the relationship between two concepts
@@ -60,6 +104,11 @@ class ConceptExplainer:
         Returns:
             An explanation of how the concepts relate
         """
+        if self.concept_graph is not None:
+            edge = self.concept_graph.get_edge(concept1, concept2)
+            if edge is not None:
+                return self._format_edge(edge)
+        
         prompt = f"""
         Explain the relationship between "{concept1}" and "{concept2}".
         
@@ -73,7 +122,125 @@ class ConceptExplainer:
         Format your response using Markdown with clear structure.
         """
         
-        return self.client.generate_text(prompt)
+        explanation = self.client.generate_text(prompt)
+        if self.concept_graph is not None and not explanation.startswith("Error"):
+            self.concept_graph.add_edge(concept1, concept2, explanation=explanation)
+        return explanation
+    
+    def map_relationships(self, concepts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Classify the relationships among a list of concepts
+        
+        Only pairs missing from the concept graph are sent to the model, in batches
+        of PAIRS_PER_BATCH pairs per call, with batches running concurrently.
+        
+        Args:
+            concepts: The concepts to relate to each other
+            
+        Returns:
+            The known edges among the concepts, including unrelated pairs
+        """
+        if self.concept_graph is None:
+            raise ValueError("map_relationships requires a concept graph")
+        
+        missing = self.concept_graph.missing_pairs(concepts)
+        batches = [missing[i:i + PAIRS_PER_BATCH] for i in range(0, len(missing), PAIRS_PER_BATCH)]
+        max_workers = self.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+        
+        for edges in ordered_map(self._classify_pairs, batches, max_workers):
+            for edge in edges:
+                self.concept_graph.add_edge(**edge)
+        
+        return self.concept_graph.edges_among(concepts)
+    
+    def related_concepts(self, concept: str) -> List[Dict[str, Any]]:
+        """
+        Look up the known relationships of a concept in the concept graph
+        
+        Args:
+            concept: The concept to look up
+            
+        Returns:
+            Edges touching the concept, excluding unrelated pairs
+        """
+        if self.concept_graph is None:
+            return []
+        return self.concept_graph.neighbors(concept)
+    
+    def _classify_pairs(self, pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Ask the model to classify a batch of concept pairs in one call
+        
+        Args:
+            pairs: Concept pairs to classify
+            
+        Returns:
+            Edge keyword arguments for ConceptGraph.add_edge; pairs the model
+            skipped or answered malformed are left out
+        """
+        pairs_formatted = "\n".join(
+            f'{i}. "{first}" | "{second}"' for i, (first, second) in enumerate(pairs, 1)
+        )
+        relations_formatted = ", ".join(f'"{relation}"' for relation in RELATIONS)
+        
+        prompt = f"""
+        Classify the relationship between each of the following pairs of concepts.
+        
+        Pairs:
+        {pairs_formatted}
+        
+        For each pair, choose exactly one relation from: {relations_formatted}.
+        The relation reads from the first concept to the second ("A prerequisite of B").
+        If it reads better the other way round, set "reversed" to true.
+        
+        Respond with a JSON list only, one entry per pair, in this exact shape:
+        [
+            {{"pair": 1, "relation": "prerequisite of", "reversed": false,
+              "description": "One sentence on how the concepts are connected"}}
+        ]
+        """
+        
+        response = self.client.generate_json(prompt)
+        if not isinstance(response, list):
+            return []
+        
+        edges = []
+        for item in response:
+            if not isinstance(item, dict) or item.get("relation") not in RELATIONS:
+                continue
+            try:
+                source, target = pairs[int(item["pair"]) - 1]
+            except (KeyError, TypeError, ValueError, IndexError):
+                continue
+            if item.get("reversed"):
+                source, target = target, source
+            edges.append({
+                "source": source,
+                "target": target,
+                "relation": item["relation"],
+                "description": str(item.get("description", "")),
+            })
+        return edges
+    
+    @staticmethod
+    def _format_edge(edge: Dict[str, Any]) -> str:
+        """
+        Format a concept graph edge as a Markdown explanation
+        
+        Args:
+            edge: The edge to format
+            
+        Returns:
+            The stored full explanation, or a short summary of the relation
+        """
+        if edge["explanation"]:
+            return edge["explanation"]
+        if edge["relation"] == "unrelated":
+            return f"**{edge['source']}** and **{edge['target']}** are not directly related."
+        return (
+            f"**{edge['source']}** is *{edge['relation']}* **{edge['target']}**.\n\n"
+            f"{edge['description']}"
+        )
     
     def simplify_complex_text(self, text: str, target_audience: str = "student") -> str:
         """
@@ -86,13 +253,56 @@ class ConceptExplainer:
         Returns:
             A simplified version of the text
         """
-        prompt = f"""
+        return "\n\n".join(self.stream_simplified_text(text, target_audience))
+    
+    def stream_simplified_text(self, text: str, target_audience: str = "student") -> Iterator[str]:
+        """
+        Simplify complex educational text, yielding it segment by segment
+        
+        Short texts are simplified in a single call. Longer texts, such as a whole
+        chapter, are split into segments at paragraph boundaries and rewritten
+        concurrently, each with the end of the previous segment and the start of
+        the next one as context. Segments are yielded strictly in order, each as
+        soon as it and all earlier segments are done, so the whole text is kept
+        in its original order.
+        
+        Args:
+            text: The complex text to simplify
+            target_audience: The target audience for the simplified text
+            
+        Returns:
+            An iterator over the simplified segments, in order
+        """
+        if len(text) <= SIMPLIFY_SEGMENT_MAX_CHARS:
+            yield self._simplify_segment([text], 0, target_audience)
+            return
+        
+        segments = split_chunks(text, SIMPLIFY_SEGMENT_MIN_CHARS, SIMPLIFY_SEGMENT_MAX_CHARS)
+        simplify = lambda i: self._simplify_segment(segments, i, target_audience)
+        max_workers = self.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+        yield from ordered_map(simplify, range(len(segments)), max_workers)
+    
+    def _simplify_segment(self, segments: List[str], index: int, target_audience: str) -> str:
+        """
+        Simplify one segment of a text
+        
+        Args:
+            segments: All segments of the text, in order
+            index: Position of the segment to simplify
+            target_audience: The target audience for the simplified text
+            
+        Returns:
+            The simplified segment. When one part of a longer text fails, the
+            original segment is returned with a note, so that nothing goes missing
+        """
+        if len(segments) == 1:
+            prompt = f"""
         Simplify the following educational text to make it more accessible for a {target_audience},
         while preserving the key information and concepts.
         
         Original text:
         ```
-        {text[:8000]}  # Limit to avoid token issues
+        {segments[0]}
         ```
         
         Please:
@@ -102,7 +312,42 @@ class ConceptExplainer:
         4. Break down complex ideas into simpler components
         5. Maintain all the important information and concepts
         
+        Format your response as clear, readable text using Markdown.
+        """
+        else:
+            before = segments[index - 1][-SIMPLIFY_CONTEXT_CHARS:] if index > 0 else "(start of text)"
+            after = segments[index + 1][:SIMPLIFY_CONTEXT_CHARS] if index + 1 < len(segments) else "(end of text)"
+            prompt = f"""
+        You are simplifying a long educational text for a {target_audience}, one part at a time.
+        This is part {index + 1} of {len(segments)}. The parts are joined in order afterwards,
+        so rewrite only this part: no introduction, no conclusion, no summary of other parts.
+        
+        Text just before this part (context only, do not rewrite):
+        ```
+        {before}
+        ```
+        
+        Part to simplify:
+        ```
+        {segments[index]}
+        ```
+        
+        Text just after this part (context only, do not rewrite):
+        ```
+        {after}
+        ```
+        
+        Please:
+        1. Use simpler vocabulary and shorter sentences
+        2. Keep technical terms exactly as the original names them, explaining them in plain words
+        3. Add helpful analogies where appropriate
+        4. Keep every piece of information, in the original order
+        5. Keep the original headings, simplifying their wording if needed
+        
         Format your response as clear, readable text using Markdown.
         """
         
-        return self.client.generate_text(prompt)
\ No newline at end of file
+        simplified = self.client.generate_text(prompt)
+        if len(segments) > 1 and simplified.startswith("Error"):
+            return f"*(This part could not be simplified: {simplified})*\n\n{segments[index]}"
+        return simplified
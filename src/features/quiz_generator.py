@@ -2,22 +2,35 @@
 Quiz generation functionality for Smart Study Assistant
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from src.batcher import MicroBatcher
+from src.concurrency import ordered_map, DEFAULT_MAX_WORKERS
 from src.gemini_client import GeminiClient
+from src.question_bank import QuestionBank
+
+# Model calls made to fill a quiz when generated questions duplicate stored ones
+QUIZ_TOP_UP_ATTEMPTS = 3
+
+DEFAULT_QUESTION_TYPES = ["multiple choice"]
 
 class QuizGenerator:
     """
     Generate quizzes on specific topics with customizable difficulty
     """
     
-    def __init__(self, client: GeminiClient):
+    def __init__(self, client: GeminiClient, question_bank: Optional[QuestionBank] = None,
+                 batcher: Optional[MicroBatcher] = None):
         """
         Initialize the quiz generator
         
         Args:
             client: GeminiClient instance for API calls
+            question_bank: Optional question bank to serve and store questions
+            batcher: Optional batcher packing concurrent answer checks into one call
         """
         self.client = client
+        self.question_bank = question_bank
+        self.batcher = batcher
     
     def generate_quiz(self, topic: str, num_questions: int = 5, 
                     difficulty: str = "medium", 
@@ -37,7 +50,12 @@ class QuizGenerator:
         """
         # Default to multiple choice if not specified
         if question_types is None:
-            question_types = ["multiple choice"]
+            question_types = DEFAULT_QUESTION_TYPES
+        
+        if self.question_bank is not None:
+            quiz = self._generate_quiz_from_bank(topic, num_questions, difficulty, question_types)
+            if quiz is not None:
+                return quiz
         
         question_types_str = ", ".join(question_types)
         
@@ -78,6 +96,179 @@ class QuizGenerator:
         
         return self.client.generate_text(prompt)
     
+    def _generate_quiz_from_bank(self, topic: str, num_questions: int, difficulty: str,
+                                 question_types: List[str]) -> Optional[str]:
+        """
+        Build a quiz from the question bank, generating only the shortfall
+        
+        Args:
+            topic: The topic for the quiz
+            num_questions: Number of questions to include
+            difficulty: Difficulty level (easy, medium, hard)
+            question_types: Types of questions to include
+            
+        Returns:
+            A formatted quiz, or None if new questions were needed but could not be generated
+        """
+        questions = self.question_bank.sample(topic, difficulty, question_types, num_questions)
+        shortfall = num_questions - len(questions)
+        
+        if shortfall > 0:
+            # Recently served questions are skipped by sample() and would be
+            # rejected as duplicates by the bank, so ask the model to avoid them too
+            avoid = [q["question"] for q in questions] + self.question_bank.recently_served(topic)
+            stored = self.stock_questions(topic, shortfall, difficulty, question_types, avoid)
+            if stored is None:
+                return None
+            questions += stored
+        
+        questions = questions[:num_questions]
+        if not questions:
+            return None
+        self.question_bank.mark_served(topic, [q["id"] for q in questions])
+        quiz = self._format_quiz(topic, difficulty, questions)
+        if len(questions) < num_questions:
+            quiz += (f"\n\n> *Only {len(questions)} of the {num_questions} requested questions "
+                     f"could be made without repeating earlier ones.*")
+        return quiz
+    
+    def stock_questions(self, topic: str, count: int, difficulty: str = "medium",
+                        question_types: List[str] = None,
+                        avoid: List[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Generate new questions into the question bank without serving them
+        
+        The bank rejects near-duplicates of stored questions, so the remaining
+        shortfall is requested again, up to QUIZ_TOP_UP_ATTEMPTS times, with the
+        rejected questions added to the ones to avoid.
+        
+        Args:
+            topic: The topic for the questions
+            count: Number of new questions wanted
+            difficulty: Difficulty level (easy, medium, hard)
+            question_types: Types of questions to include. Defaults to multiple choice.
+            avoid: Existing questions the new ones must not repeat
+            
+        Returns:
+            The stored questions, each with an "id" key (fewer than count if the
+            model kept repeating itself), or None if the first response could not
+            be parsed
+        """
+        avoid = list(avoid or [])
+        stored: List[Dict[str, Any]] = []
+        for attempt in range(QUIZ_TOP_UP_ATTEMPTS):
+            missing = count - len(stored)
+            if missing <= 0:
+                break
+            generated = self.generate_questions(topic, missing, difficulty, question_types, avoid)
+            if generated is None and attempt == 0:
+                return None
+            if not generated:
+                break
+            for question in generated:
+                avoid.append(question["question"])
+                question_id = self.question_bank.add(topic, difficulty, question)
+                if question_id is not None:
+                    stored.append(dict(question, id=question_id))
+        return stored
+    
+    def generate_questions(self, topic: str, num_questions: int, difficulty: str = "medium",
+                           question_types: List[str] = None,
+                           avoid: List[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Generate structured quiz questions
+        
+        Args:
+            topic: The topic for the questions
+            num_questions: Number of questions to generate
+            difficulty: Difficulty level (easy, medium, hard)
+            question_types: Types of questions to include. Defaults to multiple choice.
+            avoid: Existing questions the new ones must not repeat
+            
+        Returns:
+            A list of question dicts, or None if the response could not be parsed
+        """
+        if question_types is None:
+            question_types = DEFAULT_QUESTION_TYPES
+        
+        types_formatted = ", ".join(f'"{question_type}"' for question_type in question_types)
+        avoid_formatted = "\n".join(f"- {question}" for question in avoid or []) or "- (none)"
+        
+        prompt = f"""
+        Create {num_questions} {difficulty} difficulty quiz questions about "{topic}".
+        Use only these question types: {types_formatted}.
+        
+        For each question:
+        1. Write a clear, specific question that tests understanding, not just memorization
+        2. For multiple choice, provide 4 options where only one is correct
+        3. For true/false, state the statement to evaluate and use the options "True" and "False"
+        4. Give the correct answer as the option letter (A, B, C, D) or True/False
+        5. Include a brief explanation of why the answer is correct
+        
+        Do not repeat or rephrase any of these existing questions:
+        {avoid_formatted}
+        
+        Respond with a JSON list only, in this exact shape:
+        [
+            {{
+                "type": "multiple choice",
+                "question": "What is...?",
+                "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
+                "answer": "B",
+                "explanation": "This is correct because..."
+            }}
+        ]
+        """
+        
+        questions = self.client.generate_json(prompt)
+        if not isinstance(questions, list):
+            return None
+        
+        return [
+            {
+                "type": str(question.get("type") or question_types[0]),
+                "question": str(question["question"]),
+                "options": [str(option) for option in question.get("options") or []],
+                "answer": str(question.get("answer", "")),
+                "explanation": str(question.get("explanation", "")),
+            }
+            for question in questions
+            if isinstance(question, dict) and question.get("question")
+        ]
+    
+    @staticmethod
+    def _format_quiz(topic: str, difficulty: str, questions: List[Dict[str, Any]]) -> str:
+        """
+        Format structured questions as a Markdown quiz
+        
+        Args:
+            topic: The topic of the quiz
+            difficulty: Difficulty level
+            questions: Question dicts to include
+            
+        Returns:
+            The quiz in the same Markdown format as generated quizzes
+        """
+        sections = [f"## {topic} Quiz ({difficulty} difficulty)"]
+        for number, question in enumerate(questions, 1):
+            lines = [f"### Question {number}", question["question"]]
+            if question["type"] != "true/false":
+                lines += [f"{chr(ord('A') + i)}) {option}"
+                          for i, option in enumerate(question["options"])]
+            lines += [
+                "",
+                "<details>",
+                "<summary>Answer</summary>",
+                "",
+                f"**Correct Answer: {question['answer']}**",
+                "",
+                f"Explanation: {question['explanation']}",
+                "</details>",
+            ]
+            sections.append("\n".join(lines))
+        
+        return "\n\n".join(sections)
+    
     def generate_flashcards(self, topic: str, num_cards: int = 10) -> str:
         """
         Generate flashcards for studying a topic
@@ -146,4 +337,27 @@ class QuizGenerator:
         Format your response in a friendly, encouraging tone.
         """
         
-        return self.client.generate_text(prompt)
\ No newline at end of file
+        if self.batcher is not None:
+            return self.batcher.submit("check_answer", prompt)
+        return self.client.generate_text(prompt)
+    
+    def check_answers(self, answers: List[Tuple[str, str]], topic: str = None) -> List[str]:
+        """
+        Check a set of answers, such as a whole submitted quiz
+        
+        The checks run concurrently, so with a batcher several of them share
+        one model call.
+        
+        Args:
+            answers: (question, user answer) pairs
+            topic: Optional topic for context
+            
+        Returns:
+            Feedback for each answer, in the same order
+        """
+        if self.batcher is not None:
+            max_workers = self.batcher.max_batch
+        else:
+            max_workers = self.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+        check = lambda pair: self.check_answer(pair[0], pair[1], topic)
+        return list(ordered_map(check, answers, max_workers))
\ No newline at end of file
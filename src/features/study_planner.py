@@ -2,22 +2,38 @@
 Study planning functionality for Smart Study Assistant
 """
 
-from typing import Dict, Any, List, Optional
+import json
+import os
+import threading
+from typing import Dict, Any, Iterator, List, Optional
+from src.concurrency import ordered_map, DEFAULT_MAX_WORKERS
 from src.gemini_client import GeminiClient
+from src.scheduler import TopicInfo, schedule_topics
+
+# Plans up to this many days fit comfortably in a single response
+SINGLE_CALL_MAX_DAYS = 7
+
+# Number of days covered by each block of a long, outlined plan
+BLOCK_DAYS = 7
 
 class StudyPlanner:
     """
     Create personalized study plans based on various parameters
     """
     
-    def __init__(self, client: GeminiClient):
+    def __init__(self, client: GeminiClient, dependency_cache_path: Optional[str] = None):
         """
         Initialize the study planner
         
         Args:
             client: GeminiClient instance for API calls
+            dependency_cache_path: Optional JSON file persisting extracted topic
+                dependencies between runs
         """
         self.client = client
+        self.dependency_cache_path = dependency_cache_path
+        self._dependency_cache = None
+        self._cache_lock = threading.Lock()
     
     def create_study_plan(self, subject: str, days: int = 7, 
                          hours_per_day: int = 1, goal: str = "mastery",
@@ -35,6 +51,37 @@ class StudyPlanner:
         Returns:
             A formatted study plan
         """
+        return "\n\n".join(self.stream_study_plan(subject, days, hours_per_day,
+                                                   goal, prior_knowledge))
+    
+    def stream_study_plan(self, subject: str, days: int = 7,
+                          hours_per_day: int = 1, goal: str = "mastery",
+                          prior_knowledge: str = "intermediate") -> Iterator[str]:
+        """
+        Create a study plan, yielding it block by block as it becomes ready
+        
+        Short plans are generated in a single call. Longer plans are generated in
+        two phases: a compact outline assigns topics to blocks of days, then each
+        block is expanded concurrently. Blocks are yielded strictly in order, each
+        as soon as it and all earlier blocks are done.
+        
+        Args:
+            subject: The subject to study
+            days: Number of days for the plan
+            hours_per_day: Hours to study per day
+            goal: Study goal (e.g., "exam preparation", "mastery")
+            prior_knowledge: Level of existing knowledge (beginner, intermediate, advanced)
+            
+        Returns:
+            An iterator over Markdown sections of the study plan
+        """
+        if days > SINGLE_CALL_MAX_DAYS:
+            outline = self._create_outline(subject, days, hours_per_day, goal, prior_knowledge)
+            if outline is not None:
+                yield from self._expand_outline(outline, subject, hours_per_day,
+                                                goal, prior_knowledge)
+                return
+        
         prompt = f"""
         Create a {days}-day study plan for "{subject}" with {hours_per_day} hour(s) per day.
         The study goal is: {goal}.
@@ -57,6 +104,174 @@ class StudyPlanner:
         - A checklist for tracking progress
         """
         
+        yield self.client.generate_text(prompt)
+    
+    def _create_outline(self, subject: str, days: int, hours_per_day: int,
+                        goal: str, prior_knowledge: str) -> Optional[Dict[str, Any]]:
+        """
+        Generate a compact outline assigning topics to blocks of days
+        
+        Args:
+            subject: The subject to study
+            days: Number of days for the plan
+            hours_per_day: Hours to study per day
+            goal: Study goal
+            prior_knowledge: Level of existing knowledge
+            
+        Returns:
+            The outline with day ranges attached to each block, or None if the
+            model did not return a usable outline
+        """
+        ranges = [(start, min(start + BLOCK_DAYS - 1, days))
+                  for start in range(1, days + 1, BLOCK_DAYS)]
+        ranges_formatted = "\n".join(
+            f"- Block {i}: days {start}-{end}" for i, (start, end) in enumerate(ranges, 1)
+        )
+        
+        prompt = f"""
+        Outline a {days}-day study plan for "{subject}" with {hours_per_day} hour(s) per day.
+        The study goal is: {goal}.
+        The student's prior knowledge level is: {prior_knowledge}.
+        
+        The plan is split into these blocks:
+        {ranges_formatted}
+        
+        Break the subject into logical sub-topics ordered by priority and dependencies,
+        and assign them to the blocks. Leave room for practice, review and assessment,
+        especially in the final block.
+        
+        Respond with JSON only, in this exact shape:
+        {{
+            "introduction": "2-3 sentences explaining the overall approach",
+            "blocks": [
+                {{"block": 1, "title": "Short block title", "topics": ["Sub-topic", "..."]}}
+            ],
+            "tips": ["Study tip specific to this subject", "..."]
+        }}
+        """
+        
+        outline = self.client.generate_json(prompt)
+        if not isinstance(outline, dict) or not isinstance(outline.get("blocks"), list):
+            return None
+        
+        by_number = {}
+        for position, block in enumerate(outline["blocks"], 1):
+            if not isinstance(block, dict):
+                continue
+            # The model may number blocks as strings ("1") or not at all
+            try:
+                number = int(block.get("block", position))
+            except (TypeError, ValueError):
+                number = position
+            by_number[number] = block
+        
+        blocks = []
+        for number, (start, end) in enumerate(ranges, 1):
+            block = by_number.get(number, {})
+            blocks.append({
+                "number": number,
+                "start_day": start,
+                "end_day": end,
+                "title": str(block.get("title") or "Review and consolidation"),
+                "topics": [str(topic) for topic in block.get("topics") or []],
+            })
+        
+        return {
+            "introduction": str(outline.get("introduction", "")),
+            "blocks": blocks,
+            "tips": [str(tip) for tip in outline.get("tips") or []],
+        }
+    
+    def _expand_outline(self, outline: Dict[str, Any], subject: str, hours_per_day: int,
+                        goal: str, prior_knowledge: str) -> Iterator[str]:
+        """
+        Expand every block of an outline concurrently, yielding sections in order
+        
+        Args:
+            outline: Outline produced by _create_outline
+            subject: The subject to study
+            hours_per_day: Hours to study per day
+            goal: Study goal
+            prior_knowledge: Level of existing knowledge
+            
+        Returns:
+            An iterator over Markdown sections: introduction, blocks, then tips and checklist
+        """
+        blocks = outline["blocks"]
+        days = blocks[-1]["end_day"]
+        
+        roadmap = "\n".join(
+            f"- **Days {block['start_day']}-{block['end_day']}:** {block['title']}"
+            for block in blocks
+        )
+        yield f"# {days}-Day Study Plan: {subject}\n\n{outline['introduction']}\n\n## Roadmap\n{roadmap}"
+        
+        def expand(block: Dict[str, Any]) -> str:
+            return self._expand_block(block, blocks, subject, hours_per_day,
+                                      goal, prior_knowledge)
+        
+        max_workers = self.client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+        yield from ordered_map(expand, blocks, max_workers=max_workers)
+        
+        closing = []
+        if outline["tips"]:
+            closing.append("## Study Tips\n" + "\n".join(f"- {tip}" for tip in outline["tips"]))
+        checklist = "\n".join(
+            f"- [ ] {topic}" for block in blocks for topic in block["topics"]
+        )
+        if checklist:
+            closing.append("## Progress Checklist\n" + checklist)
+        if closing:
+            yield "\n\n".join(closing)
+    
+    def _expand_block(self, block: Dict[str, Any], blocks: List[Dict[str, Any]],
+                      subject: str, hours_per_day: int, goal: str,
+                      prior_knowledge: str) -> str:
+        """
+        Expand a single outline block into a day-by-day schedule
+        
+        Args:
+            block: The block to expand
+            blocks: All blocks of the outline, for context
+            subject: The subject to study
+            hours_per_day: Hours to study per day
+            goal: Study goal
+            prior_knowledge: Level of existing knowledge
+            
+        Returns:
+            The Markdown schedule for the block
+        """
+        index = block["number"] - 1
+        previous_topics = ", ".join(
+            topic for earlier in blocks[:index] for topic in earlier["topics"]
+        ) or "none"
+        upcoming = blocks[index + 1]["title"] if index + 1 < len(blocks) else "end of the plan"
+        topics_formatted = "\n".join(f"- {topic}" for topic in block["topics"]) or \
+            "- Review and practice of everything covered so far"
+        
+        prompt = f"""
+        You are writing one part of a longer study plan for "{subject}" with
+        {hours_per_day} hour(s) per day. The study goal is: {goal}.
+        The student's prior knowledge level is: {prior_knowledge}.
+        
+        Write the schedule for days {block['start_day']} to {block['end_day']} only,
+        titled "{block['title']}". Cover these topics:
+        {topics_formatted}
+        
+        Topics already covered earlier: {previous_topics}.
+        The next part of the plan is: {upcoming}.
+        
+        For each day:
+        1. Allocate time for initial learning, practice, review, and self-assessment
+        2. Include a variety of study activities (reading, practice problems, flash cards, etc.)
+        3. Recommend types of resources (not specific titles)
+        4. Revisit earlier topics periodically to reinforce learning
+        
+        Format the schedule using Markdown, starting with the heading
+        "## Days {block['start_day']}-{block['end_day']}: {block['title']}" and one
+        "### Day N" subheading per day. Do not add an introduction or conclusion.
+        """
+        
         return self.client.generate_text(prompt)
     
     def prioritize_topics(self, subject: str, topics: List[str], 
@@ -73,6 +288,10 @@ class StudyPlanner:
         Returns:
             Prioritized list of topics with reasoning
         """
+        analysis = self.analyze_topics(subject, topics, goal)
+        if analysis is not None:
+            return self._format_priorities(subject, analysis, time_available, goal)
+        
         topics_formatted = "\n".join([f"- {topic}" for topic in topics])
         
         prompt = f"""
@@ -94,6 +313,167 @@ class StudyPlanner:
         
         return self.client.generate_text(prompt)
     
+    def analyze_topics(self, subject: str, topics: List[str],
+                       goal: str) -> Optional[Dict[str, TopicInfo]]:
+        """
+        Get importance, time estimates and prerequisites for a subject's topics
+        
+        Results are cached per subject and goal, so any subset of previously
+        analyzed topics is answered without an API call.
+        
+        Args:
+            subject: The main subject
+            topics: List of topics within the subject
+            goal: Study goal
+            
+        Returns:
+            Topic info by topic name, or None if the model response was unusable
+        """
+        key = f"{_normalize(subject)}|{_normalize(goal)}"
+        with self._cache_lock:
+            cache = self._load_dependency_cache()
+            cached = cache.get(key, {})
+        
+        if any(_normalize(topic) not in cached for topic in topics):
+            extracted = self._extract_dependencies(subject, topics, goal)
+            if extracted is None:
+                return None
+            with self._cache_lock:
+                cached = dict(cache.get(key, {}), **extracted)
+                cache[key] = cached
+                self._save_dependency_cache()
+        
+        names = {_normalize(topic): topic for topic in topics}
+        analysis = {}
+        for topic in topics:
+            entry = cached[_normalize(topic)]
+            analysis[topic] = TopicInfo(
+                topic,
+                importance=entry["importance"],
+                hours=entry["hours"],
+                prerequisites=[names[p] for p in entry["prerequisites"] if p in names],
+                reason=entry["reason"],
+            )
+        return analysis
+    
+    def _extract_dependencies(self, subject: str, topics: List[str],
+                              goal: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Ask the model for topic weights and prerequisite edges
+        
+        Args:
+            subject: The main subject
+            topics: List of topics within the subject
+            goal: Study goal
+            
+        Returns:
+            Cache entries keyed by normalized topic name, or None if the
+            response could not be parsed
+        """
+        topics_formatted = "\n".join([f"- {topic}" for topic in topics])
+        
+        prompt = f"""
+        For the subject "{subject}" and a study goal of "{goal}", analyze these topics:
+        {topics_formatted}
+        
+        For each topic give:
+        1. Its importance for the goal, from 1 (optional) to 10 (essential)
+        2. The hours a student needs to cover it well
+        3. Which of the listed topics must be learned before it
+        4. A one-sentence reason for its importance
+        
+        Respond with JSON only, using the topic names exactly as listed:
+        {{
+            "topics": [
+                {{"name": "Topic", "importance": 8, "hours": 3,
+                  "prerequisites": ["Other topic"], "reason": "Why it matters"}}
+            ]
+        }}
+        """
+        
+        response = self.client.generate_json(prompt)
+        if not isinstance(response, dict) or not isinstance(response.get("topics"), list):
+            return None
+        
+        entries = {}
+        for item in response["topics"]:
+            try:
+                entries[_normalize(item["name"])] = {
+                    "importance": float(item.get("importance", 5)),
+                    "hours": max(float(item.get("hours", 1)), 0.5),
+                    "prerequisites": [_normalize(p) for p in item.get("prerequisites") or []],
+                    "reason": str(item.get("reason", "")),
+                }
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+        
+        if any(_normalize(topic) not in entries for topic in topics):
+            return None
+        return entries
+    
+    def _load_dependency_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Load the dependency cache from disk on first use"""
+        if self._dependency_cache is None:
+            self._dependency_cache = {}
+            if self.dependency_cache_path and os.path.exists(self.dependency_cache_path):
+                try:
+                    with open(self.dependency_cache_path, "r", encoding="utf-8") as f:
+                        self._dependency_cache = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._dependency_cache
+    
+    def _save_dependency_cache(self) -> None:
+        """Atomically write the dependency cache to disk, if persistence is enabled"""
+        if not self.dependency_cache_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.dependency_cache_path)), exist_ok=True)
+        temp_path = f"{self.dependency_cache_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._dependency_cache, f)
+        os.replace(temp_path, self.dependency_cache_path)
+    
+    @staticmethod
+    def _format_priorities(subject: str, analysis: Dict[str, TopicInfo],
+                           time_available: int, goal: str) -> str:
+        """
+        Schedule analyzed topics locally and format the result as Markdown
+        
+        Args:
+            subject: The main subject
+            analysis: Topic info by topic name
+            time_available: Available time in hours
+            goal: Study goal
+            
+        Returns:
+            Prioritized list of topics with reasoning
+        """
+        schedule = schedule_topics(analysis, time_available)
+        
+        lines = [
+            f"## Topic Priorities for {subject}",
+            f"*{time_available} hours available, goal: {goal}*",
+            "",
+            "### Ranking",
+        ]
+        for rank, name in enumerate(schedule.ranking, 1):
+            info = analysis[name]
+            lines.append(f"{rank}. **{name}** (importance {info.importance:g}/10) - {info.reason}")
+        
+        lines += ["", "### Study Order and Time Allocation",
+                  "| # | Topic | Hours | Learn after |", "|---|---|---|---|"]
+        for step, name in enumerate(schedule.order, 1):
+            after = ", ".join(analysis[name].prerequisites) or "-"
+            lines.append(f"| {step} | {name} | {schedule.allocation[name]:g} | {after} |")
+        
+        if schedule.skipped:
+            lines += ["", "### Skip or Minimize"]
+            for name in schedule.skipped:
+                lines.append(f"- **{name}**: needs about {analysis[name].hours:g} hours "
+                             f"that don't fit the available time")
+        
+        return "\n".join(lines)
+    
     def create_spaced_repetition_schedule(self, topic: str, 
                                         start_date: str, 
                                         end_date: str) -> str:
@@ -122,4 +502,8 @@ class StudyPlanner:
         Include a brief explanation of how spaced repetition works and why it's effective.
         """
         
-        return self.client.generate_text(prompt)
\ No newline at end of file
+        return self.client.generate_text(prompt)
+
+def _normalize(name: str) -> str:
+    """Normalize a subject, goal or topic name for use as a cache key"""
+    return " ".join(name.lower().split())
@@ -3,21 +3,28 @@ Study tips and techniques functionality for Smart Study Assistant
 """
 
 from typing import Dict, Any, Optional, List
+from src.batcher import MicroBatcher
 from src.gemini_client import GeminiClient
+from src.tips_catalog import TipsCatalog
 
 class StudyTips:
     """
     Provide evidence-based study techniques and tips
     """
     
-    def __init__(self, client: GeminiClient):
+    def __init__(self, client: GeminiClient, catalog: Optional[TipsCatalog] = None,
+                 batcher: Optional[MicroBatcher] = None):
         """
         Initialize the study tips provider
         
         Args:
             client: GeminiClient instance for API calls
+            catalog: Optional precomputed catalog answering fixed prompts offline
+            batcher: Optional batcher packing concurrent topic requests into one call
         """
         self.client = client
+        self.catalog = catalog
+        self.batcher = batcher
     
     def get_general_tips(self) -> str:
         """
@@ -40,7 +47,7 @@ class StudyTips:
         on key information.
         """
         
-        return self.client.generate_text(prompt)
+        return self._generate(prompt)
     
     def get_specific_tips(self, topic: str) -> str:
         """
@@ -66,6 +73,8 @@ class StudyTips:
         on key information.
         """
         
+        if self.batcher is not None:
+            return self.batcher.submit("specific_tips", prompt)
         return self.client.generate_text(prompt)
     
     def get_tips_for_learning_style(self, learning_style: str) -> str:
@@ -94,7 +103,7 @@ class StudyTips:
         information processing.
         """
         
-        return self.client.generate_text(prompt)
+        return self._generate(prompt)
     
     def overcome_challenge(self, challenge: str) -> str:
         """
@@ -120,4 +129,20 @@ class StudyTips:
         Keep the tone supportive and encouraging.
         """
         
-        return self.client.generate_text(prompt)
\ No newline at end of file
+        return self._generate(prompt)
+    
+    def _generate(self, prompt: str) -> str:
+        """
+        Answer a prompt from the catalog when possible, otherwise from the API
+        
+        Args:
+            prompt: The prompt to answer
+            
+        Returns:
+            The response text
+        """
+        if self.catalog is not None:
+            text = self.catalog.get(prompt)
+            if text is not None:
+                return text
+        return self.client.generate_text(prompt)
@@ -0,0 +1,55 @@
+"""
+File change watching for the Smart Study Assistant
+"""
+
+import os
+import time
+from typing import Iterator, Optional, Tuple
+
+DEFAULT_DEBOUNCE = 1.0
+DEFAULT_POLL_INTERVAL = 0.5
+
+def _signature(path: str) -> Optional[Tuple[float, int]]:
+    """Modification time and size of a file, or None while it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+def watch_file(path: str, debounce: float = DEFAULT_DEBOUNCE,
+               poll_interval: float = DEFAULT_POLL_INTERVAL) -> Iterator[None]:
+    """
+    Wait for changes to a file
+
+    Polls the file's modification time and size, which needs no platform
+    specific support. A burst of writes, such as an editor saving in several
+    steps, counts as one change once the file has been quiet for the debounce
+    period.
+
+    Args:
+        path: The file to watch
+        debounce: Seconds the file must stay unchanged before a change is reported
+        poll_interval: Seconds between checks
+
+    Returns:
+        An endless iterator yielding once per settled change
+    """
+    last = _signature(path)
+    while True:
+        time.sleep(poll_interval)
+        current = _signature(path)
+        if current == last or current is None:
+            continue
+        # Wait for the writes to settle
+        settled_at = time.monotonic() + debounce
+        while time.monotonic() < settled_at:
+            time.sleep(min(poll_interval, debounce))
+            latest = _signature(path)
+            if latest != current:
+                current = latest
+                settled_at = time.monotonic() + debounce
+        if current is None:
+            continue
+        last = current
+        yield
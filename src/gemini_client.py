@@ -2,8 +2,77 @@
 Google Gemini API client wrapper
 """
 
+import contextvars
+import json
+import re
+import threading
+import time
 import google.generativeai as genai
-from typing import Dict, Any, List, Optional
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as api_exceptions, retry as api_retry
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from src.circuit_breaker import CircuitBreaker, CLOSED
+from src.deadline import Deadline, DeadlineExceeded, RequestCancelled, current_deadline
+from src.key_pool import KeyPool, is_auth_error, is_quota_error
+from src.profiler import phase
+from src.response_cache import ResponseCache, cache_key
+from src.traffic_recorder import TrafficRecorder
+
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+STALE_NOTICE = (
+    "> ⚠️ *The study service is not responding right now, so this answer comes "
+    "from an earlier session and may be out of date.*\n\n"
+)
+
+UNAVAILABLE_MESSAGE = "the service is temporarily unavailable, please try again shortly"
+
+# Default per-request timeouts in seconds, by client method
+DEFAULT_TIMEOUTS = {"generate_text": 60.0, "chat": 90.0}
+
+_request_timeout = contextvars.ContextVar("request_timeout", default=None)
+
+class _TimeoutTransport:
+    """
+    Proxy for the low-level generative service client that adds a timeout
+    
+    google-generativeai 0.3.2 does not accept per-request options, so the
+    timeout for the current request is read from a context variable and passed
+    to the underlying gRPC call.
+    """
+    
+    def __init__(self, factory: Any):
+        # The real client is created on first use, after genai.configure()
+        self._factory = factory
+        self._client = None
+    
+    def _get_client(self) -> Any:
+        if self._client is None:
+            self._client = self._factory()
+        return self._client
+    
+    @staticmethod
+    def _with_timeout(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        timeout = _request_timeout.get()
+        kwargs.setdefault("timeout", timeout)
+        if timeout is not None:
+            # The default retry keeps retrying unavailable errors for 60s
+            # regardless of the per-attempt timeout, so bound it as well
+            kwargs.setdefault("retry", api_retry.Retry(
+                initial=1.0, maximum=10.0, multiplier=1.3,
+                predicate=api_retry.if_exception_type(api_exceptions.ServiceUnavailable),
+                timeout=timeout,
+            ))
+        return kwargs
+    
+    def generate_content(self, *args, **kwargs):
+        return self._get_client().generate_content(*args, **self._with_timeout(kwargs))
+    
+    def stream_generate_content(self, *args, **kwargs):
+        return self._get_client().stream_generate_content(*args, **self._with_timeout(kwargs))
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get_client(), name)
 
 class GeminiClient:
     """
@@ -18,31 +87,406 @@ class GeminiClient:
             config: Configuration dictionary with API settings
         """
         self.config = config
-        genai.configure(api_key=config["api_key"])
-        self.model = genai.GenerativeModel(
-            model_name=config["model"],
+        keys = config.get("api_keys") or [config["api_key"]]
+        genai.configure(api_key=keys[0])
+        # Each key gets its own model client; requests are spread over them
+        self.key_pool = KeyPool(keys, self._make_model, config.get("requests_per_minute"))
+        self.model = self.key_pool.keys[0].model
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **config.get("timeouts", {}))
+        self.history = []
+        
+        self.cache = ResponseCache(config.get("response_cache_path"),
+                                   config.get("cache_ttl", 7 * 24 * 3600))
+        # Without this, only answers prepared ahead of time (prefetched or
+        # warmed) are served from the cache; other stored responses are a
+        # fallback for when the backend cannot answer
+        self.serve_cached = config.get("response_cache", False)
+        # Opt-in log of request shapes for offline replay (no prompt text)
+        self.recorder = None
+        if config.get("traffic_log"):
+            self.recorder = TrafficRecorder(config["traffic_log"], config,
+                                            config.get("traffic_salt"),
+                                            config.get("traffic_salt_path"))
+        self.breaker = CircuitBreaker(
+            slow_call_seconds=config.get("slow_call_seconds", 30.0),
+            cooldown_seconds=config.get("circuit_cooldown", 30.0),
+        )
+        self.breaker.add_listener(self._on_circuit_change)
+        
+        # Prompts whose stale answers were served, with their output limits,
+        # to refresh once the backend recovers
+        self._pending_refresh = {}
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "cache_hits": 0,
+            "stale_served": 0,
+            "rejected": 0,
+            "failures": 0,
+            "refreshed": 0,
+            "prefetched": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "estimated_token_counts": 0,
+        }
+    
+    def _make_model(self, api_key: str) -> Any:
+        """
+        Create a model bound to one API key
+        
+        Args:
+            api_key: The API key the model sends requests with
+            
+        Returns:
+            A generative model with its own service client
+        """
+        model = genai.GenerativeModel(
+            model_name=self.config["model"],
             generation_config={
-                "max_output_tokens": config["max_tokens"],
-                "temperature": config["temperature"],
+                "max_output_tokens": self.config["max_tokens"],
+                "temperature": self.config["temperature"],
             }
         )
-        self.history = []
+        model._client = _TimeoutTransport(
+            lambda: glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        )
+        return model
+    
+    def _send(self, call: Callable[[Any], Any]) -> Any:
+        """
+        Run a backend call on the best available key
+        
+        If a key is rejected or out of quota, the call is retried once on each
+        of the other keys.
+        
+        Args:
+            call: Function making the request with the given model
+            
+        Returns:
+            The call's result
+        """
+        for attempt in range(len(self.key_pool)):
+            try:
+                with self.key_pool.lease() as model, phase("network"):
+                    return call(model)
+            except Exception as e:
+                if attempt + 1 < len(self.key_pool) and (is_auth_error(e) or is_quota_error(e)):
+                    continue
+                raise
     
     def generate_text(self, prompt: str) -> str:
         """
         Generate text from a prompt
         
+        Fresh cached responses are returned without calling the API. While the
+        backend is failing, stale cached responses are served with a notice.
+        
         Args:
             prompt: The prompt to send to the model
             
         Returns:
             The generated text response
+            
+        Raises:
+            RequestCancelled: If the current request was cancelled
+            DeadlineExceeded: If the current deadline has passed
+        """
+        text, status = self._recorded_generate("generate_text", prompt)
+        if status == "stale":
+            return STALE_NOTICE + text
+        return text
+    
+    def _recorded_generate(self, method: str, prompt: str,
+                           max_output_tokens: Optional[int] = None) -> Tuple[str, str]:
+        """Run _generate, logging the request shape when traffic recording is on"""
+        if self.recorder is None:
+            return self._generate(prompt, max_output_tokens)
+        start = time.monotonic()
+        text, status = self._generate(prompt, max_output_tokens)
+        self.recorder.record(method, prompt, status, time.monotonic() - start, text)
+        return text, status
+    
+    def _generate(self, prompt: str, max_output_tokens: Optional[int] = None) -> Tuple[str, str]:
+        """
+        Generate text through the cache and circuit breaker
+        
+        Args:
+            prompt: The prompt to send to the model
+            max_output_tokens: Output limit for this call instead of max_tokens
+            
+        Returns:
+            The response text and how it was obtained: "cached", "fresh",
+            "stale" or "error"
+        """
+        self._count("requests")
+        if max_output_tokens is None:
+            key = cache_key(self.config, prompt)
+        else:
+            key = cache_key(dict(self.config, max_tokens=max_output_tokens), prompt)
+        with phase("cache"):
+            cached = self.cache.get(key)
+        if cached is not None and cached[1] and (self.serve_cached or cached[2]):
+            self._count("cache_hits")
+            if cached[2]:
+                self.cache.mark_used(key)
+            return cached[0], "cached"
+        
+        # Raises once the request is cancelled or out of time; the caller is
+        # no longer waiting for an answer, stale or not
+        timeout = self._request_timeout("generate_text")
+        
+        if not self.breaker.allow_request():
+            self._count("rejected")
+            return self._fallback(key, (prompt, max_output_tokens), cached, UNAVAILABLE_MESSAGE)
+        
+        try:
+            text = self._call_model(prompt, timeout, max_output_tokens)
+        except (DeadlineExceeded, RequestCancelled):
+            raise
+        except Exception as e:
+            self._count("failures")
+            return self._fallback(key, (prompt, max_output_tokens), cached, str(e))
+        
+        self.cache.set(key, text)
+        if self._pending_refresh and self.breaker.state == CLOSED:
+            self._start_refresh()
+        return text, "fresh"
+    
+    def is_cached(self, prompt: str) -> bool:
+        """
+        Check whether a prompt would be answered from the cache, without a model call
+        
+        Args:
+            prompt: The prompt text
+            
+        Returns:
+            True if a fresh answer that would be served is cached
         """
+        return self.cache.is_fresh(cache_key(self.config, prompt),
+                                   prepared_only=not self.serve_cached)
+    
+    def prefetch(self, prompt: str) -> bool:
+        """
+        Answer a prompt ahead of time and store the answer in the cache
+        
+        Args:
+            prompt: The prompt expected to be asked next
+            
+        Returns:
+            True if a fresh answer was cached; False if the backend failed or
+            the current request was cancelled or ran out of time
+        """
+        try:
+            timeout = self._request_timeout("generate_text")
+        except (DeadlineExceeded, RequestCancelled):
+            return False
+        if not self.breaker.allow_request():
+            return False
+        start = time.monotonic()
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            text = self._call_model(prompt, timeout)
+        except (DeadlineExceeded, RequestCancelled):
+            return False
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            self._count("failures")
+            self._record_background("prefetch", prompt, start, f"Error generating response: {e}")
+            return False
+        self._record_background("prefetch", prompt, start, text)
+        self.cache.set(cache_key(self.config, prompt), text, prefetched=True)
+        self._count("prefetched")
+        return True
+    
+    def _request_timeout(self, method: str) -> Optional[float]:
+        """
+        Compute the timeout for a backend call from the method default and current deadline
+        
+        Args:
+            method: Client method name, a key of the timeouts setting
+            
+        Returns:
+            The timeout in seconds, or None for no limit
+            
+        Raises:
+            RequestCancelled: If the current request was cancelled
+            DeadlineExceeded: If the current deadline has passed
+        """
+        deadline = current_deadline()
+        if deadline is None:
+            return self.timeouts.get(method)
+        deadline.check()
+        return deadline.timeout_for(self.timeouts.get(method))
+    
+    def _call_model(self, prompt: str, timeout: Optional[float] = None,
+                    max_output_tokens: Optional[int] = None) -> str:
+        """
+        Send a prompt to the model, recording the outcome with the circuit breaker
+        
+        Args:
+            prompt: The prompt to send to the model
+            timeout: Timeout for the call in seconds
+            max_output_tokens: Output limit for this call instead of max_tokens
+            
+        Returns:
+            The generated text
+        """
+        kwargs = {}
+        if max_output_tokens is not None:
+            kwargs["generation_config"] = {"max_output_tokens": max_output_tokens}
+        token = _request_timeout.set(timeout)
+        start = time.monotonic()
+        try:
+            text = self._send(
+                lambda model: self._read_response(prompt, model.generate_content(prompt, **kwargs))
+            )
+        except (DeadlineExceeded, RequestCancelled):
+            # Ran out of time waiting for quota, not a backend failure
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Interrupted, e.g. by Ctrl-C
+            self.breaker.release_probe()
+            raise
+        finally:
+            _request_timeout.reset(token)
+        self.breaker.record_success(time.monotonic() - start)
+        return text
+    
+    def _fallback(self, key: str, request: Tuple[str, Optional[int]],
+                  cached: Optional[Tuple[str, bool, bool]], reason: str) -> Tuple[str, str]:
+        """
+        Serve a stale cached response when the backend could not answer
+        
+        Args:
+            key: Cache key of the prompt
+            request: The prompt that could not be answered and its output limit
+            cached: The cached entry, if any
+            reason: Why the backend could not answer
+            
+        Returns:
+            The stale response, or an error message if nothing is cached
+        """
+        if cached is None:
+            return f"Error generating response: {reason}", "error"
+        self._count("stale_served")
+        with self._lock:
+            self._pending_refresh[key] = request
+        return cached[0], "stale"
+    
+    def _on_circuit_change(self, state: str) -> None:
+        """Refresh stale entries in the background once the circuit closes"""
+        if state == CLOSED and self._pending_refresh:
+            self._start_refresh()
+    
+    def _start_refresh(self) -> None:
+        """Start a background thread refreshing prompts served stale"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_pending, name="cache-refresh", daemon=True).start()
+    
+    def _refresh_pending(self) -> None:
+        """Regenerate prompts served stale, stopping if the backend fails again"""
+        try:
+            while self.breaker.state == CLOSED:
+                with self._lock:
+                    if not self._pending_refresh:
+                        break
+                    key, (prompt, max_output_tokens) = self._pending_refresh.popitem()
+                start = time.monotonic()
+                try:
+                    text = self._call_model(prompt, self.timeouts.get("generate_text"),
+                                            max_output_tokens)
+                except Exception as e:
+                    self._record_background("refresh", prompt, start,
+                                            f"Error generating response: {e}")
+                    with self._lock:
+                        self._pending_refresh[key] = (prompt, max_output_tokens)
+                    break
+                self._record_background("refresh", prompt, start, text)
+                self.cache.set(key, text)
+                self._count("refreshed")
+        finally:
+            with self._lock:
+                self._refreshing = False
+    
+    def _record_background(self, method: str, prompt: str, start: float, text: str) -> None:
+        """Log a prefetch or refresh model call when traffic recording is on"""
+        if self.recorder is not None:
+            status = "error" if text.startswith("Error") else "fresh"
+            self.recorder.record(method, prompt, status, time.monotonic() - start, text)
+    
+    def _count(self, name: str, amount: int = 1) -> None:
+        """Increment a metrics counter"""
+        with self._lock:
+            self._metrics[name] += amount
+    
+    def _read_response(self, prompt: str, response: Any) -> str:
+        """
+        Get a response's text and count the tokens of the exchange
+        
+        Token counts come from the response's usage metadata when the API
+        returns it, and are otherwise estimated from the text lengths.
+        
+        Args:
+            prompt: Everything sent to the model for this response
+            response: The model response
+            
+        Returns:
+            The response text
+        """
+        text = response.text
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self._count("prompt_tokens", int(usage.prompt_token_count or 0))
+            self._count("output_tokens", int(usage.candidates_token_count or 0))
+        else:
+            self._count("prompt_tokens", estimate_tokens(prompt))
+            self._count("output_tokens", estimate_tokens(text))
+            self._count("estimated_token_counts")
+        return text
+    
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get request, cache and circuit breaker metrics
+        
+        Returns:
+            Counters for requests, cache hits, stale answers served, requests
+            rejected by the open circuit, backend failures, background
+            refreshes and prefetches, prompt and output tokens (and how many
+            calls had them estimated), plus the circuit breaker state and the
+            state of each API key
+        """
+        with self._lock:
+            metrics = dict(self._metrics, pending_refresh=len(self._pending_refresh))
+        metrics["circuit"] = self.breaker.snapshot()
+        metrics["keys"] = self.key_pool.snapshot()
+        return metrics
+    
+    def generate_json(self, prompt: str, max_output_tokens: Optional[int] = None) -> Optional[Any]:
+        """
+        Generate a structured JSON response from a prompt
+        
+        Args:
+            prompt: The prompt to send to the model; it should ask for JSON output
+            max_output_tokens: Output limit for this call instead of max_tokens,
+                for responses that hold several answers
+            
+        Returns:
+            The parsed JSON value, or None if the response could not be parsed
+            
+        Raises:
+            RequestCancelled: If the current request was cancelled
+            DeadlineExceeded: If the current deadline has passed
+        """
+        text, status = self._recorded_generate("generate_json", prompt, max_output_tokens)
+        if status == "error":
+            return None
+        return parse_json_response(text)
     
     def chat(self, message: str, history: Optional[List[Dict[str, str]]] = None) -> str:
         """
@@ -54,27 +498,99 @@ class GeminiClient:
             
         Returns:
             The generated response
+            
+        Raises:
+            RequestCancelled: If the current request was cancelled
+            DeadlineExceeded: If the current deadline has passed
         """
         chat_history = history if history is not None else self.history
+        if self.recorder is None:
+            return self._chat(message, chat_history)
+        
+        history_turns = len(chat_history)
+        history_chars = sum(len(str(part)) for entry in chat_history for part in entry["parts"])
+        start = time.monotonic()
+        text = self._chat(message, chat_history)
+        self.recorder.record("chat", message, "error" if text.startswith("Error") else "fresh",
+                             time.monotonic() - start, text,
+                             history_turns=history_turns, history_chars=history_chars)
+        return text
+    
+    def _chat(self, message: str, chat_history: List[Dict[str, Any]]) -> str:
+        """Send a chat message through the circuit breaker and key pool"""
+        self._count("requests")
+        timeout = self._request_timeout("chat")
+        
+        if not self.breaker.allow_request():
+            self._count("rejected")
+            return f"Error in chat: {UNAVAILABLE_MESSAGE}"
         
+        token = _request_timeout.set(timeout)
+        start = time.monotonic()
         try:
             # Add the new message to history
             chat_history.append({"role": "user", "parts": [message]})
             
-            # Create a chat session
-            chat = self.model.start_chat(history=chat_history)
-            
-            # Get response
-            response = chat.send_message(message)
+            # Create a chat session and get the response
+            sent = "\n".join(str(part) for entry in chat_history for part in entry["parts"])
+            text = self._send(
+                lambda model: self._read_response(
+                    sent, model.start_chat(history=chat_history).send_message(message)
+                )
+            )
+            self.breaker.record_success(time.monotonic() - start)
             
             # Add response to history
-            chat_history.append({"role": "model", "parts": [response.text]})
+            chat_history.append({"role": "model", "parts": [text]})
             
-            return response.text
+            return text
             
         except Exception as e:
+            if isinstance(e, (DeadlineExceeded, RequestCancelled)):
+                # Leave the history as it was before the message
+                chat_history.pop()
+                self.breaker.release_probe()
+                raise
+            self.breaker.record_failure()
+            self._count("failures")
             return f"Error in chat: {str(e)}"
+        except BaseException:
+            # Interrupted, e.g. by Ctrl-C
+            chat_history.pop()
+            self.breaker.release_probe()
+            raise
+        finally:
+            _request_timeout.reset(token)
     
     def clear_history(self) -> None:
         """Clear the chat history"""
-        self.history = []
\ No newline at end of file
+        self.history = []
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text
+    
+    Args:
+        text: The text to measure
+        
+    Returns:
+        Roughly one token per four characters, the usual ratio for English
+    """
+    return (len(text) + 3) // 4
+
+def parse_json_response(text: str) -> Optional[Any]:
+    """
+    Parse JSON from a model response, tolerating Markdown code fences
+    
+    Args:
+        text: The raw model response
+        
+    Returns:
+        The parsed JSON value, or None if no valid JSON was found
+    """
+    match = _JSON_FENCE.search(text)
+    candidate = match.group(1) if match else text
+    try:
+        return json.loads(candidate.strip())
+    except ValueError:
+        return None
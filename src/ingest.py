@@ -0,0 +1,271 @@
+"""
+Document text extraction for the Smart Study Assistant
+
+Lecture material arrives as PDF, DOCX, HTML or plain text. Each document is
+split cheaply into tasks (a range of PDF pages, or a DOCX/HTML section starting
+at a heading), the tasks are extracted and normalized in a process pool with
+pure-Python parsers, and the sections are streamed back in document order, so
+a large course pack is extracted on all cores instead of in one serial pass.
+"""
+
+import bisect
+import html
+import os
+import re
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+PDF_EXTENSIONS = {".pdf"}
+DOCX_EXTENSIONS = {".docx"}
+HTML_EXTENSIONS = {".html", ".htm"}
+# Formats that need extraction; anything else is read as plain text
+DOCUMENT_EXTENSIONS = PDF_EXTENSIONS | DOCX_EXTENSIONS | HTML_EXTENSIONS
+
+# Sections of a document without headings are cut every this many paragraphs
+PARAGRAPHS_PER_SECTION = 200
+
+# PDF pages are spread over about this many tasks per worker; each task parses
+# the file once, so fewer, longer tasks avoid re-reading it for every page
+PDF_TASKS_PER_WORKER = 4
+
+# A task: (format, path, payload); PDF tasks carry a (start, stop) page range,
+# others markup
+Task = Tuple[str, str, object]
+
+class ExtractionError(Exception):
+    """Raised when a document cannot be read"""
+
+_HYPHENATED_BREAK = re.compile(r"(\w)-\n(\w)")
+_PAGE_NUMBER_LINE = re.compile(r"^\s*(?:page\s+)?\d+(?:\s*(?:/|of)\s*\d+)?\s*$", re.I | re.M)
+_SPACES = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n\s*\n\s*(?:\n\s*)+")
+
+def normalize_text(text: str, drop_page_numbers: bool = False) -> str:
+    """
+    Clean up extracted text
+
+    Applies Unicode NFKC normalization (ligatures, full-width forms), joins words
+    hyphenated across line breaks and collapses runs of spaces and blank lines.
+
+    Args:
+        text: Raw extracted text
+        drop_page_numbers: Also drop lines holding only a page number
+
+    Returns:
+        The normalized text
+    """
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = _HYPHENATED_BREAK.sub(r"\1\2", text)
+    if drop_page_numbers:
+        text = _PAGE_NUMBER_LINE.sub("", text)
+    text = "\n".join(_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+# --- Workers (run in the process pool; module level so they can be pickled) ---
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ExtractionError("Reading PDF files requires pypdf (pip install pypdf)")
+    try:
+        pages = PdfReader(path).pages
+        return [pages[page].extract_text() or "" for page in range(start, stop)]
+    except Exception as e:
+        # pypdf raises many error types for damaged files; report them all alike
+        raise ExtractionError(f"Cannot read pages {start + 1}-{stop} of {path}: {e}")
+
+_DOCX_PARAGRAPH = re.compile(r"<w:p[ >].*?</w:p>|<w:p/>", re.S)
+_DOCX_RUN_TEXT = re.compile(r"<w:t(?: [^>]*)?>(.*?)</w:t>|<w:(tab|br|cr)\b[^>]*/>", re.S)
+_DOCX_HEADING = re.compile(r'<w:pStyle w:val="(?:Heading|heading\s*)(\d)"')
+_DOCX_TITLE = re.compile(r'<w:pStyle w:val="Title"')
+_DOCX_LIST = re.compile(r"<w:numPr>")
+
+def _extract_docx_section(markup: str) -> str:
+    lines = []
+    for paragraph in _DOCX_PARAGRAPH.findall(markup):
+        parts = []
+        for text, special in _DOCX_RUN_TEXT.findall(paragraph):
+            parts.append(html.unescape(text) if not special else ("\t" if special == "tab" else "\n"))
+        line = "".join(parts).strip()
+        if not line:
+            lines.append("")
+            continue
+        heading = _DOCX_HEADING.search(paragraph)
+        if heading:
+            line = "#" * min(int(heading.group(1)), 6) + " " + line
+        elif _DOCX_TITLE.search(paragraph):
+            line = "# " + line
+        elif _DOCX_LIST.search(paragraph):
+            line = "- " + line
+        lines.append(line)
+        # Paragraphs are separate blocks for the chunker
+        lines.append("")
+    return "\n".join(lines)
+
+class _HTMLText(HTMLParser):
+    """Collect the readable text of an HTML fragment, keeping headings and list items"""
+
+    _SKIP = {"script", "style", "noscript", "template", "svg"}
+    _BLOCK = {"p", "div", "section", "article", "table", "tr", "ul", "ol", "blockquote",
+              "pre", "header", "footer", "main", "aside", "figure", "dl"}
+    _HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._HEADINGS:
+            self.parts.append("\n\n" + "#" * self._HEADINGS[tag] + " ")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag == "br":
+            self.parts.append("\n")
+        elif tag in ("td", "th"):
+            self.parts.append(" | ")
+        elif tag in self._BLOCK:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self._HEADINGS or tag in self._BLOCK:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data.replace("\n", " "))
+
+def _extract_html_section(markup: str) -> str:
+    parser = _HTMLText()
+    parser.feed(markup)
+    parser.close()
+    return "".join(parser.parts)
+
+def _extract_task(task: Task) -> str:
+    """Extract and normalize the text of one task"""
+    kind, path, payload = task
+    if kind == "pdf":
+        pages = _extract_pdf_pages(path, *payload)
+        return "\n\n".join(filter(None, (normalize_text(page, drop_page_numbers=True)
+                                          for page in pages)))
+    if kind == "docx":
+        text = _extract_docx_section(payload)
+    elif kind == "html":
+        text = _extract_html_section(payload)
+    else:
+        text = payload
+    return normalize_text(text)
+
+# --- Splitting (runs in the parent; cheap scans only) ---
+
+def _split_at(markup: str, starts: List[int], blocks: List[int]) -> List[str]:
+    """Cut markup at section starts, or every PARAGRAPHS_PER_SECTION blocks without them"""
+    if not starts:
+        starts = blocks[PARAGRAPHS_PER_SECTION::PARAGRAPHS_PER_SECTION]
+    bounds = [0] + [start for start in starts if start > 0] + [len(markup)]
+    return [markup[a:b] for a, b in zip(bounds, bounds[1:]) if markup[a:b].strip()]
+
+def _docx_tasks(path: str) -> List[Task]:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            xml = archive.read("word/document.xml").decode("utf-8")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ExtractionError(f"{path} is not a valid DOCX file: {e}")
+    # Only paragraphs carry text, so the body starts at the first one
+    first = re.search(r"<w:p[ >/]", xml)
+    body = xml[first.start():] if first else ""
+    paragraphs = [m.start() for m in re.finditer(r"<w:p[ >/]", body)]
+    # A heading paragraph starts a new section; its style sits inside the paragraph
+    starts = [paragraphs[bisect.bisect_left(paragraphs, m.start()) - 1]
+              for m in re.finditer(r'<w:pStyle w:val="(?:Heading|heading\s*)[12]"', body)]
+    return [("docx", path, section) for section in _split_at(body, starts, paragraphs)]
+
+def _html_tasks(path: str) -> List[Task]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        markup = f.read()
+    starts = [m.start() for m in re.finditer(r"<h[12][\s>]", markup, re.I)]
+    paragraphs = [m.start() for m in re.finditer(r"<p[\s>]", markup, re.I)]
+    return [("html", path, section) for section in _split_at(markup, starts, paragraphs)]
+
+def _pdf_tasks(path: str, max_workers: int) -> List[Task]:
+    try:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    except ImportError:
+        raise ExtractionError("Reading PDF files requires pypdf (pip install pypdf)")
+    try:
+        pages = len(PdfReader(path).pages)
+    except PdfReadError as e:
+        raise ExtractionError(f"{path} is not a valid PDF file: {e}")
+    size = max(1, -(-pages // (max_workers * PDF_TASKS_PER_WORKER)))
+    return [("pdf", path, (start, min(start + size, pages))) for start in range(0, pages, size)]
+
+def document_tasks(path: str, max_workers: int = 1) -> List[Task]:
+    """
+    Split a document into independently extractable tasks
+
+    Args:
+        path: Path of a PDF, DOCX, HTML or text file
+        max_workers: Number of workers the tasks are for, which sets how many
+            page ranges a PDF is split into
+
+    Returns:
+        The tasks in document order
+
+    Raises:
+        ExtractionError: If the file is not a readable document of its type
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in PDF_EXTENSIONS:
+        return _pdf_tasks(path, max_workers)
+    if extension in DOCX_EXTENSIONS:
+        return _docx_tasks(path)
+    if extension in HTML_EXTENSIONS:
+        return _html_tasks(path)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return [("text", path, f.read())]
+
+def extract_sections(paths: Iterable[str], max_workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Extract the text of documents section by section, in order
+
+    Tasks from all documents share one process pool; sections are yielded as
+    soon as they and everything before them are done.
+
+    Args:
+        paths: Documents to read, in order
+        max_workers: Number of worker processes; defaults to the number of CPUs
+
+    Returns:
+        An iterator over normalized, non-empty section texts
+
+    Raises:
+        ExtractionError: If a document cannot be read
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    tasks = [task for path in paths for task in document_tasks(path, max_workers)]
+    # Plain text, or a single section, is not worth starting processes for
+    if max_workers == 1 or len(tasks) < 2 or all(task[0] == "text" for task in tasks):
+        results = map(_extract_task, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(max_workers, len(tasks)))
+        chunksize = max(1, len(tasks) // (max_workers * 4))
+        results = executor.map(_extract_task, tasks, chunksize=chunksize)
+    try:
+        for text in results:
+            if text:
+                yield text
+    finally:
+        if executor is not None:
+            # Cancels the tasks not started yet if the consumer stopped early
+            results.close()
+            executor.shutdown(wait=True)
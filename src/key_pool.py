@@ -0,0 +1,274 @@
+"""
+API key pool for the Smart Study Assistant
+
+Each key (or project) gets its own model client and rate limiter. Requests go to
+the key with the most remaining quota relative to its recent latency and the
+calls already running on it, and a key that fails with an authentication or
+quota error is taken out of rotation for a while, so throughput grows with the
+number of keys provisioned.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from google.api_core import exceptions as api_exceptions
+
+from src.deadline import DeadlineExceeded, current_deadline
+
+# Seconds a key stays out of rotation after each kind of error
+AUTH_COOLDOWN = 600.0
+QUOTA_COOLDOWN = 60.0
+
+# Weight of the latest call in a key's moving average latency
+LATENCY_SMOOTHING = 0.3
+
+# Assumed latency of a key that has not answered yet
+_INITIAL_LATENCY = 1.0
+
+# Longest single sleep while waiting for a rate limiter to refill
+_MAX_WAIT_STEP = 0.1
+
+class NoAvailableKey(Exception):
+    """Raised when every API key is temporarily out of rotation"""
+
+class RateLimiter:
+    """
+    Token bucket allowing a number of requests per minute, with bursts up to that number
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None):
+        """
+        Initialize the rate limiter
+
+        Args:
+            requests_per_minute: Allowed request rate; None for no limit
+        """
+        self.capacity = requests_per_minute
+        self._tokens = requests_per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.capacity is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def available(self) -> float:
+        """
+        Get the fraction of the burst capacity currently available
+
+        Returns:
+            A value between 0 and 1; always 1 without a limit
+        """
+        if self.capacity is None:
+            return 1.0
+        self._refill()
+        return self._tokens / self.capacity
+
+    def wait_time(self) -> float:
+        """
+        Get the time until a request may be sent
+
+        Returns:
+            Seconds until a token is available, 0 if one is available now
+        """
+        if self.capacity is None:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self._tokens) * 60.0 / self.capacity)
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token if one is available
+
+        Returns:
+            True if the request may be sent now
+        """
+        if self.capacity is None:
+            return True
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+class _Key:
+    """One API key with its own model client, rate limiter and health"""
+
+    def __init__(self, key: str, model: Any, requests_per_minute: Optional[float]):
+        self.label = f"...{key[-4:]}"
+        self.model = model
+        self.limiter = RateLimiter(requests_per_minute)
+        self.latency: Optional[float] = None
+        self.in_flight = 0
+        self.ejected_until = 0.0
+        self.stats = {"requests": 0, "errors": 0, "ejections": 0}
+
+    def score(self) -> float:
+        """Remaining quota relative to the expected wait; higher is better"""
+        latency = self.latency if self.latency is not None else _INITIAL_LATENCY
+        # Calls already running on the key count against it, so traffic
+        # spreads out even when no rate limit tells the keys apart
+        return self.limiter.available() / (max(latency, 0.01) * (1 + self.in_flight))
+
+class KeyPool:
+    """
+    Distribute requests over several API keys
+    """
+
+    def __init__(self, keys: List[str], make_model: Callable[[str], Any],
+                 requests_per_minute: Optional[float] = None,
+                 auth_cooldown: float = AUTH_COOLDOWN, quota_cooldown: float = QUOTA_COOLDOWN):
+        """
+        Initialize the key pool
+
+        Args:
+            keys: API keys to use; at least one
+            make_model: Function creating a model client bound to one key
+            requests_per_minute: Rate limit of each key; None for no limit
+            auth_cooldown: Seconds a key is ejected after an authentication error
+            quota_cooldown: Seconds a key is ejected after a quota error
+        """
+        if not keys:
+            raise ValueError("At least one API key is required")
+        self.auth_cooldown = auth_cooldown
+        self.quota_cooldown = quota_cooldown
+        self.keys = [_Key(key, make_model(key), requests_per_minute) for key in keys]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @contextmanager
+    def lease(self) -> Iterator[Any]:
+        """
+        Borrow the model client of the best key for one request
+
+        Waits for a rate limiter to refill when every key is busy, up to the
+        current deadline. The outcome of the request is recorded against the key.
+
+        Returns:
+            A context manager yielding the key's model client
+
+        Raises:
+            NoAvailableKey: If every key is ejected
+            DeadlineExceeded: If no key frees up before the deadline
+        """
+        entry = self._acquire()
+        start = time.monotonic()
+        try:
+            yield entry.model
+        except Exception as e:
+            self._record_failure(entry, e)
+            raise
+        else:
+            self._record_success(entry, time.monotonic() - start)
+        finally:
+            with self._lock:
+                entry.in_flight -= 1
+
+    def headroom(self) -> float:
+        """
+        Get the quota left on the best usable key
+
+        Returns:
+            The largest available quota fraction among keys in rotation, 0 if none are
+        """
+        now = time.monotonic()
+        with self._lock:
+            return max((entry.limiter.available() for entry in self.keys
+                        if entry.ejected_until <= now), default=0.0)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get the state of every key for metrics
+
+        Returns:
+            Per key: masked label, request and error counters, whether it is
+            ejected, its average latency, calls in flight and available quota
+            fraction
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                dict(
+                    entry.stats,
+                    key=entry.label,
+                    ejected=entry.ejected_until > now,
+                    latency=entry.latency,
+                    in_flight=entry.in_flight,
+                    quota=entry.limiter.available(),
+                )
+                for entry in self.keys
+            ]
+
+    def _acquire(self) -> _Key:
+        """Pick the best usable key and take a token from its limiter"""
+        deadline = current_deadline()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                usable = [entry for entry in self.keys if entry.ejected_until <= now]
+                if not usable:
+                    raise NoAvailableKey("all API keys are temporarily disabled")
+                for entry in sorted(usable, key=_Key.score, reverse=True):
+                    if entry.limiter.try_acquire():
+                        entry.stats["requests"] += 1
+                        entry.in_flight += 1
+                        return entry
+                wait = min(entry.limiter.wait_time() for entry in usable)
+            if deadline is not None:
+                deadline.check()
+                remaining = deadline.remaining()
+                if remaining is not None and remaining < wait:
+                    raise DeadlineExceeded("request deadline exceeded waiting for API quota")
+            time.sleep(min(wait, _MAX_WAIT_STEP))
+
+    def _record_success(self, entry: _Key, latency: float) -> None:
+        """Fold a call's latency into the key's moving average"""
+        with self._lock:
+            if entry.latency is None:
+                entry.latency = latency
+            else:
+                entry.latency += LATENCY_SMOOTHING * (latency - entry.latency)
+
+    def _record_failure(self, entry: _Key, error: Exception) -> None:
+        """Count a failed call and eject the key if the error is specific to it"""
+        cooldown = None
+        if is_auth_error(error):
+            cooldown = self.auth_cooldown
+        elif is_quota_error(error):
+            cooldown = self.quota_cooldown
+        with self._lock:
+            entry.stats["errors"] += 1
+            if cooldown is not None:
+                entry.ejected_until = time.monotonic() + cooldown
+                entry.stats["ejections"] += 1
+
+def is_auth_error(error: Exception) -> bool:
+    """
+    Check whether an error means the API key itself was rejected
+
+    Args:
+        error: Exception raised by the API client
+
+    Returns:
+        True for authentication and permission errors, including invalid keys
+    """
+    if isinstance(error, (api_exceptions.Unauthenticated, api_exceptions.PermissionDenied)):
+        return True
+    return isinstance(error, api_exceptions.InvalidArgument) and "API key" in str(error)
+
+def is_quota_error(error: Exception) -> bool:
+    """
+    Check whether an error means the key ran out of quota
+
+    Args:
+        error: Exception raised by the API client
+
+    Returns:
+        True for resource exhausted and too many requests errors
+    """
+    return isinstance(error, (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests))
@@ -0,0 +1,163 @@
+"""
+Command output for the Smart Study Assistant CLI
+
+Results are shown as Rich panels for people, or written straight to stdout for
+scripts: raw Markdown, or JSON Lines with one self-contained object per result
+part. The script-friendly modes never parse or lay out Markdown, write each
+part as soon as it is ready (a streamed result ends with a closing object
+without content) and carry metadata about how the result was produced
+(latency, model calls, cache hits, tokens). Results that are error messages go
+to stderr in markdown mode and into an "error" field in json mode, and mark
+the writer as failed so the command can exit with a non-zero status.
+"""
+
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, TextIO
+
+from rich.console import Console
+from rich.markdown import Markdown
+from rich.panel import Panel
+
+OUTPUT_MODES = ["rich", "markdown", "json"]
+
+class ResultWriter:
+    """
+    Write the results of one command in the chosen output mode
+    """
+
+    def __init__(self, mode: str, command: str, console: Console,
+                 stream: Optional[TextIO] = None, error_stream: Optional[TextIO] = None):
+        """
+        Initialize the writer and start timing the command
+
+        Args:
+            mode: One of OUTPUT_MODES
+            command: Name of the command, included in JSON output
+            console: Console used in rich mode
+            stream: Stream for markdown and json output; defaults to stdout as
+                it is now, before any Rich live display redirects it
+            error_stream: Stream for error results in markdown mode; defaults
+                to stderr
+        """
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {mode}")
+        self.mode = mode
+        self.command = command
+        self.console = console
+        self.stream = stream or sys.stdout
+        self.error_stream = error_stream or sys.stderr
+        # Set once any result was an error message
+        self.failed = False
+        self.started = time.perf_counter()
+        self._client = None
+        self._baseline: Dict[str, Any] = {}
+        self._parts = 0
+
+    def track(self, client: Any) -> None:
+        """
+        Report the model activity of a client from now on in the metadata
+
+        Args:
+            client: GeminiClient serving the command
+        """
+        self._client = client
+        self._baseline = client.metrics()
+
+    def write(self, content: str, title: Optional[str] = None, final: bool = True,
+              **fields: Any) -> None:
+        """
+        Write one result, or one part of a streamed result
+
+        Args:
+            content: Markdown text of the result
+            title: Panel title in rich mode
+            final: False for parts of a streamed result, which is then closed
+                with finish()
+            fields: Extra values describing the result, included in JSON output
+        """
+        error = content.startswith("Error")
+        self.failed = self.failed or error
+        if self.mode == "rich":
+            self.console.print(Panel(Markdown(content), title=title, expand=False))
+            return
+        stream = self.stream
+        if self.mode == "markdown":
+            if error:
+                stream = self.error_stream
+            stream.write(content.rstrip("\n") + "\n\n")
+        else:
+            record = {"command": self.command, "part": self._parts, "final": final,
+                      "content": None if error else content}
+            if error:
+                record["error"] = content
+            record.update(fields)
+            record["metadata"] = self.metadata()
+            stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._parts += 1
+        stream.flush()
+
+    def finish(self, **fields: Any) -> None:
+        """
+        Close a streamed result
+
+        In json mode this writes a final object without content, carrying the
+        metadata of the whole result; the other modes have nothing to add.
+
+        Args:
+            fields: Extra values describing the result, included in JSON output
+        """
+        if self.mode == "json":
+            self.write_data(fields, lambda: None)
+
+    def write_data(self, data: Dict[str, Any], render: Callable[[], None]) -> None:
+        """
+        Write a structured result, such as a report
+
+        Args:
+            data: The result as JSON-serializable values
+            render: Function showing the result on the console, used in the
+                rich and markdown modes
+        """
+        if self.mode != "json":
+            render()
+            return
+        record = {"command": self.command, "part": self._parts, "final": True}
+        record.update(data)
+        record["metadata"] = self.metadata()
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._parts += 1
+        self.stream.flush()
+
+    def metadata(self) -> Dict[str, Any]:
+        """
+        Describe how the output so far was produced
+
+        Returns:
+            Seconds since the command started; and, once a client is tracked,
+            the model name, its requests, cache hits and model calls since then,
+            whether there were requests and all of them came from the cache, and
+            prompt and output tokens (marked as estimated when the API did not
+            report them)
+        """
+        metadata: Dict[str, Any] = {"latency": round(time.perf_counter() - self.started, 3)}
+        if self._client is None:
+            return metadata
+        metrics = self._client.metrics()
+        delta = lambda name: metrics.get(name, 0) - self._baseline.get(name, 0)
+        requests = delta("requests")
+        model_calls = requests - delta("cache_hits") - delta("rejected")
+        metadata.update(
+            model=self._client.config.get("model"),
+            requests=requests,
+            cache_hits=delta("cache_hits"),
+            model_calls=model_calls,
+            cache_hit=requests > 0 and model_calls == 0,
+            tokens={
+                "prompt": delta("prompt_tokens"),
+                "output": delta("output_tokens"),
+                "estimated": delta("estimated_token_counts") > 0,
+            },
+        )
+        return metadata
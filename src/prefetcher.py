@@ -0,0 +1,247 @@
+"""
+Predictive prefetching of follow-up content for the Smart Study Assistant
+
+After a plan or an explanation is shown, the subtopics and related concepts it
+mentions are the most likely next questions. The prefetcher pulls those
+candidates out of the finished response and answers them in the background,
+one at a time and only while there is spare API quota, so that the follow-up
+question is served straight from the response cache.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.circuit_breaker import CLOSED
+from src.concept_graph import normalize_concept
+from src.deadline import Deadline, current_deadline, deadline_scope
+from src.gemini_client import GeminiClient
+
+DEFAULT_BUDGET = 5
+
+# Prefetching only uses quota while the best key has at least this much left
+MIN_QUOTA_HEADROOM = 0.5
+
+_HEADING = re.compile(r"^#{1,6}\s+(.*)$")
+_BULLET = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(.*)$")
+_BOLD = re.compile(r"\*\*([^*\n]{2,60})\*\*")
+# "Day 3: Cell division", "Week 2 - Integrals", "Days 8-14: Genetics"
+_PLAN_HEADING = re.compile(r"^(?:days?|weeks?|block|session|part)\s*[\d\s\-–]*[:.\-–]\s*(.+)$", re.I)
+_RELATED_HEADING = re.compile(r"related|prerequisite|next|further|connect", re.I)
+_QUESTION_PREFIX = re.compile(
+    r"^(?:(?:can you |please )?(?:explain|define|describe)|tell me (?:more )?about|"
+    r"what (?:is|are)|what's|who (?:is|was))\s+(?:the |an? )?",
+    re.I,
+)
+
+def _clean(text: str) -> str:
+    """Strip Markdown emphasis, trailing descriptions and punctuation from a candidate"""
+    text = text.replace("**", "").replace("__", "").replace("`", "").strip()
+    text = re.split(r":|\s[-–—]\s|\(", text, maxsplit=1)[0]
+    return text.strip(" .,;!?*_")
+
+def extract_followups(response: str, limit: int = DEFAULT_BUDGET,
+                      exclude: Iterable[str] = ()) -> List[str]:
+    """
+    Pull likely follow-up topics out of a Markdown response
+
+    Plan sections ("Day 3: Cell division") and items listed under related-concept
+    headings come first, followed by bolded key terms.
+
+    Args:
+        response: The finished response
+        limit: Maximum number of candidates
+        exclude: Topics to leave out, such as the one just explained
+
+    Returns:
+        Candidate topics, most likely first
+    """
+    primary, terms = [], []
+    in_related = False
+    for line in response.splitlines():
+        heading = _HEADING.match(line)
+        if heading:
+            title = heading.group(1).replace("**", "").strip()
+            in_related = bool(_RELATED_HEADING.search(title))
+            plan = _PLAN_HEADING.match(title)
+            if plan:
+                primary.append(plan.group(1))
+            continue
+        bullet = _BULLET.match(line)
+        if bullet and in_related:
+            primary.append(bullet.group(1))
+            continue
+        terms.extend(_BOLD.findall(line))
+
+    seen = {normalize_concept(topic) for topic in exclude}
+    candidates = []
+    for text in primary + terms:
+        topic = _clean(text)
+        key = normalize_concept(topic)
+        # Skip sentences and fragments; follow-ups are short topic names
+        if not topic or key in seen or len(topic.split()) > 6:
+            continue
+        seen.add(key)
+        candidates.append(topic)
+        if len(candidates) >= limit:
+            break
+    return candidates
+
+def normalize_question(question: str) -> str:
+    """
+    Reduce a question to the topic it asks about
+
+    Args:
+        question: The question, e.g. "What is mitosis?"
+
+    Returns:
+        The normalized topic, e.g. "mitosis"
+    """
+    question = question.strip().rstrip("?.! ")
+    return normalize_concept(_QUESTION_PREFIX.sub("", question))
+
+class Prefetcher:
+    """
+    Warm the response cache for likely follow-up questions in the background
+    """
+
+    def __init__(self, client: GeminiClient, budget: int = DEFAULT_BUDGET):
+        """
+        Initialize the prefetcher
+
+        Args:
+            client: GeminiClient whose cache is warmed
+            budget: Maximum number of follow-ups prefetched per response
+        """
+        self.client = client
+        self.budget = budget
+
+        # Normalized topic -> prompt, for every topic scheduled so far
+        self._topics: Dict[str, str] = {}
+        # Normalized topic -> prompt and the deadline of the request that scheduled it
+        self._queue: "OrderedDict[str, Tuple[str, Optional[Deadline]]]" = OrderedDict()
+        self._worker: Optional[threading.Thread] = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._stats = {"scheduled": 0, "warmed": 0, "already_cached": 0, "dropped": 0}
+
+    def schedule(self, topics: Iterable[str], make_prompt: Callable[[str], str]) -> int:
+        """
+        Queue follow-up topics for prefetching
+
+        The prefetches run under the current deadline, so they stop when the
+        request that scheduled them is cancelled or runs out of time.
+
+        Args:
+            topics: Candidate topics, most likely first; only the first budget are used
+            make_prompt: Function building the prompt that would answer a topic
+
+        Returns:
+            Number of topics queued
+        """
+        queued = 0
+        deadline = current_deadline()
+        with self._lock:
+            for topic in list(topics)[:self.budget]:
+                key = normalize_concept(topic)
+                prompt = make_prompt(topic)
+                self._topics[key] = prompt
+                if key not in self._queue:
+                    self._queue[key] = (prompt, deadline)
+                    queued += 1
+            self._stats["scheduled"] += queued
+            if self._queue and (self._worker is None or not self._worker.is_alive()):
+                self._idle.clear()
+                self._worker = threading.Thread(target=self._run, name="prefetch", daemon=True)
+                self._worker.start()
+        return queued
+
+    def match(self, question: str) -> Optional[str]:
+        """
+        Find the prefetched prompt answering a question, if it is cached
+
+        Args:
+            question: The user's question
+
+        Returns:
+            The prompt of a prefetched topic whose answer is fresh in the cache, or None
+        """
+        with self._lock:
+            prompt = self._topics.get(normalize_question(question))
+        if prompt is None or not self.client.is_cached(prompt):
+            return None
+        return prompt
+
+    def cancel(self) -> int:
+        """
+        Drop the queued topics; a prefetch already running is not waited for
+
+        Returns:
+            Number of topics dropped
+        """
+        with self._lock:
+            dropped = len(self._queue)
+            self._stats["dropped"] += dropped
+            self._queue.clear()
+        return dropped
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the queued prefetches to finish
+
+        Args:
+            timeout: Maximum seconds to wait; None to wait until done
+
+        Returns:
+            True if nothing is left to prefetch
+        """
+        return self._idle.wait(timeout)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get prefetch counters and the hit rate
+
+        The hit rate is the share of all prefetched answers, including ones
+        from earlier runs, that were later served from the cache.
+
+        Returns:
+            Counters for this process plus the persistent prefetched, used and
+            hit_rate figures
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        prefetched, used = self.client.cache.prefetch_usage()
+        stats.update(prefetched=prefetched, used=used,
+                     hit_rate=used / prefetched if prefetched else 0.0)
+        return stats
+
+    def _run(self) -> None:
+        """Prefetch queued topics one at a time while the backend has room"""
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._idle.set()
+                    return
+                _, (prompt, deadline) = self._queue.popitem(last=False)
+                # Foreground requests come first: stop when quota or health runs low
+                if (self.client.breaker.state != CLOSED
+                        or self.client.key_pool.headroom() < MIN_QUOTA_HEADROOM):
+                    self._stats["dropped"] += len(self._queue) + 1
+                    self._queue.clear()
+                    self._idle.set()
+                    return
+            if self.client.is_cached(prompt):
+                self._count("already_cached")
+                continue
+            with deadline_scope(deadline) if deadline is not None else nullcontext():
+                warmed = self.client.prefetch(prompt)
+            if warmed:
+                self._count("warmed")
+
+    def _count(self, name: str) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._stats[name] += 1
@@ -0,0 +1,250 @@
+"""
+Per-phase profiling for the Smart Study Assistant
+
+A Profiler records the wall and CPU time of named phases of a request
+(configuration, client construction, network calls, rendering, ...). CPU time
+is per thread, so concurrent requests in one process don't count each other's
+work; the CPU time of the whole process is reported separately. Like a
+deadline, it travels in a context variable, so code anywhere in the call stack,
+including worker threads started by ordered_map, marks its phases with phase()
+and nothing is recorded when no profiler is active. The result is a breakdown
+per phase or a Chrome trace (chrome://tracing, Perfetto) with one slice per
+phase on the thread that ran it.
+"""
+
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+_current: contextvars.ContextVar = contextvars.ContextVar("profiler", default=None)
+
+class Profiler:
+    """
+    Record the wall and CPU time of the phases of a request
+    """
+
+    def __init__(self, cprofile: bool = False, started: Optional[float] = None,
+                 started_cpu: Optional[float] = None,
+                 started_process_cpu: Optional[float] = None):
+        """
+        Initialize the profiler and start its clock
+
+        The profiler belongs to the thread that creates it, which should also
+        be the one to stop it.
+
+        Args:
+            cprofile: Also collect a cProfile profile of the thread that calls
+                start(); worker threads only show up as phases
+            started: time.perf_counter() value to count from, to include work
+                done before the profiler existed; defaults to now
+            started_cpu: time.thread_time() value of this thread to count the
+                request's CPU time from
+            started_process_cpu: time.process_time() value to count the
+                process's CPU time from
+        """
+        self.started = started if started is not None else time.perf_counter()
+        self._started_cpu = started_cpu if started_cpu is not None else time.thread_time()
+        self._started_process_cpu = (started_process_cpu if started_process_cpu is not None
+                                     else time.process_time())
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._cprofile = cProfile.Profile() if cprofile else None
+        self._stopped: Optional[float] = None
+        self._stopped_cpu: Optional[float] = None
+        self._stopped_process_cpu: Optional[float] = None
+
+    def start(self) -> None:
+        """Start the cProfile profile, if one was requested"""
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def stop(self) -> None:
+        """Stop the clock and the cProfile profile"""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._stopped is None:
+            self._stopped = time.perf_counter()
+            self._stopped_cpu = time.thread_time()
+            self._stopped_process_cpu = time.process_time()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time a block as one occurrence of a phase
+
+        Args:
+            name: Name of the phase
+
+        Returns:
+            A context manager timing the block
+        """
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, time.thread_time() - start_cpu)
+
+    def record(self, name: str, start: float, wall: float, cpu: float) -> None:
+        """
+        Record a phase timed elsewhere, such as module imports
+
+        Args:
+            name: Name of the phase
+            start: time.perf_counter() value when the phase began
+            wall: Wall time of the phase in seconds
+            cpu: CPU time of the phase in seconds
+        """
+        thread = threading.current_thread()
+        with self._lock:
+            self._events.append({"name": name, "start": start, "wall": wall, "cpu": cpu,
+                                 "tid": thread.ident, "thread": thread.name})
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """
+        Sum up the recorded phases
+
+        Phases nest (network calls happen inside a command) and may overlap
+        across threads, so the rows do not add up to the total.
+
+        Returns:
+            Per phase, in order of first occurrence: name, count, wall and cpu
+            seconds; followed by a "total" row with the wall time since the
+            profiler was created, the CPU time of the profiler's own thread
+            (cpu) and that of the whole process, including worker threads and
+            any other requests running at the same time (process_cpu)
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            events = sorted(self._events, key=lambda event: event["start"])
+        for event in events:
+            row = rows.setdefault(event["name"], {"name": event["name"], "count": 0,
+                                                  "wall": 0.0, "cpu": 0.0})
+            row["count"] += 1
+            row["wall"] += event["wall"]
+            row["cpu"] += event["cpu"]
+        stopped = self._stopped if self._stopped is not None else time.perf_counter()
+        stopped_cpu = self._stopped_cpu if self._stopped_cpu is not None else time.thread_time()
+        stopped_process_cpu = (self._stopped_process_cpu if self._stopped_process_cpu is not None
+                               else time.process_time())
+        total = {"name": "total", "count": 1, "wall": stopped - self.started,
+                 "cpu": stopped_cpu - self._started_cpu,
+                 "process_cpu": stopped_process_cpu - self._started_process_cpu}
+        return list(rows.values()) + [total]
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        Export the recorded phases in the Chrome trace event format
+
+        Returns:
+            A trace with one complete ("X") event per phase occurrence,
+            timestamps in microseconds since the profiler was created
+        """
+        with self._lock:
+            events = list(self._events)
+        pid = os.getpid()
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in sorted({(event["tid"], event["thread"]) for event in events})]
+        for event in events:
+            trace.append({
+                "name": event["name"],
+                "ph": "X",
+                "ts": round((event["start"] - self.started) * 1e6, 1),
+                "dur": round(event["wall"] * 1e6, 1),
+                "pid": pid,
+                "tid": event["tid"],
+                "args": {"cpu_ms": round(event["cpu"] * 1e3, 3)},
+            })
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: str) -> None:
+        """
+        Write the Chrome trace to a JSON file
+
+        Args:
+            path: Path of the trace file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def write_cprofile(self, path: str) -> None:
+        """
+        Write the cProfile profile for pstats, snakeviz and similar tools
+
+        Args:
+            path: Path of the profile file
+
+        Raises:
+            ValueError: If the profiler was created without cprofile
+        """
+        if self._cprofile is None:
+            raise ValueError("this profiler does not collect a cProfile profile")
+        self._cprofile.dump_stats(path)
+
+    def hot_functions(self, limit: int = 15) -> str:
+        """
+        Format the functions with the most cumulative time in the cProfile profile
+
+        Args:
+            limit: Number of functions to list
+
+        Returns:
+            A pstats listing, or an empty string without a cProfile profile
+        """
+        if self._cprofile is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+def current_profiler() -> Optional[Profiler]:
+    """
+    Get the profiler of the request being handled
+
+    Returns:
+        The current profiler, or None when profiling is off
+    """
+    return _current.get()
+
+@contextmanager
+def profile_scope(profiler: Profiler) -> Iterator[Profiler]:
+    """
+    Make a profiler current for the duration of a block
+
+    Args:
+        profiler: The profiler to apply
+
+    Returns:
+        A context manager yielding the profiler
+    """
+    token = _current.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Time a block as a phase of the current profiler, if there is one
+
+    Args:
+        name: Name of the phase
+
+    Returns:
+        A context manager timing the block; it does nothing when profiling is off
+    """
+    profiler = _current.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.phase(name):
+        yield
@@ -0,0 +1,402 @@
+"""
+Persistent question bank for the Smart Study Assistant
+
+Generated quiz questions are stored in SQLite, tagged by topic, difficulty and
+question type, so later quizzes can be served locally. Near-duplicate questions
+are detected with MinHash signatures over word shingles, indexed with
+locality-sensitive hashing (LSH) bands.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+# MinHash parameters: NUM_BANDS bands of ROWS_PER_BAND rows each
+NUM_PERMUTATIONS = 64
+ROWS_PER_BAND = 4
+NUM_BANDS = NUM_PERMUTATIONS // ROWS_PER_BAND
+SHINGLE_SIZE = 3
+
+# Estimated Jaccard similarity above which two questions are duplicates
+DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)  # fixed seed: signatures must be stable across runs
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+_WORD = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    question_type TEXT NOT NULL,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    explanation TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_tags
+    ON questions (topic, difficulty, question_type);
+CREATE TABLE IF NOT EXISTS question_bands (
+    band INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    PRIMARY KEY (band, hash, question_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS served (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_id INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    served_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS served_topic ON served (topic, id);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts
+    USING fts5(question, topic, content='questions', content_rowid='id');
+"""
+
+def normalize_tag(value: str) -> str:
+    """
+    Normalize a topic, difficulty or question type for use as a tag
+
+    Args:
+        value: The raw tag value
+
+    Returns:
+        The lowercased tag with collapsed whitespace
+    """
+    return " ".join(value.lower().split())
+
+def minhash_signature(text: str) -> List[int]:
+    """
+    Compute the MinHash signature of a text over its word shingles
+
+    Args:
+        text: The text to sign
+
+    Returns:
+        A list of NUM_PERMUTATIONS minimum hash values
+    """
+    words = _WORD.findall(text.lower())
+    size = min(SHINGLE_SIZE, len(words)) or 1
+    shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles
+    ]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+def estimate_similarity(first: List[int], second: List[int]) -> float:
+    """
+    Estimate the Jaccard similarity of two texts from their MinHash signatures
+
+    Args:
+        first: Signature of the first text
+        second: Signature of the second text
+
+    Returns:
+        The estimated similarity between 0.0 and 1.0
+    """
+    matches = sum(1 for x, y in zip(first, second) if x == y)
+    return matches / NUM_PERMUTATIONS
+
+def _band_hashes(signature: List[int]) -> List[int]:
+    """Hash each LSH band of a signature into a signed 64-bit integer"""
+    bands = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f"<{ROWS_PER_BAND}Q", *rows), digest_size=8).digest()
+        bands.append(int.from_bytes(digest, "little", signed=True))
+    return bands
+
+class QuestionBank:
+    """
+    On-disk store of generated quiz questions
+    """
+
+    def __init__(self, path: str, recent_window: int = 50):
+        """
+        Open (or create) a question bank
+
+        Args:
+            path: Path of the SQLite database file
+            recent_window: Number of most recently served questions per topic
+                that are not served again
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.recent_window = recent_window
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self._fts = True
+        except sqlite3.OperationalError:
+            # SQLite was built without FTS5; fall back to LIKE queries
+            self._fts = False
+        self._conn.commit()
+
+    def add(self, topic: str, difficulty: str, question: Dict[str, Any]) -> Optional[int]:
+        """
+        Store a question unless a near-duplicate is already in the bank
+
+        Args:
+            topic: Topic the question belongs to
+            difficulty: Difficulty level (easy, medium, hard)
+            question: Question dict with "question", "type", "options", "answer"
+                and "explanation" keys
+
+        Returns:
+            The ID of the stored question, or None if it was a duplicate
+        """
+        options = [str(option) for option in question.get("options") or []]
+        signature = minhash_signature(" ".join([question["question"]] + options))
+        bands = _band_hashes(signature)
+
+        with self._lock:
+            if self._find_duplicate(signature, bands) is not None:
+                return None
+
+            cursor = self._conn.execute(
+                "INSERT INTO questions (topic, difficulty, question_type, question, options, "
+                "answer, explanation, signature, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    normalize_tag(topic),
+                    normalize_tag(difficulty),
+                    normalize_tag(question.get("type") or "multiple choice"),
+                    question["question"],
+                    json.dumps(options),
+                    str(question.get("answer", "")),
+                    str(question.get("explanation", "")),
+                    struct.pack(f"<{NUM_PERMUTATIONS}Q", *signature),
+                    time.time(),
+                ),
+            )
+            question_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO question_bands (band, hash, question_id) VALUES (?, ?, ?)",
+                [(band, value, question_id) for band, value in enumerate(bands)],
+            )
+            if self._fts:
+                self._conn.execute(
+                    "INSERT INTO questions_fts (rowid, question, topic) VALUES (?, ?, ?)",
+                    (question_id, question["question"], normalize_tag(topic)),
+                )
+            self._conn.commit()
+            return question_id
+
+    def is_duplicate(self, question: Dict[str, Any]) -> bool:
+        """
+        Check whether a near-duplicate of a question is already in the bank
+
+        Args:
+            question: Question dict with at least a "question" key
+
+        Returns:
+            True if a near-duplicate exists
+        """
+        options = [str(option) for option in question.get("options") or []]
+        signature = minhash_signature(" ".join([question["question"]] + options))
+        with self._lock:
+            return self._find_duplicate(signature, _band_hashes(signature)) is not None
+
+    def _find_duplicate(self, signature: List[int], bands: List[int]) -> Optional[int]:
+        """Find a stored question whose signature is close to the given one"""
+        clauses = " OR ".join(["(band = ? AND hash = ?)"] * NUM_BANDS)
+        params = [value for pair in enumerate(bands) for value in pair]
+        rows = self._conn.execute(
+            f"SELECT DISTINCT q.id, q.signature FROM question_bands b "
+            f"JOIN questions q ON q.id = b.question_id WHERE {clauses}",
+            params,
+        ).fetchall()
+        for row in rows:
+            candidate = list(struct.unpack(f"<{NUM_PERMUTATIONS}Q", row["signature"]))
+            if estimate_similarity(signature, candidate) >= DUPLICATE_THRESHOLD:
+                return row["id"]
+        return None
+
+    def sample(self, topic: str, difficulty: str, question_types: List[str],
+               count: int) -> List[Dict[str, Any]]:
+        """
+        Randomly sample stored questions, skipping recently served ones
+
+        Args:
+            topic: Topic of the quiz
+            difficulty: Difficulty level
+            question_types: Acceptable question types
+            count: Maximum number of questions to return
+
+        Returns:
+            Up to count question dicts, each with an "id" key
+        """
+        types = [normalize_tag(question_type) for question_type in question_types]
+        placeholders = ", ".join("?" * len(types))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM questions WHERE topic = ? AND difficulty = ? "
+                f"AND question_type IN ({placeholders}) AND id NOT IN ("
+                f"  SELECT question_id FROM served WHERE topic = ? ORDER BY id DESC LIMIT ?"
+                f") ORDER BY RANDOM() LIMIT ?",
+                [normalize_tag(topic), normalize_tag(difficulty), *types,
+                 normalize_tag(topic), self.recent_window, count],
+            ).fetchall()
+        return [self._row_to_question(row) for row in rows]
+
+    def mark_served(self, topic: str, question_ids: List[int]) -> None:
+        """
+        Record that questions were served, so they are not repeated soon
+
+        Args:
+            topic: Topic of the quiz the questions were served in
+            question_ids: IDs of the served questions
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO served (question_id, topic, served_at) VALUES (?, ?, ?)",
+                [(question_id, normalize_tag(topic), now) for question_id in question_ids],
+            )
+            self._conn.commit()
+
+    def recently_served(self, topic: str) -> List[str]:
+        """
+        Get the text of the questions that sample() currently skips for a topic
+
+        Args:
+            topic: Topic of the quiz
+
+        Returns:
+            The most recently served questions, newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT q.question FROM served s JOIN questions q ON q.id = s.question_id "
+                "WHERE s.topic = ? ORDER BY s.id DESC LIMIT ?",
+                (normalize_tag(topic), self.recent_window),
+            ).fetchall()
+        return [row["question"] for row in rows]
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Full-text search over stored questions
+
+        Args:
+            query: Words to search for
+            limit: Maximum number of results
+
+        Returns:
+            Matching question dicts, best matches first
+        """
+        words = _WORD.findall(query)
+        if not words:
+            return []
+        with self._lock:
+            if self._fts:
+                match = " ".join(f'"{word}"' for word in words)
+                rows = self._conn.execute(
+                    "SELECT q.* FROM questions_fts f JOIN questions q ON q.id = f.rowid "
+                    "WHERE questions_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (match, limit),
+                ).fetchall()
+            else:
+                clauses = " AND ".join(["question LIKE ?"] * len(words))
+                rows = self._conn.execute(
+                    f"SELECT * FROM questions WHERE {clauses} LIMIT ?",
+                    [f"%{word}%" for word in words] + [limit],
+                ).fetchall()
+        return [self._row_to_question(row) for row in rows]
+
+    def iter_questions(self, topic: Optional[str] = None,
+                       difficulty: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over stored questions without loading them all into memory
+
+        Args:
+            topic: Optional topic filter
+            difficulty: Optional difficulty filter
+
+        Returns:
+            An iterator over question dicts
+        """
+        clauses, params = [], []
+        if topic:
+            clauses.append("topic = ?")
+            params.append(normalize_tag(topic))
+        if difficulty:
+            clauses.append("difficulty = ?")
+            params.append(normalize_tag(difficulty))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        # A separate connection keeps this cursor independent of concurrent writes
+        conn = sqlite3.connect(self.path) if self.path != ":memory:" else self._conn
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute(f"SELECT * FROM questions {where} ORDER BY id", params):
+                yield self._row_to_question(row)
+        finally:
+            if conn is not self._conn:
+                conn.close()
+
+    def count(self, topic: Optional[str] = None, difficulty: Optional[str] = None) -> int:
+        """
+        Count stored questions
+
+        Args:
+            topic: Optional topic filter
+            difficulty: Optional difficulty filter
+
+        Returns:
+            The number of stored questions
+        """
+        clauses, params = [], []
+        if topic:
+            clauses.append("topic = ?")
+            params.append(normalize_tag(topic))
+        if difficulty:
+            clauses.append("difficulty = ?")
+            params.append(normalize_tag(difficulty))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            row = self._conn.execute(f"SELECT COUNT(*) FROM questions{where}", params).fetchone()
+        return row[0]
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_question(row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a database row into a question dict"""
+        return {
+            "id": row["id"],
+            "topic": row["topic"],
+            "difficulty": row["difficulty"],
+            "type": row["question_type"],
+            "question": row["question"],
+            "options": json.loads(row["options"]),
+            "answer": row["answer"],
+            "explanation": row["explanation"],
+        }
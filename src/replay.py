@@ -0,0 +1,317 @@
+"""
+Accelerated replay of recorded traffic for capacity planning
+
+A traffic log (see src.traffic_recorder) is replayed against a full
+SmartStudyAssistant whose API keys all talk to a local simulated backend, so
+requests go through the same response cache, circuit breaker, key pool and
+rate limits as in production. Each recorded request is re-issued at its
+original offset divided by the speed-up, with a synthetic prompt of the
+recorded size standing in for the redacted one; the same prompt hash always
+maps to the same synthetic prompt, so repeated questions hit the response
+cache just like they did in production. The simulated backend answers after
+the latency the real model showed for that prompt (scaled by the same
+speed-up) with a response of the recorded size. Recorded prefetches are
+re-issued as prefetches, adding their load without counting as requests;
+recorded refreshes are not, since the replayed client refreshes stale answers
+itself when its backend recovers.
+
+The report covers throughput, latency percentiles as seen by callers
+(including time spent queued), cache hit rates and queue depth, so changes to
+caching, concurrency or key provisioning can be measured before deploying.
+"""
+
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from src.assistant import SmartStudyAssistant
+from src.gemini_client import DEFAULT_TIMEOUTS
+
+DEFAULT_REPLAY_WORKERS = 32
+
+# Backend latency assumed for prompts never answered by the model while recording
+_FALLBACK_LATENCY = 1.0
+
+_TAG = re.compile(r"\[replay ([0-9a-f]+) (\w+)\]")
+
+# Recorded model calls made in the background rather than for a caller
+BACKGROUND_METHODS = ("prefetch", "refresh")
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """
+    Get a percentile by the nearest-rank method
+
+    Args:
+        values: Measurements, in any order
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        The percentile, or None without measurements
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(fraction * len(ordered))))
+    return ordered[rank - 1]
+
+def synthetic_prompt(record: Dict[str, Any]) -> str:
+    """
+    Build a stand-in prompt of the recorded size for a redacted one
+
+    Args:
+        record: A traffic record
+
+    Returns:
+        A prompt tagged with the record's prompt hash and method, padded to the
+        recorded length; equal hashes give equal prompts, and a prefetched
+        prompt matches the text request it answers ahead of time
+    """
+    method = "generate_text" if record["method"] in BACKGROUND_METHODS else record["method"]
+    tag = f"[replay {record['prompt_hash']} {method}] "
+    return tag + "x" * max(0, record.get("prompt_chars", 0) - len(tag))
+
+class _Response:
+    """Minimal model response"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+class _Chat:
+    """Chat session of the simulated backend"""
+
+    def __init__(self, backend: "SimulatedBackend"):
+        self._backend = backend
+
+    def send_message(self, message: str, **kwargs: Any) -> _Response:
+        return self._backend.generate_content(message)
+
+class SimulatedBackend:
+    """
+    Local stand-in for the Gemini model, answering with recorded latencies and sizes
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], speed: float = 1.0):
+        """
+        Initialize the backend from a recording
+
+        Args:
+            records: Traffic records; requests the model answered provide the
+                latency and response size for their prompt hash
+            speed: Speed-up factor; latencies are divided by it
+        """
+        self.speed = speed
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            if record.get("status") == "fresh":
+                self._profiles[record["prompt_hash"]] = record
+        latencies = sorted(record["latency"] for record in self._profiles.values())
+        self._default_latency = latencies[len(latencies) // 2] if latencies else _FALLBACK_LATENCY
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def generate_content(self, prompt: Any, **kwargs: Any) -> _Response:
+        """Answer a prompt after its recorded latency"""
+        match = _TAG.search(str(prompt))
+        profile = self._profiles.get(match.group(1)) if match else None
+        latency = profile["latency"] if profile else self._default_latency
+        size = profile["response_chars"] if profile else 0
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(latency / self.speed)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if match and match.group(2) == "generate_json":
+            # A JSON string, so structured callers parse it like a real answer
+            return _Response(json.dumps("x" * max(0, size - 2)))
+        return _Response("x" * size)
+
+    def start_chat(self, history: Any = None, **kwargs: Any) -> _Chat:
+        """Start a chat session"""
+        return _Chat(self)
+
+def replay_config(records: List[Dict[str, Any]], data_dir: str,
+                  base: Optional[Dict[str, Any]] = None, keys: int = 1,
+                  requests_per_minute: Optional[float] = None,
+                  speed: float = 1.0) -> Dict[str, Any]:
+    """
+    Build an assistant configuration for a replay
+
+    The replay starts from a cold cache in data_dir and never touches the real
+    caches, question bank or traffic log. The client's timing settings (request
+    timeouts, the slow call threshold and the circuit breaker cooldown) are
+    divided by the speed-up, like the backend latencies.
+
+    Args:
+        records: The traffic records, for the model parameters
+        data_dir: Directory for the replay's own cache
+        base: Optional configuration to start from, e.g. load_config()
+        keys: Number of simulated API keys
+        requests_per_minute: Rate limit of each simulated key, already scaled
+            by the speed-up; None for no limit
+        speed: Speed-up factor of the replay
+
+    Returns:
+        The configuration
+    """
+    config = dict(base or {})
+    first = records[0] if records else {}
+    for name, default in (("model", "replay"), ("temperature", 0.7), ("max_tokens", 2048)):
+        if config.get(name) is None:
+            config[name] = first.get(name) if first.get(name) is not None else default
+    config.update(
+        api_key="replay-key-0",
+        api_keys=[f"replay-key-{i}" for i in range(max(1, keys))],
+        requests_per_minute=requests_per_minute,
+        response_cache_path=os.path.join(data_dir, "response_cache.db"),
+        chunk_summary_path=None,
+        question_bank_path=None,
+        concept_graph_path=None,
+        tips_catalog_path=None,
+        topic_dependency_cache_path=os.path.join(data_dir, "topic_dependencies.json"),
+        prefetch=False,
+        traffic_log=None,
+        timeouts={method: timeout / speed if timeout is not None else None
+                  for method, timeout in dict(DEFAULT_TIMEOUTS,
+                                              **config.get("timeouts", {})).items()},
+        slow_call_seconds=config.get("slow_call_seconds", 30.0) / speed,
+        circuit_cooldown=config.get("circuit_cooldown", 30.0) / speed,
+    )
+    return config
+
+def replay(records: List[Dict[str, Any]], speed: float = 1.0,
+           max_workers: int = DEFAULT_REPLAY_WORKERS, keys: int = 1,
+           requests_per_minute: Optional[float] = None,
+           base_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Replay recorded traffic against a simulated backend
+
+    Args:
+        records: Traffic records, e.g. from load_traffic
+        speed: Speed-up factor, e.g. 10 to replay an hour in six minutes
+        max_workers: Concurrent requests the replay may have running; further
+            requests wait in a queue, like requests waiting for a server thread
+        keys: Number of simulated API keys
+        requests_per_minute: Rate limit of each simulated key, in recorded
+            time (scaled by the speed-up); None for no limit
+        base_config: Optional configuration to start from
+
+    Returns:
+        A report: request, error, prefetch and backend call counts, duration, throughput
+        in requests per second (replay time), latency p50/p95/p99 and maximum
+        in recorded seconds, the replayed and recorded cache hit rates, and
+        the maximum and mean queue depth and in-flight requests. Requests that
+        raised count as errors, with their latency. The simulated backend
+        never fails, so transport retries and key ejection cooldowns do not
+        come into play; only waits for rate limits and deadlines do, and both
+        follow the speed-up.
+    """
+    records = sorted(records, key=lambda record: record["ts"])
+    backend = SimulatedBackend(records, speed)
+    records = [record for record in records if record["method"] != "refresh"]
+    rpm = requests_per_minute * speed if requests_per_minute else None
+
+    with tempfile.TemporaryDirectory(prefix="replay-") as data_dir:
+        assistant = SmartStudyAssistant(replay_config(records, data_dir, base_config, keys, rpm,
+                                                      speed))
+        client = assistant.client
+        for key in client.key_pool.keys:
+            key.model = backend
+        client.model = backend
+
+        lock = threading.Lock()
+        counts = {"submitted": 0, "started": 0, "completed": 0, "errors": 0, "prefetches": 0}
+        latencies: List[float] = []
+        depths: List[int] = []
+        in_flight: List[int] = []
+
+        def run(record: Dict[str, Any], issued: float) -> None:
+            with lock:
+                counts["started"] += 1
+            prompt = synthetic_prompt(record)
+            if record["method"] == "prefetch":
+                try:
+                    client.prefetch(prompt)
+                finally:
+                    with lock:
+                        counts["completed"] += 1
+                        counts["prefetches"] += 1
+                return
+            try:
+                if record["method"] == "chat":
+                    turns = record.get("history_turns", 0)
+                    part = "x" * (record.get("history_chars", 0) // turns if turns else 0)
+                    history = [{"role": "user" if i % 2 == 0 else "model", "parts": [part]}
+                               for i in range(turns)]
+                    result = client.chat(prompt, history=history)
+                elif record["method"] == "generate_json":
+                    result = client.generate_json(prompt)
+                    result = "Error" if result is None else ""
+                else:
+                    result = client.generate_text(prompt)
+            except Exception as e:
+                # Such as no key being available or the deadline passing; the
+                # request failed like any other
+                result = f"Error: {e}"
+            with lock:
+                counts["completed"] += 1
+                counts["errors"] += str(result).startswith("Error")
+                latencies.append((time.perf_counter() - issued) * speed)
+
+        before = client.metrics()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="replay") as pool:
+            for record in records:
+                delay = start + (record["ts"] - records[0]["ts"]) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                with lock:
+                    # Sampled as each request arrives, excluding itself
+                    depths.append(counts["submitted"] - counts["started"])
+                    in_flight.append(counts["started"] - counts["completed"])
+                    counts["submitted"] += 1
+                pool.submit(run, record, time.perf_counter())
+        duration = time.perf_counter() - start
+        after = client.metrics()
+        client.cache.close()
+
+    # Chat never goes through the response cache, so hit rates cover the rest
+    foreground = [record for record in records if record["method"] not in BACKGROUND_METHODS]
+    recorded_lookups = [record for record in foreground if record["method"] != "chat"]
+    requests = after["requests"] - before["requests"] - (len(foreground) - len(recorded_lookups))
+    cache_hits = after["cache_hits"] - before["cache_hits"]
+    completed = counts["completed"] - counts["prefetches"]
+    recorded_hits = sum(record.get("status") == "cached" for record in recorded_lookups)
+    return {
+        "requests": completed,
+        "errors": counts["errors"],
+        "prefetches": counts["prefetches"],
+        "backend_calls": backend.calls,
+        "speed": speed,
+        "duration": duration,
+        "throughput": completed / duration if duration > 0 else 0.0,
+        "latency": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies) if latencies else None,
+        },
+        "cache_hit_rate": cache_hits / requests if requests else 0.0,
+        "recorded_cache_hit_rate": (recorded_hits / len(recorded_lookups)
+                                    if recorded_lookups else 0.0),
+        "queue_depth": {"max": max(depths, default=0),
+                        "mean": sum(depths) / len(depths) if depths else 0.0},
+        "in_flight": {"max": max(max(in_flight, default=0), backend.max_in_flight),
+                      "mean": sum(in_flight) / len(in_flight) if in_flight else 0.0},
+    }
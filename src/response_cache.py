@@ -0,0 +1,169 @@
+"""
+Response cache for the Smart Study Assistant
+
+Model responses are stored in SQLite keyed by a hash of the model settings and
+prompt. Entries older than the TTL are reported as stale rather than dropped,
+so they can still be served when the backend is unavailable.
+
+Reads never write: only the first use of an entry prepared ahead of time is
+recorded, so the prefetch hit rate can be reported.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    prefetched INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+def cache_key(config: Dict[str, Any], prompt: str) -> str:
+    """
+    Compute the cache key of a prompt under the given model settings
+
+    Args:
+        config: Configuration dictionary with model settings
+        prompt: The prompt text
+
+    Returns:
+        A hex SHA-256 digest
+    """
+    material = "\x1f".join([
+        str(config.get("model")),
+        str(config.get("temperature")),
+        str(config.get("max_tokens")),
+        prompt,
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    SQLite-backed cache of model responses with stale entries kept around
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_TTL):
+        """
+        Open (or create) a response cache
+
+        Args:
+            path: Path of the SQLite database file; None keeps the cache in memory
+            ttl: Seconds after which an entry is considered stale
+        """
+        path = path or ":memory:"
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "prefetched" not in columns:
+            # Caches created before prefetching was added
+            self._conn.execute(
+                "ALTER TABLE responses ADD COLUMN prefetched INTEGER NOT NULL DEFAULT 0"
+            )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, bool, bool]]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The response text, whether it is still fresh and whether it was
+            prepared ahead of being asked for, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, prefetched FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, created_at, prefetched = row
+        return value, time.time() - created_at < self.ttl, bool(prefetched)
+
+    def is_fresh(self, key: str, prepared_only: bool = False) -> bool:
+        """
+        Check whether a fresh entry exists
+
+        Args:
+            key: Cache key
+            prepared_only: Only count entries prepared ahead of being asked for
+
+        Returns:
+            True if the key is cached and within its TTL
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, prefetched FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (prepared_only and not row[1]):
+            return False
+        return time.time() - row[0] < self.ttl
+
+    def mark_used(self, key: str) -> None:
+        """
+        Record that a prepared entry was served
+
+        Only the first use is written, which is all the prefetch hit rate needs.
+
+        Args:
+            key: Cache key of a prepared entry
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE responses SET hits = 1 WHERE key = ? AND prefetched = 1 AND hits = 0",
+                (key,),
+            )
+            if cursor.rowcount:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+
+    def set(self, key: str, value: str, prefetched: bool = False) -> None:
+        """
+        Store a response
+
+        Args:
+            key: Cache key
+            value: Response text
+            prefetched: Whether the response was generated ahead of being asked for
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, hits, prefetched) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (key, value, time.time(), int(prefetched)),
+            )
+            self._conn.commit()
+
+    def prefetch_usage(self) -> Tuple[int, int]:
+        """
+        Count prefetched responses and how many of them were later used
+
+        Returns:
+            The number of prefetched entries and the number read at least once
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits > 0), 0) FROM responses WHERE prefetched = 1"
+            ).fetchone()
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,172 @@
+"""
+Local dependency-aware topic scheduling for the Smart Study Assistant
+
+Given per-topic importance, time estimates and prerequisite edges, topics are
+ordered with a topological sort and selected with a 0/1 knapsack over the
+available study time. Everything here is pure computation, so re-planning for
+different hours or topic lists needs no API call.
+"""
+
+import heapq
+from typing import Dict, List, Optional
+
+# Time is scheduled in units of this many hours
+TIME_UNIT = 0.5
+
+class TopicInfo:
+    """
+    Scheduling inputs for a single topic
+    """
+
+    def __init__(self, name: str, importance: float, hours: float,
+                 prerequisites: Optional[List[str]] = None, reason: str = ""):
+        """
+        Initialize the topic info
+
+        Args:
+            name: Topic name
+            importance: Relative importance for the study goal (higher is more important)
+            hours: Estimated hours needed to cover the topic
+            prerequisites: Names of topics that should be learned first
+            reason: Short justification of the importance rating
+        """
+        self.name = name
+        self.importance = importance
+        self.hours = hours
+        self.prerequisites = prerequisites or []
+        self.reason = reason
+
+class Schedule:
+    """
+    Result of scheduling topics into the available time
+    """
+
+    def __init__(self, order: List[str], allocation: Dict[str, float],
+                 skipped: List[str], ranking: List[str]):
+        """
+        Initialize the schedule
+
+        Args:
+            order: Selected topics in the order they should be studied
+            allocation: Hours allocated to each selected topic
+            skipped: Topics left out because they do not fit the available time
+            ranking: All topics from most to least important
+        """
+        self.order = order
+        self.allocation = allocation
+        self.skipped = skipped
+        self.ranking = ranking
+
+def topological_order(topics: Dict[str, TopicInfo]) -> List[str]:
+    """
+    Order topics so prerequisites come first, preferring more important topics
+
+    Prerequisite cycles are broken by releasing the most important topic still
+    waiting on one of its prerequisites.
+
+    Args:
+        topics: Topic info by name
+
+    Returns:
+        Topic names in study order
+    """
+    waiting = {
+        name: {p for p in info.prerequisites if p in topics and p != name}
+        for name, info in topics.items()
+    }
+    dependents = {name: [] for name in topics}
+    for name, prerequisites in waiting.items():
+        for prerequisite in prerequisites:
+            dependents[prerequisite].append(name)
+
+    ready = [(-topics[name].importance, name) for name, deps in waiting.items() if not deps]
+    heapq.heapify(ready)
+    order = []
+    while len(order) < len(topics):
+        if not ready:
+            # Cycle: release the most important blocked topic
+            name = max((n for n in waiting if waiting[n]), key=lambda n: topics[n].importance)
+            waiting[name] = set()
+            heapq.heappush(ready, (-topics[name].importance, name))
+        _, name = heapq.heappop(ready)
+        if name in order:
+            continue
+        order.append(name)
+        for dependent in dependents[name]:
+            waiting[dependent].discard(name)
+            if not waiting[dependent] and dependent not in order:
+                heapq.heappush(ready, (-topics[dependent].importance, dependent))
+    return order
+
+def _units(hours: float) -> int:
+    """Convert hours to whole scheduling units, at least one"""
+    return max(1, int(round(hours / TIME_UNIT)))
+
+def _knapsack(names: List[str], topics: Dict[str, TopicInfo], capacity: int) -> List[str]:
+    """Select the topics with the highest total importance that fit the capacity"""
+    best = [0.0] * (capacity + 1)
+    keep = [[False] * (capacity + 1) for _ in names]
+    for i, name in enumerate(names):
+        cost, value = _units(topics[name].hours), topics[name].importance
+        for c in range(capacity, cost - 1, -1):
+            if best[c - cost] + value > best[c]:
+                best[c] = best[c - cost] + value
+                keep[i][c] = True
+
+    selected, c = [], capacity
+    for i in range(len(names) - 1, -1, -1):
+        if keep[i][c]:
+            selected.append(names[i])
+            c -= _units(topics[names[i]].hours)
+    return selected
+
+def schedule_topics(topics: Dict[str, TopicInfo], time_available: float) -> Schedule:
+    """
+    Select, order and allocate time to topics
+
+    Args:
+        topics: Topic info by name
+        time_available: Available study time in hours
+
+    Returns:
+        The resulting schedule
+    """
+    order = topological_order(topics)
+    capacity = int(time_available / TIME_UNIT)
+    selected = set(_knapsack(order, topics, capacity))
+
+    # A topic is only useful if its prerequisites are studied too
+    changed = True
+    while changed:
+        changed = False
+        for name in list(selected):
+            if any(p in topics and p not in selected for p in topics[name].prerequisites):
+                selected.discard(name)
+                changed = True
+
+    # Fill time freed by the repair with topics whose prerequisites are covered
+    used = sum(_units(topics[name].hours) for name in selected)
+    for name in order:
+        cost = _units(topics[name].hours)
+        if (name not in selected and used + cost <= capacity
+                and all(p not in topics or p in selected for p in topics[name].prerequisites)):
+            selected.add(name)
+            used += cost
+
+    study_order = [name for name in order if name in selected]
+    allocation = {name: _units(topics[name].hours) * TIME_UNIT for name in study_order}
+
+    # Spread leftover time over the selected topics by importance
+    leftover = capacity - used
+    total_importance = sum(topics[name].importance for name in study_order)
+    if leftover > 0 and total_importance > 0:
+        for name in study_order:
+            share = int(leftover * topics[name].importance / total_importance)
+            allocation[name] += share * TIME_UNIT
+            used += share
+        for name in sorted(study_order, key=lambda n: -topics[n].importance)[:capacity - used]:
+            allocation[name] += TIME_UNIT
+
+    ranking = sorted(topics, key=lambda name: -topics[name].importance)
+    skipped = [name for name in ranking if name not in selected]
+    return Schedule(study_order, allocation, skipped, ranking)
@@ -0,0 +1,163 @@
+"""
+Persistent, resumable chat sessions for the Smart Study Assistant
+
+A session is an append-only JSON Lines log of turns, with a summary snapshot
+written every few turns. Resuming memory-maps the log and scans it backwards
+from the end, so only the latest summary and the turns after it are read, no
+matter how long the conversation has grown.
+"""
+
+import json
+import mmap
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_SNAPSHOT_EVERY = 10
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+class SessionLog:
+    """
+    Append-only log of one interactive session
+    """
+
+    def __init__(self, path: str, snapshot_every: int = DEFAULT_SNAPSHOT_EVERY):
+        """
+        Open (or create) a session log
+
+        Args:
+            path: Path of the JSON Lines log file
+            snapshot_every: Number of turns after which a new summary snapshot is due
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._turns_since_snapshot = None
+        self._tail_checked = False
+
+    @classmethod
+    def for_session(cls, sessions_dir: str, name: str,
+                    snapshot_every: int = DEFAULT_SNAPSHOT_EVERY) -> "SessionLog":
+        """
+        Open the log of a named session
+
+        Args:
+            sessions_dir: Directory holding session logs
+            name: Session name chosen by the student
+            snapshot_every: Number of turns after which a new summary snapshot is due
+
+        Returns:
+            The session log
+        """
+        filename = _SAFE_NAME.sub("_", name).strip("._") or "default"
+        return cls(os.path.join(sessions_dir, f"{filename}.jsonl"), snapshot_every)
+
+    def load(self) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """
+        Load the latest summary and the turns recorded after it
+
+        Returns:
+            The summary (None if no snapshot was written yet) and the turns after
+            it, oldest first, each a dict with "user" and "model" keys
+        """
+        summary, turns = None, []
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = len(mm)
+                while pos > 0:
+                    start = mm.rfind(b"\n", 0, pos - 1) + 1
+                    line = mm[start:pos].strip()
+                    pos = start
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A partially written last line from an interrupted run
+                        continue
+                    if record.get("type") == "snapshot":
+                        summary = record["summary"]
+                        break
+                    if record.get("type") == "turn":
+                        turns.append({"user": record["user"], "model": record["model"]})
+        turns.reverse()
+        self._turns_since_snapshot = len(turns)
+        return summary, turns
+
+    def append_turn(self, user_message: str, model_response: str) -> None:
+        """
+        Record one exchange
+
+        Args:
+            user_message: The student's message
+            model_response: The assistant's response
+        """
+        self._append({"type": "turn", "user": user_message, "model": model_response})
+        if self._turns_since_snapshot is None:
+            self.load()
+        else:
+            self._turns_since_snapshot += 1
+
+    def write_snapshot(self, summary: str) -> None:
+        """
+        Record a summary of the conversation so far
+
+        Args:
+            summary: Summary covering every turn up to now
+        """
+        self._append({"type": "snapshot", "summary": summary})
+        self._turns_since_snapshot = 0
+
+    def snapshot_due(self) -> bool:
+        """
+        Check whether enough turns have passed to write a new snapshot
+
+        Returns:
+            True if a snapshot should be written
+        """
+        if self._turns_since_snapshot is None:
+            self.load()
+        return self._turns_since_snapshot >= self.snapshot_every
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """Append one record as a single line"""
+        record["ts"] = time.time()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with open(self.path, "ab") as f:
+            if not self._tail_checked:
+                # An interrupted run can leave a partial last line; end it, so
+                # this record starts on a line of its own and is not lost too
+                if f.tell() > 0:
+                    with open(self.path, "rb") as tail:
+                        tail.seek(-1, os.SEEK_END)
+                        if tail.read(1) != b"\n":
+                            f.write(b"\n")
+                self._tail_checked = True
+            f.write(line.encode("utf-8"))
+
+def to_history(summary: Optional[str], turns: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Build a Gemini chat history from a session summary and recent turns
+
+    Args:
+        summary: Summary of the earlier conversation, if any
+        turns: Turns after the summary, oldest first
+
+    Returns:
+        Chat history entries
+    """
+    history = []
+    if summary:
+        history.append({"role": "user", "parts": [
+            f"Here is a summary of our conversation so far:\n\n{summary}"
+        ]})
+        history.append({"role": "model", "parts": [
+            "Thanks, I have the context of our earlier conversation."
+        ]})
+    for turn in turns:
+        history.append({"role": "user", "parts": [turn["user"]]})
+        history.append({"role": "model", "parts": [turn["model"]]})
+    return history
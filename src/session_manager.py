@@ -0,0 +1,391 @@
+"""
+Multi-tenant chat session management for the Smart Study Assistant
+
+Many concurrent chats share one SmartStudyAssistant (and so one Gemini model
+and transport). Each session keeps only a compact list of turn texts. Idle
+sessions expire after a TTL, the least recently used sessions are moved out of
+memory when there are too many or when a memory budget is exceeded, and moved
+sessions are spilled to disk so they can be resumed later. Spill files are
+written and read outside the manager lock, so one session's disk I/O never
+holds up the others, and spill files left idle past the TTL are swept away.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.assistant import SmartStudyAssistant
+from src.deadline import Deadline, current_deadline, deadline_scope
+from src.profiler import Profiler, profile_scope
+
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_SESSION_TTL = 3600
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Locks ordering the disk I/O of each session's spill file; sessions share
+# them by hash, so the number of locks stays fixed however many sessions exist
+_IO_STRIPES = 64
+
+# Most often the spill directory is swept for expired sessions, in seconds
+_SWEEP_INTERVAL = 60.0
+
+class _Session:
+    """
+    Compact in-memory history of one chat session
+    """
+
+    __slots__ = ("turns", "last_used", "size", "lock", "active")
+
+    def __init__(self, turns: Optional[List[str]] = None, last_used: Optional[float] = None):
+        # Alternating user and model texts; storing plain strings instead of
+        # role/parts dicts keeps per-turn overhead small
+        self.turns = turns or []
+        self.last_used = last_used or time.time()
+        self.size = sum(sys.getsizeof(turn) for turn in self.turns)
+        self.lock = threading.Lock()
+        self.active = 0
+
+    def to_history(self) -> List[Dict[str, Any]]:
+        """Expand the compact turns into Gemini chat history entries"""
+        return [
+            {"role": "user" if i % 2 == 0 else "model", "parts": [text]}
+            for i, text in enumerate(self.turns)
+        ]
+
+    def append(self, user_text: str, model_text: str) -> int:
+        """Record one exchange and return the number of bytes added"""
+        self.turns += [user_text, model_text]
+        added = sys.getsizeof(user_text) + sys.getsizeof(model_text)
+        self.size += added
+        return added
+
+class SessionManager:
+    """
+    Serve independent chat sessions, keyed by session ID, from one assistant
+    """
+
+    def __init__(self, assistant: SmartStudyAssistant, config: Dict[str, Any]):
+        """
+        Initialize the session manager
+
+        Args:
+            assistant: Shared assistant used for every session
+            config: Configuration dictionary; reads max_sessions, session_ttl,
+                session_memory_budget, session_spill_dir, profile and profile_dir
+        """
+        self.assistant = assistant
+        self.max_sessions = config.get("max_sessions", DEFAULT_MAX_SESSIONS)
+        self.ttl = config.get("session_ttl", DEFAULT_SESSION_TTL)
+        self.memory_budget = config.get("session_memory_budget", DEFAULT_MEMORY_BUDGET)
+        self.spill_dir = config.get("session_spill_dir")
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        # Opt-in per-request phase timing, with a Chrome trace per request
+        self.profile = config.get("profile", False)
+        self.profile_dir = config.get("profile_dir")
+
+        self._sessions = OrderedDict()
+        self._memory = 0
+        self._lock = threading.Lock()
+        # Sessions being restored from disk, each with an event set once it is resident
+        self._loading: Dict[str, threading.Event] = {}
+        # Sessions picked for spilling whose files are not written yet, each
+        # with a token identifying that spill
+        self._spilling: Dict[str, Tuple[_Session, object]] = {}
+        self._io_locks = [threading.Lock() for _ in range(_IO_STRIPES)]
+        self._swept = 0.0
+        self._stats = {"spilled": 0, "restored": 0, "expired": 0}
+        self._phases: Dict[str, Dict[str, float]] = {}
+
+    def chat(self, session_id: str, message: str, timeout: Optional[float] = None) -> str:
+        """
+        Send a message within a session
+
+        Messages within one session are handled one at a time; different
+        sessions run concurrently.
+
+        Args:
+            session_id: ID of the session
+            message: User's message
+            timeout: Optional time limit in seconds for the whole request,
+                including waiting behind an earlier message in the same session
+
+        Returns:
+            Assistant's response
+        """
+        deadline = Deadline(timeout, parent=current_deadline())
+        profiler = Profiler() if self.profile else None
+        session = self._acquire(session_id)
+        try:
+            with deadline_scope(deadline), \
+                    profile_scope(profiler) if profiler is not None else nullcontext(), \
+                    session.lock:
+                history = session.to_history()
+                response = self.assistant.chat(message, history=history)
+                # Only keep exchanges that completed; a failed call leaves no turn behind
+                if len(history) >= len(session.turns) + 2 and not response.startswith("Error"):
+                    # The raw message, not the prompt built around it: the
+                    # assistant adds its system context to the new message only
+                    added = session.append(message, history[-1]["parts"][0])
+                    with self._lock:
+                        self._memory += added
+        finally:
+            self._release(session)
+            if profiler is not None:
+                self._record_profile(session_id, profiler)
+        return response
+
+    def history(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the chat history of a session
+
+        Args:
+            session_id: ID of the session
+
+        Returns:
+            The history as Gemini chat entries (empty for unknown sessions)
+        """
+        session = self._acquire(session_id)
+        try:
+            with session.lock:
+                return session.to_history()
+        finally:
+            self._release(session)
+
+    def end_session(self, session_id: str) -> None:
+        """
+        Drop a session from memory and disk
+
+        Args:
+            session_id: ID of the session
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._memory -= session.size
+            self._spilling.pop(session_id, None)
+        self._remove_spills([session_id])
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get session counters
+
+        Returns:
+            Resident session count, approximate memory use, and spill, restore
+            and expiry counts; with profiling on, also per-phase call counts and
+            total wall and CPU seconds across requests, where CPU is that of the
+            threads doing the work, so concurrent sessions are not counted twice
+        """
+        with self._lock:
+            stats = dict(self._stats, resident=len(self._sessions), memory=self._memory)
+            if self.profile:
+                stats["phases"] = {name: dict(totals) for name, totals in self._phases.items()}
+            return stats
+
+    def _record_profile(self, session_id: str, profiler: Profiler) -> None:
+        """Add a request's phases to the totals and write its trace"""
+        profiler.stop()
+        with self._lock:
+            for row in profiler.breakdown():
+                name = "request" if row["name"] == "total" else row["name"]
+                totals = self._phases.setdefault(name, {"count": 0, "wall": 0.0, "cpu": 0.0})
+                totals["count"] += row["count"]
+                totals["wall"] += row["wall"]
+                totals["cpu"] += row["cpu"]
+        if self.profile_dir:
+            digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:12]
+            name = f"{int(time.time() * 1000)}-{digest}.json"
+            profiler.write_trace(os.path.join(self.profile_dir, name))
+
+    def _acquire(self, session_id: str) -> _Session:
+        """Get a session, restoring it from disk or creating it as needed"""
+        self._sweep()
+        while True:
+            with self._lock:
+                expired = self._expire()
+                session = self._sessions.get(session_id)
+                if session is None and session_id in self._spilling:
+                    # Picked for spilling but not written out yet: take it back
+                    session = self._spilling.pop(session_id)[0]
+                loading = None
+                if session is not None:
+                    victims = self._claim(session_id, session)
+                else:
+                    loading = self._loading.get(session_id)
+                    if loading is None:
+                        # This caller restores the session; others wait for it
+                        self._loading[session_id] = threading.Event()
+            self._remove_spills(expired)
+            if session is not None:
+                break
+            if loading is not None:
+                loading.wait()
+                continue
+            try:
+                session = self._restore(session_id) or _Session()
+            finally:
+                with self._lock:
+                    self._loading.pop(session_id).set()
+                    if session is not None:
+                        victims = self._claim(session_id, session)
+            break
+        self._spill(victims)
+        return session
+
+    def _claim(self, session_id: str, session: _Session) -> List[Tuple[str, _Session, object]]:
+        """Make a session resident and in use; caller holds the lock"""
+        if session_id not in self._sessions:
+            self._sessions[session_id] = session
+            self._memory += session.size
+        self._sessions.move_to_end(session_id)
+        session.last_used = time.time()
+        # Sessions in use stay resident until released
+        session.active += 1
+        return self._enforce_limits()
+
+    def _release(self, session: _Session) -> None:
+        """Mark a session as no longer in use and apply the limits again"""
+        with self._lock:
+            session.active -= 1
+            victims = self._enforce_limits()
+        self._spill(victims)
+
+    def _expire(self) -> List[str]:
+        """
+        Drop sessions idle for longer than the TTL; caller holds the lock
+
+        Returns:
+            IDs of the dropped sessions, whose spill files the caller removes
+            after releasing the lock
+        """
+        cutoff = time.time() - self.ttl
+        expired = []
+        for session_id, session in list(self._sessions.items()):
+            if session.last_used >= cutoff:
+                # Sessions are in LRU order, so the rest are fresher still
+                break
+            if session.active:
+                # In the middle of a long request; idle sessions behind it still expire
+                continue
+            del self._sessions[session_id]
+            self._memory -= session.size
+            self._stats["expired"] += 1
+            expired.append(session_id)
+        return expired
+
+    def _enforce_limits(self) -> List[Tuple[str, _Session, object]]:
+        """
+        Move least recently used sessions beyond the limits out of memory; caller holds the lock
+
+        Returns:
+            The sessions to spill, with their spill tokens, for the caller to
+            write after releasing the lock; without a spill directory they are
+            dropped instead
+        """
+        victims = []
+        for session_id, session in list(self._sessions.items()):
+            if not self._over_limit():
+                break
+            if session.active:
+                # In the middle of a request; spill it on a later pass
+                continue
+            del self._sessions[session_id]
+            self._memory -= session.size
+            if self.spill_dir:
+                token = object()
+                self._spilling[session_id] = (session, token)
+                victims.append((session_id, session, token))
+        return victims
+
+    def _over_limit(self) -> bool:
+        """Check whether resident sessions exceed the count or memory limits"""
+        return len(self._sessions) > self.max_sessions or self._memory > self.memory_budget
+
+    def _spill(self, victims: List[Tuple[str, _Session, object]]) -> None:
+        """Write sessions picked by _enforce_limits to disk, outside the manager lock"""
+        for session_id, session, token in victims:
+            path = self._spill_path(session_id)
+            with self._io_lock(session_id):
+                with self._lock:
+                    if self._spilling.get(session_id, (None, None))[1] is not token:
+                        # Taken back or ended before it was written
+                        continue
+                payload = json.dumps({"turns": session.turns, "last_used": session.last_used})
+                with open(path + ".tmp", "wb") as f:
+                    f.write(zlib.compress(payload.encode("utf-8")))
+                os.replace(path + ".tmp", path)
+                with self._lock:
+                    if self._spilling.get(session_id, (None, None))[1] is token:
+                        del self._spilling[session_id]
+                    self._stats["spilled"] += 1
+
+    def _restore(self, session_id: str) -> Optional[_Session]:
+        """Load a spilled session from disk, if there is one; called without the lock"""
+        path = self._spill_path(session_id)
+        if not path:
+            return None
+        with self._io_lock(session_id):
+            try:
+                with open(path, "rb") as f:
+                    data = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+            except FileNotFoundError:
+                return None
+            os.remove(path)
+        expired = data["last_used"] < time.time() - self.ttl
+        with self._lock:
+            self._stats["expired" if expired else "restored"] += 1
+        return None if expired else _Session(data["turns"], data["last_used"])
+
+    def _remove_spills(self, session_ids: List[str]) -> None:
+        """Delete the spill files of sessions, if they have any; called without the lock"""
+        for session_id in session_ids:
+            path = self._spill_path(session_id)
+            if not path:
+                return
+            with self._io_lock(session_id):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _sweep(self) -> None:
+        """Delete spill files untouched for longer than the TTL, at most every _SWEEP_INTERVAL"""
+        if not self.spill_dir:
+            return
+        now = time.time()
+        with self._lock:
+            if now - self._swept < _SWEEP_INTERVAL:
+                return
+            self._swept = now
+        # A file is written after its session's last use, so one older than
+        # the TTL belongs to a session that has expired
+        cutoff = now - self.ttl
+        removed = 0
+        for entry in os.scandir(self.spill_dir):
+            try:
+                if entry.name.endswith(".session") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                # Restored or removed meanwhile
+                continue
+        if removed:
+            with self._lock:
+                self._stats["expired"] += removed
+
+    def _io_lock(self, session_id: str) -> threading.Lock:
+        """Lock ordering the disk I/O of a session's spill file"""
+        digest = hashlib.sha256(session_id.encode("utf-8")).digest()
+        return self._io_locks[digest[0] % _IO_STRIPES]
+
+    def _spill_path(self, session_id: str) -> Optional[str]:
+        """Path of a session's spill file, or None if spilling is disabled"""
+        if not self.spill_dir:
+            return None
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.session")
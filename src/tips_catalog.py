@@ -0,0 +1,180 @@
+"""
+Precomputed offline catalog of study tips for the Smart Study Assistant
+
+Study tip endpoints with small, fixed input spaces (general tips, the four
+learning styles, common study challenges) are generated ahead of time into a
+versioned, gzip-compressed JSON catalog. Entries are keyed by a hash of the
+normalized prompt, so editing a prompt simply makes its old entry miss.
+
+A catalog ships with the package in src/data; refreshed catalogs are written
+to the data directory and take precedence over it.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.concurrency import ordered_map, DEFAULT_MAX_WORKERS
+from src.gemini_client import GeminiClient
+
+CATALOG_FORMAT_VERSION = 1
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), "data", "tips_catalog.json.gz")
+
+LEARNING_STYLES = ["visual", "auditory", "reading/writing", "kinesthetic"]
+
+COMMON_CHALLENGES = [
+    "procrastination",
+    "test anxiety",
+    "lack of motivation",
+    "difficulty concentrating",
+    "poor time management",
+    "information overload",
+    "burnout",
+    "forgetting material",
+]
+
+def prompt_key(prompt: str) -> str:
+    """
+    Compute the catalog key of a prompt
+
+    Whitespace and case are normalized, so cosmetic differences in how an
+    endpoint is called (e.g. "Procrastination" vs "procrastination") still hit.
+
+    Args:
+        prompt: The prompt text
+
+    Returns:
+        A hex SHA-256 digest
+    """
+    normalized = " ".join(prompt.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+class TipsCatalog:
+    """
+    Lazily loaded catalog of precomputed study tips
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH, fallback_path: Optional[str] = None):
+        """
+        Initialize the catalog; the file is only read on first lookup
+
+        Args:
+            path: Path of the gzip-compressed JSON catalog; refreshes are written here
+            fallback_path: Catalog to read while path does not exist yet, such as
+                the one shipped with the package
+        """
+        self.path = path
+        self.fallback_path = fallback_path
+        self._entries = None
+        self.metadata = {}
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str) -> Optional[str]:
+        """
+        Look up the precomputed response to a prompt
+
+        Args:
+            prompt: The prompt an endpoint would send to the model
+
+        Returns:
+            The stored response, or None if the catalog has no entry for it
+        """
+        entry = self._load().get(prompt_key(prompt))
+        return entry["text"] if entry else None
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the catalog file on first use; a missing or outdated file is empty"""
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    path = self.path
+                    if self.fallback_path and not os.path.exists(path):
+                        path = self.fallback_path
+                    entries = {}
+                    try:
+                        with gzip.open(path, "rt", encoding="utf-8") as f:
+                            catalog = json.load(f)
+                        if catalog.get("format_version") == CATALOG_FORMAT_VERSION:
+                            entries = catalog["entries"]
+                            self.metadata = {k: v for k, v in catalog.items() if k != "entries"}
+                    except (OSError, ValueError, KeyError):
+                        pass
+                    self._entries = entries
+        return self._entries
+
+class _RecordingClient:
+    """
+    Client proxy that records every prompt and its response
+    """
+
+    def __init__(self, client: GeminiClient):
+        self.client = client
+        self.config = client.config
+        self.records = {}
+
+    def generate_text(self, prompt: str) -> str:
+        text = self.client.generate_text(prompt)
+        self.records[prompt] = text
+        return text
+
+def build_tips_catalog(client: GeminiClient, path: str = DEFAULT_CATALOG_PATH,
+                       extra_prompts: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Generate every catalog entry and write a new catalog file
+
+    Args:
+        client: GeminiClient used to generate the responses
+        path: Where to write the catalog
+        extra_prompts: Additional fixed prompts to include, for endpoints
+            outside StudyTips
+
+    Returns:
+        The catalog metadata, including the number of entries and failures
+    """
+    # Imported here: the feature module is a consumer of this catalog
+    from src.features.study_tips import StudyTips
+
+    recorder = _RecordingClient(client)
+    tips = StudyTips(recorder)
+    jobs: List[Callable[[], str]] = [tips.get_general_tips]
+    jobs += [lambda style=style: tips.get_tips_for_learning_style(style) for style in LEARNING_STYLES]
+    jobs += [lambda challenge=challenge: tips.overcome_challenge(challenge)
+             for challenge in COMMON_CHALLENGES]
+    jobs += [lambda prompt=prompt: recorder.generate_text(prompt) for prompt in extra_prompts or []]
+
+    max_workers = client.config.get("max_concurrency", DEFAULT_MAX_WORKERS)
+    for _ in ordered_map(lambda job: job(), jobs, max_workers):
+        pass
+
+    entries = {
+        prompt_key(prompt): {"text": text}
+        for prompt, text in recorder.records.items()
+        if not text.startswith("Error")
+    }
+    catalog = {
+        "format_version": CATALOG_FORMAT_VERSION,
+        "version": time.strftime("%Y%m%d%H%M%S", time.gmtime()),
+        "model": client.config.get("model"),
+        "entries": entries,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+        json.dump(catalog, f)
+    os.replace(temp_path, path)
+
+    return {
+        "version": catalog["version"],
+        "model": catalog["model"],
+        "entries": len(entries),
+        "failed": len(recorder.records) - len(entries),
+    }
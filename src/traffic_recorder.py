@@ -0,0 +1,149 @@
+"""
+Traffic recording for the Smart Study Assistant
+
+When enabled, the Gemini client appends one JSON line per request to a traffic
+log: the method, prompt and response sizes, model parameters, how the request
+was answered (cache, model, stale cache or error) and how long it took. Prompt
+text is never written; prompts are identified by a salted hash, so repeated
+prompts (and therefore cache behaviour) can be reproduced by the replay tool
+without revealing what students asked. Unless a salt is configured, one is
+generated on first use and kept next to the other data, so hashes stay
+comparable across recording sessions.
+
+Background calls are recorded too: answers prefetched ahead of time
+("prefetch") and stale answers regenerated after the backend recovers
+("refresh"), so a replay sees the full load the model served.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+class TrafficRecorder:
+    """
+    Append request shapes to a JSON Lines traffic log
+    """
+
+    def __init__(self, path: str, config: Dict[str, Any], salt: Optional[str] = None,
+                 salt_path: Optional[str] = None):
+        """
+        Open (or create) a traffic log
+
+        Args:
+            path: Path of the log; records are appended
+            config: Client configuration, for the model parameters of each record
+            salt: Secret mixed into prompt hashes
+            salt_path: File keeping a generated salt when none is given; without
+                it a random salt is used per process, so hashes only match
+                within one recording session
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._params = {
+            "model": config.get("model"),
+            "temperature": config.get("temperature"),
+            "max_tokens": config.get("max_tokens"),
+        }
+        if not salt:
+            salt = load_salt(salt_path) if salt_path else os.urandom(16).hex()
+        self._salt = salt.encode("utf-8")
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def prompt_hash(self, prompt: str) -> str:
+        """
+        Identify a prompt without revealing it
+
+        Args:
+            prompt: The prompt text
+
+        Returns:
+            A short salted SHA-256 hex digest
+        """
+        return hashlib.sha256(self._salt + prompt.encode("utf-8")).hexdigest()[:16]
+
+    def record(self, method: str, prompt: str, status: str, latency: float,
+               response: str, **fields: Any) -> None:
+        """
+        Append one request to the log
+
+        Args:
+            method: Client method (generate_text, generate_json or chat), or
+                prefetch and refresh for background calls
+            prompt: The prompt or chat message; only its hash and size are kept
+            status: How the request was answered: cached, fresh, stale or error
+            latency: Seconds the request took
+            response: The response text; only its size is kept
+            fields: Extra request shape values, such as the chat history size
+        """
+        entry = {
+            "ts": time.time(),
+            "method": method,
+            "prompt_hash": self.prompt_hash(prompt),
+            "prompt_chars": len(prompt),
+            "status": status,
+            "latency": round(latency, 4),
+            "response_chars": len(response),
+        }
+        entry.update(self._params)
+        entry.update(fields)
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+                self._file.flush()
+
+    def close(self) -> None:
+        """Close the log"""
+        with self._lock:
+            self._file.close()
+
+def load_salt(path: str) -> str:
+    """
+    Read the persisted prompt hash salt, generating it on first use
+
+    Args:
+        path: Path of the salt file; created readable by the owner only
+
+    Returns:
+        The salt
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    salt = os.urandom(16).hex()
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, "r", encoding="utf-8") as f:
+            stored = f.read().strip()
+        if stored:
+            return stored
+        # An empty file left by a crash while writing; replace it
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(salt)
+        return salt
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(salt)
+    return salt
+
+def load_traffic(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read a traffic log
+
+    Args:
+        path: Path of a log written by TrafficRecorder
+
+    Returns:
+        An iterator over the records in the order they were written; lines
+        that are not valid records (such as a line cut off by a crash) are skipped
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and "ts" in entry and "method" in entry:
+                yield entry
@@ -6,11 +6,13 @@ import pytest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import time
 
 # Add the src directory to the path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.assistant import SmartStudyAssistant
+from src.session_log import SessionLog, to_history
 
 @pytest.fixture
 def mock_config():
@@ -71,4 +73,83 @@ def test_chat(assistant, mock_client):
     assert result == "Mocked chat response"
     
     args, _ = mock_client.chat.call_args
-    assert "study" in args[0].lower()
\ No newline at end of file
+    assert "study" in args[0].lower()
+
+def test_create_long_study_plan_expands_outline_in_order(assistant, mock_client, mock_config):
+    mock_client.config = mock_config
+    mock_client.generate_json.return_value = {
+        "introduction": "Build foundations first.",
+        "blocks": [
+            {"block": 1, "title": "Limits", "topics": ["Limits"]},
+            {"block": 2, "title": "Derivatives", "topics": ["Derivatives"]},
+        ],
+        "tips": ["Practice daily"],
+    }
+    mock_client.generate_text.side_effect = lambda prompt: (
+        "Block one" if "days 1 to 7" in prompt else "Block two"
+    )
+    
+    sections = list(assistant.stream_study_plan("calculus", 14, 2, "exam preparation"))
+    
+    assert "Build foundations first." in sections[0]
+    assert sections[1:3] == ["Block one", "Block two"]
+    assert "- [ ] Derivatives" in sections[-1]
+    assert mock_client.generate_text.call_count == 2
+
+def test_outline_accepts_string_block_numbers(assistant, mock_client, mock_config):
+    mock_client.config = mock_config
+    mock_client.generate_json.return_value = {
+        "introduction": "Intro",
+        "blocks": [
+            {"block": "1", "title": "Limits", "topics": ["Limits"]},
+            {"block": "two", "title": "Derivatives", "topics": ["Derivatives"]},
+        ],
+        "tips": [],
+    }
+    mock_client.generate_text.return_value = "Block"
+    
+    sections = list(assistant.stream_study_plan("calculus", 14, 2, "exam preparation"))
+    
+    assert "Limits" in sections[0] and "Derivatives" in sections[0]
+    assert "Review and consolidation" not in sections[0]
+
+def test_chat_in_session_writes_snapshots(tmp_path, assistant, mock_client):
+    log = SessionLog(str(tmp_path / "s.jsonl"), snapshot_every=2)
+    mock_client.generate_text.return_value = "Summary"
+    
+    assistant.chat_in_session(log, "first")
+    mock_client.generate_text.assert_not_called()
+    assistant.chat_in_session(log, "second")
+    
+    assert log.load() == ("Summary", [])
+    assert mock_client.history == to_history("Summary", [])
+    assert assistant.resume_session(log)
+
+def test_empty_session_has_nothing_to_resume(tmp_path, assistant):
+    assert not assistant.resume_session(SessionLog(str(tmp_path / "new.jsonl")))
+
+def test_simplify_long_text_streams_every_part_in_order(assistant, mock_client, mock_config):
+    mock_client.config = mock_config
+    paragraphs = [f"Paragraph {i} about thermodynamic equilibrium. " * 12 for i in range(40)]
+    text = "\n\n".join(paragraphs)
+    
+    def simplify(prompt):
+        part = prompt.split("Part to simplify:")[1].split("Text just after")[0]
+        # Later parts finish first; the output must stay in order anyway
+        time.sleep(0.05 if "Paragraph 0 " in part else 0)
+        return "Simple: " + ",".join(str(i) for i in range(40) if f"Paragraph {i} " in part)
+    mock_client.generate_text.side_effect = simplify
+    
+    parts = list(assistant.stream_simplified_text(text))
+    
+    assert len(parts) > 1
+    covered = [int(i) for part in parts for i in part[len("Simple: "):].split(",")]
+    assert covered == list(range(40))
+    prompts = [call.args[0] for call in mock_client.generate_text.call_args_list]
+    assert any("part 1 of" in p and "(start of text)" in p for p in prompts)
+    assert any("Text just before" in p and "Paragraph 0 " not in p.split("Part to simplify:")[1]
+               and "Paragraph" in p.split("Part to simplify:")[0] for p in prompts)
+
+def test_simplify_short_text_is_one_call(assistant, mock_client):
+    assert assistant.simplify_text("Entropy measures disorder.") == "Mocked response"
+    assert mock_client.generate_text.call_count == 1
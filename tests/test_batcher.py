@@ -0,0 +1,116 @@
+"""
+Tests for micro-batching of small requests
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+import json
+import re
+import time
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.batcher import MicroBatcher
+from src.concurrency import ordered_map
+from src.features.quiz_generator import QuizGenerator
+from src.gemini_client import GeminiClient
+from src.response_cache import cache_key
+
+@pytest.fixture
+def client():
+    config = {
+        "api_key": "fake_api_key",
+        "model": "gemini-pro",
+        "max_tokens": 512,
+        "temperature": 0.7,
+    }
+    with patch("src.gemini_client.genai"):
+        client = GeminiClient(config)
+    return client
+
+def answer_items(prompt, **kwargs):
+    """Fake backend: answer packed prompts item by item, others directly"""
+    items = re.findall(r"<<<(item-\d+)>>>\n(.*?)\n<<<end", prompt, re.S)
+    if items:
+        text = json.dumps({item_id: f"Answer to {body}" for item_id, body in items})
+    else:
+        text = f"Answer to {prompt.strip()}"
+    return MagicMock(text=text)
+
+def test_concurrent_requests_share_one_call(client):
+    client.model.generate_content.side_effect = answer_items
+    batcher = MicroBatcher(client, window=0.2, max_batch=8)
+    prompts = [f"Define term {i}" for i in range(8)]
+    
+    results = list(ordered_map(lambda p: batcher.submit("define", p), prompts, max_workers=8))
+    
+    assert results == [f"Answer to {p}" for p in prompts]
+    assert client.model.generate_content.call_count == 1
+    assert batcher.stats()["batched_items"] == 8
+    
+    # Answers were stored under their own prompts
+    assert client.cache.get(cache_key(client.config, "Define term 3"))[0] == "Answer to Define term 3"
+
+def test_large_bursts_are_split_into_batches(client):
+    client.model.generate_content.side_effect = answer_items
+    batcher = MicroBatcher(client, window=0.2, max_batch=4)
+    prompts = [f"Define term {i}" for i in range(10)]
+    
+    results = list(ordered_map(lambda p: batcher.submit("define", p), prompts, max_workers=10))
+    
+    assert results == [f"Answer to {p}" for p in prompts]
+    assert client.model.generate_content.call_count <= 4
+    assert batcher.stats()["fallbacks"] == 0
+
+def test_unparseable_batch_falls_back_to_single_calls(client):
+    def backend(prompt):
+        if "<<<item-" in prompt:
+            return MagicMock(text="Sorry, I can only answer one question at a time.")
+        return answer_items(prompt)
+    client.model.generate_content.side_effect = backend
+    batcher = MicroBatcher(client, window=0.2, max_batch=3)
+    prompts = ["Define A", "Define B", "Define C"]
+    
+    results = list(ordered_map(lambda p: batcher.submit("define", p), prompts, max_workers=3))
+    
+    assert results == [f"Answer to {p}" for p in prompts]
+    assert batcher.stats()["fallbacks"] == 3
+    assert client.model.generate_content.call_count == 4
+
+def test_check_answers_uses_the_batcher(client):
+    client.model.generate_content.side_effect = answer_items
+    quiz = QuizGenerator(client, batcher=MicroBatcher(client, window=0.2))
+    
+    feedback = quiz.check_answers([("2+2?", "4"), ("Capital of France?", "Paris")])
+    
+    assert len(feedback) == 2
+    assert "User's answer: Paris" in feedback[1]
+    assert client.model.generate_content.call_count == 1
+
+def test_packed_calls_get_each_items_output_budget(client):
+    client.model.generate_content.side_effect = answer_items
+    batcher = MicroBatcher(client, window=0.2, max_batch=8, output_limit=2048)
+    prompts = [f"Define term {i}" for i in range(4)]
+    
+    assert batcher.max_batch == 4
+    list(ordered_map(lambda p: batcher.submit("define", p), prompts, max_workers=4))
+    
+    kwargs = client.model.generate_content.call_args.kwargs
+    assert kwargs["generation_config"] == {"max_output_tokens": 2048}
+
+def test_large_max_tokens_still_packs_items(client):
+    client.config["max_tokens"] = 5096
+    
+    assert MicroBatcher(client, window=0.2).max_batch == 8
+
+def test_single_item_batches_skip_the_window(client):
+    client.model.generate_content.side_effect = answer_items
+    batcher = MicroBatcher(client, window=5.0, output_limit=512, item_tokens=512)
+    
+    start = time.monotonic()
+    assert batcher.submit("define", "Define A") == "Answer to Define A"
+    assert time.monotonic() - start < 1.0
+    assert batcher.max_batch == 1
@@ -0,0 +1,118 @@
+"""
+Tests for syllabus-driven cache warming
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+import json
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.assistant import SmartStudyAssistant
+from src.cache_warmer import CacheWarmer, WarmEntry, load_syllabus, syllabus_entries
+
+SYLLABUS_YAML = """
+subjects:
+  - name: Biology
+    concepts: [Osmosis, Mitosis]
+    topics: [Cell division]
+    materials: [cells.md, missing.md]
+defaults:
+  difficulties: [easy, hard]
+  quiz_questions: 3
+"""
+
+@pytest.fixture
+def assistant():
+    config = {
+        "api_key": "fake_api_key",
+        "model": "gemini-pro",
+        "max_tokens": 2048,
+        "temperature": 0.7,
+    }
+    with patch("src.gemini_client.genai"):
+        assistant = SmartStudyAssistant(config)
+    assistant.client.model.generate_content.return_value = MagicMock(text="Answer")
+    return assistant
+
+@pytest.fixture
+def syllabus_path(tmp_path):
+    (tmp_path / "cells.md").write_text("Cells divide by mitosis.")
+    path = tmp_path / "syllabus.yaml"
+    path.write_text(SYLLABUS_YAML)
+    return str(path)
+
+def test_syllabus_expands_into_entries(syllabus_path):
+    entries = syllabus_entries(load_syllabus(syllabus_path), os.path.dirname(syllabus_path))
+    
+    labels = [entry.label() for entry in entries]
+    assert labels[:2] == ["explanation: Osmosis", "explanation: Mitosis"]
+    assert "quiz: Cell division (difficulty=hard, questions=3)" in labels
+    assert "flashcards: Cell division (cards=10)" in labels
+    assert len(entries) == 7
+
+def test_json_syllabus_with_a_single_subject(tmp_path):
+    path = tmp_path / "syllabus.json"
+    path.write_text(json.dumps({"name": "Physics", "concepts": ["Entropy"]}))
+    
+    entries = syllabus_entries(load_syllabus(str(path)))
+    
+    assert [(entry.subject, entry.kind) for entry in entries] == [("Physics", "explanation")]
+
+def test_invalid_syllabus_is_rejected(tmp_path):
+    path = tmp_path / "syllabus.json"
+    path.write_text("[1, 2]")
+    
+    with pytest.raises(ValueError):
+        load_syllabus(str(path))
+
+def test_warm_skips_fresh_entries_and_reports_coverage(assistant, syllabus_path):
+    entries = syllabus_entries(load_syllabus(syllabus_path), os.path.dirname(syllabus_path))
+    warmer = CacheWarmer(assistant)
+    
+    assert warmer.warm(entries, check_only=True)["covered"] == 0
+    assistant.client.model.generate_content.assert_not_called()
+    
+    report = warmer.warm(entries)
+    assert report["kinds"]["quiz"]["warmed"] == 2
+    assert report["failed"] == [f"study_notes: {os.path.join(os.path.dirname(syllabus_path), 'missing.md')}"]
+    assert report["covered"] == 6
+    assert assistant.client.model.generate_content.call_count == 6
+    
+    report = warmer.warm(entries)
+    assert report["kinds"]["explanation"]["fresh"] == 2
+    assert report["subjects"]["Biology"] == {"total": 7, "covered": 6}
+    assert assistant.client.model.generate_content.call_count == 6
+    
+    # Warmed entries are what the student-facing calls hit
+    assert assistant.explain_concept("Osmosis") == "Answer"
+    assert assistant.generate_quiz("Cell division", 3, "easy") == "Answer"
+    assert assistant.client.model.generate_content.call_count == 6
+
+def test_warmed_quiz_questions_are_still_unseen(tmp_path):
+    config = {"api_key": "fake_api_key", "model": "gemini-pro", "max_tokens": 2048,
+              "temperature": 0.7, "question_bank_path": str(tmp_path / "bank.db")}
+    with patch("src.gemini_client.genai"):
+        assistant = SmartStudyAssistant(config)
+    questions = [
+        {"type": "multiple choice", "question": text, "options": ["A", "B", "C", "D"],
+         "answer": "A", "explanation": "Because."}
+        for text in ["Which organelle produces most of the cell's energy?",
+                     "Where is the genetic material of a eukaryotic cell stored?",
+                     "What structure controls what enters and leaves a cell?"]
+    ]
+    model = assistant.client.model
+    model.generate_content.return_value = MagicMock(text=json.dumps(questions))
+    
+    report = CacheWarmer(assistant).warm([WarmEntry("quiz", "Biology", "Cells",
+                                                    difficulty="easy", questions=3)])
+    assert report["covered"] == 1
+    assert model.generate_content.call_count == 1
+    
+    quiz = assistant.generate_quiz("Cells", 3, "easy")
+    
+    assert "### Question 3" in quiz
+    assert model.generate_content.call_count == 1
@@ -0,0 +1,114 @@
+"""
+Tests for incremental chunk summarization and file watching
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+import random
+import sys
+import os
+import threading
+import time
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.assistant import SmartStudyAssistant
+from src.chunk_summaries import ChunkSummaryStore, split_chunks
+from src.file_watcher import watch_file
+
+def make_document(paragraphs=300, seed=1):
+    rng = random.Random(seed)
+    words = ["cell", "energy", "protein", "membrane", "gene", "enzyme", "acid", "light"]
+    parts = []
+    for i in range(paragraphs):
+        if i % 40 == 0:
+            parts.append(f"## Chapter {i // 40 + 1}")
+        parts.append(" ".join(rng.choice(words) for _ in range(rng.randint(20, 80))) + ".")
+    return "\n\n".join(parts)
+
+@pytest.fixture
+def assistant():
+    config = {
+        "api_key": "fake_api_key",
+        "model": "gemini-pro",
+        "max_tokens": 2048,
+        "temperature": 0.7,
+    }
+    with patch("src.gemini_client.genai"):
+        assistant = SmartStudyAssistant(config)
+    assistant.client.model.generate_content.side_effect = (
+        lambda prompt: MagicMock(text=f"Summary {len(prompt)}")
+    )
+    return assistant
+
+def test_chunks_cover_the_document_within_limits():
+    document = make_document()
+    chunks = split_chunks(document)
+    
+    assert len(chunks) > 10
+    assert all(len(chunk) <= 6000 for chunk in chunks)
+    assert "\n\n".join(chunks).split() == document.split()
+
+def test_editing_one_paragraph_changes_one_chunk():
+    document = make_document()
+    paragraphs = document.split("\n\n")
+    paragraphs[150] += " An added sentence about mitochondria."
+    
+    before, after = split_chunks(document), split_chunks("\n\n".join(paragraphs))
+    
+    assert len(set(after) - set(before)) == 1
+
+def test_light_edit_costs_two_calls(assistant):
+    document = make_document()
+    summary, stats = assistant.summarize_document(document)
+    assert stats["summarized"] == stats["chunks"] > 10
+    calls = assistant.client.model.generate_content.call_count
+    assert calls == stats["chunks"] + 1
+    
+    paragraphs = document.split("\n\n")
+    paragraphs[150] += " An added sentence about mitochondria."
+    summary, stats = assistant.summarize_document("\n\n".join(paragraphs))
+    
+    assert stats["summarized"] == 1
+    assert assistant.client.model.generate_content.call_count == calls + 2
+
+def test_long_content_is_no_longer_truncated(assistant):
+    assistant.summarize_content(make_document())
+    
+    prompts = [call.args[0] for call in assistant.client.model.generate_content.call_args_list]
+    assert any("Chapter 8" in prompt for prompt in prompts)
+
+def test_short_extracted_document_gets_a_normal_summary(assistant):
+    summary, stats = assistant.summarize_document(iter(["## Osmosis", "Water moves across membranes."]))
+    
+    assert stats == {"chunks": 1, "summarized": 1, "reused": 0}
+    prompt = assistant.client.model.generate_content.call_args.args[0]
+    assert "Use the following format" in prompt and "Water moves across membranes." in prompt
+    assert assistant.client.model.generate_content.call_count == 1
+
+def test_store_persists_summaries(tmp_path):
+    path = str(tmp_path / "chunks.db")
+    store = ChunkSummaryStore(path)
+    store.set("abc", "Summary")
+    store.close()
+    
+    assert ChunkSummaryStore(path).get("abc") == "Summary"
+
+def test_watch_reports_one_change_per_burst_of_writes(tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("v1")
+    changes = []
+    watcher = watch_file(str(path), debounce=0.2, poll_interval=0.02)
+    
+    def edit():
+        time.sleep(0.1)
+        for version in ("v2", "v22", "v222"):
+            path.write_text(version)
+            time.sleep(0.05)
+    
+    threading.Thread(target=edit).start()
+    next(watcher)
+    changes.append(path.read_text())
+    
+    assert changes == ["v222"]
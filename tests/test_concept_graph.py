@@ -0,0 +1,75 @@
+"""
+Tests for the ConceptGraph and batched relationship mapping
+"""
+
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.concept_graph import ConceptGraph
+from src.features.concept_explainer import ConceptExplainer, PAIRS_PER_BATCH
+
+@pytest.fixture
+def graph(tmp_path):
+    graph = ConceptGraph(str(tmp_path / "graph.db"))
+    yield graph
+    graph.close()
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.config = {"max_concurrency": 2}
+    
+    def classify(prompt):
+        pairs = [line for line in prompt.splitlines() if " | " in line]
+        return [{"pair": i, "relation": "related to", "description": "linked"}
+                for i in range(1, len(pairs) + 1)]
+    
+    client.generate_json.side_effect = classify
+    return client
+
+def test_map_relationships_batches_missing_pairs(graph, client):
+    concepts = [f"Concept {i}" for i in range(30)]
+    explainer = ConceptExplainer(client, graph)
+    
+    edges = explainer.map_relationships(concepts)
+    
+    assert len(edges) == 435
+    assert client.generate_json.call_count == -(-435 // PAIRS_PER_BATCH)
+    
+    # Everything is in the graph now, so a second pass makes no calls
+    client.generate_json.reset_mock()
+    explainer.map_relationships(concepts)
+    client.generate_json.assert_not_called()
+
+def test_explain_relationships_answers_from_graph(graph, client):
+    graph.add_edge("Algebra", "Calculus", "prerequisite of", "Calculus builds on algebra.")
+    explainer = ConceptExplainer(client, graph)
+    
+    result = explainer.explain_relationships("calculus", "ALGEBRA")
+    
+    assert "**Algebra** is *prerequisite of* **Calculus**" in result
+    client.generate_text.assert_not_called()
+    assert [edge["target"] for edge in explainer.related_concepts("algebra")] == ["Calculus"]
+
+def test_explain_relationships_stores_new_explanations(graph, client):
+    client.generate_text.return_value = "Full explanation"
+    explainer = ConceptExplainer(client, graph)
+    
+    assert explainer.explain_relationships("Mass", "Energy") == "Full explanation"
+    assert explainer.explain_relationships("Energy", "Mass") == "Full explanation"
+    assert client.generate_text.call_count == 1
+    assert graph.missing_pairs(["Mass", "Energy"]) == [("Mass", "Energy")]
+
+def test_reversed_update_keeps_the_relation_direction(graph):
+    graph.add_edge("Algebra", "Calculus", "prerequisite of", "Calculus builds on algebra.")
+    graph.add_edge("Calculus", "Algebra", explanation="Full explanation")
+    
+    edge = graph.get_edge("algebra", "calculus")
+    
+    assert (edge["source"], edge["relation"], edge["target"]) == ("Algebra", "prerequisite of", "Calculus")
+    assert edge["explanation"] == "Full explanation"
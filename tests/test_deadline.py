@@ -0,0 +1,115 @@
+"""
+Tests for request deadlines and cancellation
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import threading
+import time
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.concurrency import ordered_map
+from src.deadline import Deadline, DeadlineExceeded, RequestCancelled, current_deadline, deadline_scope
+from src.gemini_client import GeminiClient, _TimeoutTransport
+
+@pytest.fixture
+def client():
+    config = {
+        "api_key": "fake_api_key",
+        "model": "gemini-pro",
+        "max_tokens": 2048,
+        "temperature": 0.7,
+        "timeouts": {"generate_text": 30.0},
+    }
+    with patch("src.gemini_client.genai"):
+        client = GeminiClient(config)
+    client.model.generate_content.return_value.text = "Answer"
+    return client
+
+def test_child_deadline_never_outlives_parent():
+    parent = Deadline(1.0)
+    child = Deadline(60.0, parent=parent)
+    
+    assert child.remaining() <= 1.0
+    assert child.timeout_for(30.0) <= 1.0
+    assert Deadline().timeout_for(30.0) == 30.0
+    
+    parent.cancel()
+    with pytest.raises(RequestCancelled):
+        child.check()
+
+def test_expired_deadline_skips_backend_call(client):
+    history = []
+    with deadline_scope(Deadline(0)):
+        with pytest.raises(DeadlineExceeded):
+            client.generate_text("What is DNA?")
+        with pytest.raises(DeadlineExceeded):
+            client.chat("Hello", history=history)
+    
+    client.model.generate_content.assert_not_called()
+    assert history == []
+
+def test_remaining_time_becomes_the_call_timeout(client):
+    backend = MagicMock()
+    transport = _TimeoutTransport(lambda: backend)
+    
+    def generate_content(prompt):
+        transport.generate_content(prompt)
+        return MagicMock(text="Answer")
+    
+    client.model.generate_content.side_effect = generate_content
+    client.generate_text("What is RNA?")
+    assert backend.generate_content.call_args.kwargs["timeout"] == 30.0
+    
+    with deadline_scope(Deadline(5.0)):
+        client.generate_text("What is DNA?")
+    kwargs = backend.generate_content.call_args.kwargs
+    assert 0 < kwargs["timeout"] <= 5.0
+    # Retries of unavailable errors stop at the same time
+    assert kwargs["retry"]._timeout == kwargs["timeout"]
+
+def test_ordered_map_stops_queued_work_on_cancel():
+    started = []
+    release = threading.Event()
+    
+    def work(item):
+        started.append(item)
+        release.wait(1.0)
+        return item
+    
+    deadline = Deadline()
+    with deadline_scope(deadline):
+        results = ordered_map(work, range(10), max_workers=2)
+        threading.Timer(0.05, deadline.cancel).start()
+        with pytest.raises(RequestCancelled):
+            list(results)
+    release.set()
+    time.sleep(0.05)
+    
+    assert len(started) <= 4
+
+def test_ordered_map_pulls_items_as_the_window_allows():
+    pulled = []
+    
+    def source():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+    
+    results = ordered_map(lambda i: i * 2, source(), max_workers=2)
+    
+    assert next(results) == 0
+    assert len(pulled) <= 4
+    assert list(results) == [i * 2 for i in range(1, 100)]
+
+def test_workers_see_the_callers_deadline():
+    deadline = Deadline(30.0)
+    with deadline_scope(deadline):
+        seen = list(ordered_map(lambda _: current_deadline(), range(3)))
+    
+    assert seen == [deadline, deadline, deadline]
+    assert current_deadline() is None
@@ -0,0 +1,164 @@
+"""
+Tests for flashcard and quiz export
+"""
+
+import csv
+import json
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.cache_warmer import WarmEntry
+from src.export import (export_format, export_items, iter_bank_items, iter_syllabus_items,
+                        parse_flashcards)
+from src.features.quiz_generator import QuizGenerator
+from src.question_bank import QuestionBank
+
+FLASHCARDS = """
+## Osmosis Flashcards
+
+### Card 1
+**Front:** What is osmosis?
+
+<details>
+<summary>Back</summary>
+
+Diffusion of **water** across a membrane.
+</details>
+
+### Card 2
+**Front:** Which way does water move?
+
+<details>
+<summary>Back</summary>
+
+Towards the higher solute concentration.
+</details>
+"""
+
+def question(text, answer="B"):
+    return {"type": "multiple choice", "question": text, "options": ["1", "2", "3", "4"],
+            "answer": answer, "explanation": "Because <reasons>."}
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    bank.add("Osmosis", "easy", question("What moves in osmosis?"))
+    bank.add("Osmosis", "hard", question("Why do red blood cells burst in pure water?"))
+    bank.add("Mitosis", "easy", question("How many daughter cells does mitosis produce?"))
+    yield bank
+    bank.close()
+
+def test_parse_flashcards():
+    cards = parse_flashcards(FLASHCARDS, "Osmosis")
+    
+    assert [card["question"] for card in cards] == ["What is osmosis?", "Which way does water move?"]
+    assert cards[0]["answer"] == "Diffusion of **water** across a membrane."
+    assert cards[0]["kind"] == "flashcard" and cards[0]["topic"] == "Osmosis"
+
+def test_bank_exports_to_csv_and_jsonl(tmp_path, bank):
+    assert export_items(iter_bank_items(bank, "osmosis"), str(tmp_path / "out.csv")) == 2
+    assert export_items(iter_bank_items(bank), str(tmp_path / "out.jsonl")) == 3
+    
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["difficulty"] for row in rows] == ["easy", "hard"]
+    assert rows[0]["options"] == "1 | 2 | 3 | 4"
+    
+    with open(tmp_path / "out.jsonl", encoding="utf-8") as f:
+        items = [json.loads(line) for line in f]
+    assert items[2]["topic"] == "mitosis"
+    assert items[2]["options"] == ["1", "2", "3", "4"]
+
+def test_anki_file_has_import_headers_and_html_fields(tmp_path, bank):
+    items = list(iter_bank_items(bank, "osmosis", "easy")) + parse_flashcards(FLASHCARDS, "Osmosis")
+    path = tmp_path / "deck.txt"
+    
+    export_items(items, str(path), deck="Biology")
+    lines = path.read_text(encoding="utf-8").splitlines()
+    
+    assert "#deck:Biology" in lines and "#separator:tab" in lines
+    notes = [line.split("\t") for line in lines if not line.startswith("#")]
+    assert notes[0][0] == "What moves in osmosis?<br>A) 1<br>B) 2<br>C) 3<br>D) 4"
+    assert notes[0][1] == "<b>B</b><br><br>Because &lt;reasons&gt;."
+    assert notes[0][2] == "osmosis difficulty::easy"
+    assert notes[1][1] == "Diffusion of <b>water</b> across a membrane."
+
+def test_syllabus_items_are_generated_concurrently_in_order():
+    assistant = MagicMock()
+    assistant.client.config = {"max_concurrency": 4}
+    generator = assistant.quiz_generator
+    generator.question_bank = None
+    generator.generate_flashcards.return_value = FLASHCARDS
+    generator.generate_questions.side_effect = lambda topic, count, difficulty: [
+        question(f"{topic} {difficulty} {i}") for i in range(count)
+    ]
+    entries = [
+        WarmEntry("explanation", "Biology", "Osmosis"),
+        WarmEntry("quiz", "Biology", "Osmosis", difficulty="easy", questions=2),
+        WarmEntry("flashcards", "Biology", "Osmosis", cards=2),
+        WarmEntry("quiz", "Biology", "Mitosis", difficulty="hard", questions=1),
+    ]
+    
+    items = list(iter_syllabus_items(assistant, entries))
+    
+    assert [item["question"] for item in items] == [
+        "Osmosis easy 0", "Osmosis easy 1", "What is osmosis?", "Which way does water move?",
+        "Mitosis hard 0",
+    ]
+    assert items[0]["difficulty"] == "easy" and items[0]["topic"] == "Osmosis"
+
+def test_syllabus_export_stocks_the_bank_without_serving(bank):
+    assistant = MagicMock()
+    assistant.client.config = {"max_concurrency": 4}
+    generator = QuizGenerator(MagicMock(), bank)
+    generator.client.generate_json.return_value = [question("What does a hypertonic solution do?")]
+    assistant.quiz_generator = generator
+    
+    items = list(iter_syllabus_items(assistant, [
+        WarmEntry("quiz", "Biology", "Osmosis", difficulty="easy", questions=2),
+    ]))
+    
+    assert len(items) == 2
+    args, _ = generator.client.generate_json.call_args
+    assert "What moves in osmosis?" in args[0]
+    assert bank.recently_served("Osmosis") == []
+
+def test_failed_syllabus_entries_are_reported():
+    assistant = MagicMock()
+    assistant.client.config = {"max_concurrency": 4}
+    generator = assistant.quiz_generator
+    generator.question_bank = None
+    generator.generate_flashcards.return_value = "Error generating response: 503"
+    generator.generate_questions.return_value = None
+    entries = [
+        WarmEntry("flashcards", "Biology", "Osmosis", cards=2),
+        WarmEntry("quiz", "Biology", "Mitosis", difficulty="hard", questions=1),
+    ]
+    failed = []
+    
+    assert list(iter_syllabus_items(assistant, entries, failed)) == []
+    assert failed == [entry.label() for entry in entries]
+
+def test_bank_export_streams_only_the_requested_count(bank):
+    bank.add("Osmosis", "easy", question("What is a semipermeable membrane?"))
+    assistant = MagicMock()
+    assistant.client.config = {"max_concurrency": 4}
+    assistant.quiz_generator = QuizGenerator(MagicMock(), bank)
+    
+    items = list(iter_syllabus_items(assistant, [
+        WarmEntry("quiz", "Biology", "Osmosis", difficulty="easy", questions=1),
+    ]))
+    
+    assert [item["question"] for item in items] == ["What moves in osmosis?"]
+    assert assistant.quiz_generator.client.generate_json.call_count == 0
+
+def test_unknown_extension_needs_an_explicit_format():
+    assert export_format("deck.txt") == "anki"
+    assert export_format("cards.out", "jsonl") == "jsonl"
+    with pytest.raises(ValueError):
+        export_format("cards.out")
@@ -0,0 +1,144 @@
+"""
+Tests for GeminiClient caching and circuit breaking
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import time
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from src.deadline import Deadline, DeadlineExceeded, deadline_scope
+from src.gemini_client import GeminiClient, STALE_NOTICE, parse_json_response
+from src.key_pool import RateLimiter
+
+@pytest.fixture
+def client():
+    config = {
+        "api_key": "fake_api_key",
+        "model": "gemini-pro",
+        "max_tokens": 2048,
+        "temperature": 0.7,
+        "cache_ttl": 60,
+        "circuit_cooldown": 60,
+        "response_cache": True,
+    }
+    with patch("src.gemini_client.genai"):
+        client = GeminiClient(config)
+    client.model.generate_content.return_value.text = "Answer"
+    return client
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_repeated_prompts_are_served_from_cache(client):
+    assert client.generate_text("What is DNA?") == "Answer"
+    assert client.generate_text("What is DNA?") == "Answer"
+    
+    assert client.model.generate_content.call_count == 1
+    assert client.metrics()["cache_hits"] == 1
+
+def test_stored_answers_are_only_a_fallback_by_default(client):
+    client.serve_cached = False
+    client.generate_text("What is DNA?")
+    client.prefetch("What is RNA?")
+    
+    assert client.generate_text("What is DNA?") == "Answer"
+    assert client.model.generate_content.call_count == 3
+    assert client.is_cached("What is RNA?") and not client.is_cached("What is DNA?")
+    # Prepared answers are served, and their first use is counted
+    assert client.generate_text("What is RNA?") == "Answer"
+    assert client.model.generate_content.call_count == 3
+    assert client.cache.prefetch_usage() == (1, 1)
+    
+    client.model.generate_content.side_effect = RuntimeError("503")
+    assert client.generate_text("What is DNA?") == STALE_NOTICE + "Answer"
+
+def test_stale_answer_served_when_backend_fails(client):
+    client.generate_text("What is DNA?")
+    client.cache.ttl = 0
+    client.model.generate_content.side_effect = RuntimeError("503")
+    
+    assert client.generate_text("What is DNA?") == STALE_NOTICE + "Answer"
+    assert client.generate_text("Unknown prompt") == "Error generating response: 503"
+    assert client.metrics()["pending_refresh"] == 1
+
+def test_open_circuit_skips_backend_and_refreshes_after_recovery(client):
+    client.generate_text("What is DNA?")
+    client.cache.ttl = 0
+    client.model.generate_content.side_effect = RuntimeError("503")
+    for i in range(5):
+        client.generate_text(f"Failing prompt {i}")
+    assert client.metrics()["circuit"]["state"] == OPEN
+    
+    calls = client.model.generate_content.call_count
+    assert client.generate_text("What is DNA?").startswith(STALE_NOTICE)
+    assert client.model.generate_content.call_count == calls
+    
+    # After the cooldown a successful probe closes the circuit and refreshes stale entries
+    client.model.generate_content.side_effect = None
+    client.breaker.cooldown_seconds = 0
+    client.cache.ttl = 60
+    assert client.generate_text("New prompt") == "Answer"
+    assert client.breaker.state == CLOSED
+    assert wait_for(lambda: client.metrics()["refreshed"] == 1)
+    assert client.generate_text("What is DNA?") == "Answer"
+
+def test_probe_that_runs_out_of_time_does_not_block_later_probes(client):
+    client.model.generate_content.side_effect = RuntimeError("503")
+    for i in range(5):
+        client.generate_text(f"Failing prompt {i}")
+    client.model.generate_content.side_effect = None
+    client.breaker.cooldown_seconds = 0
+    # The probe waits for quota that does not come back before its deadline
+    limiter = RateLimiter(1)
+    limiter.try_acquire()
+    client.key_pool.keys[0].limiter = limiter
+    with deadline_scope(Deadline(0.2)):
+        with pytest.raises(DeadlineExceeded):
+            client.generate_text("Probe")
+    assert client.breaker.state == HALF_OPEN
+    
+    client.key_pool.keys[0].limiter = RateLimiter()
+    assert client.generate_text("Probe") == "Answer"
+    assert client.breaker.state == CLOSED
+
+def test_interrupted_chat_probe_is_released(client):
+    breaker = client.breaker
+    breaker.state = OPEN
+    breaker.cooldown_seconds = 0
+    client.model.start_chat.return_value.send_message.side_effect = KeyboardInterrupt
+    history = []
+    
+    with pytest.raises(KeyboardInterrupt):
+        client.chat("Hello", history=history)
+    assert history == [] and breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(min_calls=1, cooldown_seconds=0)
+    breaker.record_failure()
+    
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+def test_slow_calls_open_the_circuit():
+    breaker = CircuitBreaker(min_calls=2, slow_call_seconds=1.0)
+    breaker.record_success(5.0)
+    breaker.record_success(5.0)
+    
+    assert breaker.snapshot()["state"] == OPEN
+
+def test_parse_json_response_handles_fences():
+    assert parse_json_response('```json\n{"a": 1}\n```') == {"a": 1}
+    assert parse_json_response("not json") is None
@@ -0,0 +1,109 @@
+"""
+Tests for document text extraction
+"""
+
+import pytest
+from unittest.mock import patch
+import sys
+import os
+import zipfile
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.chunk_summaries import iter_chunks
+from src.ingest import ExtractionError, _extract_task, document_tasks, extract_sections, normalize_text
+
+def write_pdf(path, pages):
+    """Write a minimal PDF with one line of Helvetica text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    
+    data, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(data)
+
+def write_docx(path, paragraphs):
+    """Write a minimal DOCX; paragraphs are (style, text) pairs"""
+    body = ""
+    for style, text in paragraphs:
+        props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+        body += f"<w:p>{props}<w:r><w:t>{text}</w:t></w:r></w:p>"
+    xml = ('<?xml version="1.0" encoding="UTF-8"?>'
+           '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+           f"<w:body>{body}</w:body></w:document>")
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", xml)
+
+def test_normalize_text():
+    text = "The ﬁrst exam-\nple   has  gaps.\n\n\n\n12\nEnd"
+    
+    assert normalize_text(text) == "The first example has gaps.\n\n12\nEnd"
+    assert normalize_text(text, drop_page_numbers=True) == "The first example has gaps.\n\nEnd"
+
+def test_docx_is_split_at_headings(tmp_path):
+    path = tmp_path / "lecture.docx"
+    write_docx(path, [("Heading1", "Cells"), (None, "Cells are units &amp; parts."),
+                      ("Heading1", "Energy"), (None, "ATP stores energy.")])
+    
+    tasks = document_tasks(str(path))
+    sections = list(extract_sections([str(path)], max_workers=1))
+    
+    assert len(tasks) == 2
+    assert sections == ["# Cells\n\nCells are units & parts.", "# Energy\n\nATP stores energy."]
+
+def test_html_keeps_structure_and_drops_scripts(tmp_path):
+    path = tmp_path / "lecture.html"
+    path.write_text("<html><head><style>p {color: red}</style></head><body>"
+                    "<h1>Osmosis</h1><p>Water moves.</p><script>track()</script>"
+                    "<h2>Examples</h2><ul><li>Plant roots</li><li>Kidneys</li></ul></body></html>")
+    
+    sections = list(extract_sections([str(path)], max_workers=1))
+    
+    assert sections == ["# Osmosis\n\nWater moves.", "## Examples\n\n- Plant roots\n- Kidneys"]
+
+def test_course_pack_is_extracted_in_order_across_processes(tmp_path):
+    pdf = tmp_path / "slides.pdf"
+    write_pdf(pdf, ["Page one about cells", "Page two about genes", "Page three about enzymes"])
+    docx = tmp_path / "notes.docx"
+    write_docx(docx, [("Heading1", "Summary"), (None, "Genes code for proteins.")])
+    
+    sections = list(extract_sections([str(pdf), str(docx)], max_workers=2))
+    
+    assert sections == ["Page one about cells", "Page two about genes",
+                        "Page three about enzymes", "# Summary\n\nGenes code for proteins."]
+    chunks = list(iter_chunks(extract_sections([str(pdf)], max_workers=2)))
+    assert chunks == ["Page one about cells\n\nPage two about genes\n\nPage three about enzymes"]
+
+def test_invalid_documents_raise(tmp_path):
+    path = tmp_path / "broken.docx"
+    path.write_text("not a zip file")
+    
+    with pytest.raises(ExtractionError):
+        document_tasks(str(path))
+
+def test_pdf_pages_are_grouped_and_read_errors_are_wrapped(tmp_path):
+    pdf = tmp_path / "slides.pdf"
+    write_pdf(pdf, [f"Page {i} text" for i in range(9)])
+    
+    tasks = document_tasks(str(pdf), max_workers=1)
+    
+    assert [task[2] for task in tasks] == [(0, 3), (3, 6), (6, 9)]
+    assert _extract_task(tasks[1]) == "Page 3 text\n\nPage 4 text\n\nPage 5 text"
+    with patch("pypdf.PdfReader", side_effect=ValueError("bad xref")):
+        with pytest.raises(ExtractionError):
+            _extract_task(tasks[0])
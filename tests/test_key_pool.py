@@ -0,0 +1,102 @@
+"""
+Tests for the API key pool
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from google.api_core import exceptions as api_exceptions
+
+from src.deadline import Deadline, DeadlineExceeded, deadline_scope
+from src.gemini_client import GeminiClient
+from src.key_pool import KeyPool, NoAvailableKey, RateLimiter
+
+def make_pool(count, **kwargs):
+    return KeyPool([f"key-{i:04d}" for i in range(count)], lambda key: MagicMock(name=key), **kwargs)
+
+def use(pool, error=None):
+    with pool.lease() as model:
+        if error is not None:
+            raise error
+        return model
+
+def test_requests_spread_over_keys_by_quota():
+    pool = make_pool(3, requests_per_minute=10)
+    
+    models = [use(pool) for _ in range(30)]
+    
+    assert [models.count(entry.model) for entry in pool.keys] == [10, 10, 10]
+    with deadline_scope(Deadline(0.05)):
+        with pytest.raises(DeadlineExceeded):
+            use(pool)
+
+def test_faster_key_is_preferred():
+    pool = make_pool(2)
+    pool._record_success(pool.keys[0], 2.0)
+    pool._record_success(pool.keys[1], 0.5)
+    
+    assert use(pool) is pool.keys[1].model
+
+def test_busy_key_shares_traffic_with_a_slightly_slower_one():
+    pool = make_pool(2)
+    pool._record_success(pool.keys[0], 0.5)
+    pool._record_success(pool.keys[1], 0.6)
+    
+    with pool.lease() as first:
+        assert first is pool.keys[0].model
+        assert use(pool) is pool.keys[1].model
+    assert [key["in_flight"] for key in pool.snapshot()] == [0, 0]
+
+def test_quota_and_auth_errors_eject_the_key():
+    pool = make_pool(2)
+    with pytest.raises(api_exceptions.ResourceExhausted):
+        use(pool, api_exceptions.ResourceExhausted("quota"))
+    with pytest.raises(api_exceptions.PermissionDenied):
+        use(pool, api_exceptions.PermissionDenied("denied"))
+    
+    assert all(key["ejected"] for key in pool.snapshot())
+    with pytest.raises(NoAvailableKey):
+        use(pool)
+
+def test_other_errors_keep_the_key():
+    pool = make_pool(1)
+    with pytest.raises(RuntimeError):
+        use(pool, RuntimeError("500"))
+    
+    assert pool.snapshot()[0]["errors"] == 1
+    assert not pool.snapshot()[0]["ejected"]
+
+def test_rate_limiter_refills_over_time():
+    limiter = RateLimiter(60)
+    for _ in range(60):
+        assert limiter.try_acquire()
+    
+    assert not limiter.try_acquire()
+    assert 0 < limiter.wait_time() <= 1.0
+
+def test_client_fails_over_to_another_key():
+    config = {
+        "api_key": "key-0000",
+        "api_keys": ["key-0000", "key-1111"],
+        "model": "gemini-pro",
+        "max_tokens": 2048,
+        "temperature": 0.7,
+    }
+    with patch("src.gemini_client.genai") as genai:
+        genai.GenerativeModel.side_effect = lambda **kwargs: MagicMock()
+        client = GeminiClient(config)
+    first, second = (entry.model for entry in client.key_pool.keys)
+    first.generate_content.side_effect = api_exceptions.TooManyRequests("429")
+    second.generate_content.return_value.text = "Answer"
+    # Make sure the failing key is tried first
+    client.key_pool._record_success(client.key_pool.keys[1], 5.0)
+    
+    assert client.generate_text("What is DNA?") == "Answer"
+    keys = client.metrics()["keys"]
+    assert keys[0]["ejected"] and not keys[1]["ejected"]
+    assert client.metrics()["failures"] == 0
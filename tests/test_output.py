@@ -0,0 +1,97 @@
+"""
+Tests for CLI result output modes
+"""
+
+import io
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gemini_client import GeminiClient
+from src.output import ResultWriter
+
+@pytest.fixture
+def client():
+    config = {"api_key": "fake_api_key", "model": "gemini-pro", "max_tokens": 2048,
+              "temperature": 0.7, "cache_ttl": 60, "response_cache": True}
+    with patch("src.gemini_client.genai"):
+        client = GeminiClient(config)
+    client.model.generate_content.return_value = MagicMock(spec=["text"], text="A" * 40)
+    return client
+
+def test_markdown_mode_writes_raw_text():
+    stream = io.StringIO()
+    console = MagicMock()
+    writer = ResultWriter("markdown", "quiz", console, stream)
+    
+    writer.write("# Quiz\n\n1. What is DNA?\n", title="🎯 Quiz")
+    
+    assert stream.getvalue() == "# Quiz\n\n1. What is DNA?\n\n"
+    console.print.assert_not_called()
+
+def test_json_mode_reports_model_calls_tokens_and_cache_hits(client):
+    stream = io.StringIO()
+    writer = ResultWriter("json", "explain", MagicMock(), stream)
+    writer.track(client)
+    
+    writer.write(client.generate_text("What is DNA?"), query="DNA")
+    writer.write(client.generate_text("What is DNA?"), query="DNA again")
+    
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["command"] == "explain" and first["query"] == "DNA"
+    assert first["content"] == "A" * 40
+    assert first["metadata"]["model_calls"] == 1
+    assert first["metadata"]["cache_hit"] is False
+    assert first["metadata"]["tokens"] == {"prompt": 3, "output": 10, "estimated": True}
+    # Metadata is cumulative over the command: the second answer was a cache hit
+    assert second["part"] == 1
+    assert second["metadata"]["cache_hits"] == 1
+    assert second["metadata"]["model_calls"] == 1
+
+def test_streamed_json_result_ends_with_a_closing_record():
+    stream = io.StringIO()
+    writer = ResultWriter("json", "plan", MagicMock(), stream)
+    
+    writer.write("Day 1", final=False, subject="Biology")
+    writer.write("Day 2", final=False, subject="Biology")
+    writer.finish(subject="Biology")
+    
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record.get("content") for record in records] == ["Day 1", "Day 2", None]
+    assert [record["final"] for record in records] == [False, False, True]
+    assert "latency" in records[-1]["metadata"]
+
+def test_rich_mode_renders_panels():
+    console = MagicMock()
+    stream = io.StringIO()
+    writer = ResultWriter("rich", "tips", console, stream)
+    
+    writer.write("Space your practice.", title="💡 Study Tips")
+    writer.finish()
+    
+    assert console.print.call_count == 1
+    assert stream.getvalue() == ""
+
+def test_error_results_are_reported_as_errors(client):
+    stream, errors = io.StringIO(), io.StringIO()
+    writer = ResultWriter("markdown", "quiz", MagicMock(), stream, errors)
+    writer.write("Error generating response: 503")
+    
+    assert writer.failed
+    assert stream.getvalue() == "" and errors.getvalue().startswith("Error")
+    
+    stream = io.StringIO()
+    writer = ResultWriter("json", "quiz", MagicMock(), stream)
+    writer.track(client)
+    writer.write("Error generating response: 503", topic="DNA")
+    
+    record = json.loads(stream.getvalue())
+    assert writer.failed
+    assert record["content"] is None and record["error"] == "Error generating response: 503"
+    # Nothing was requested, so nothing came from the cache either
+    assert record["metadata"]["cache_hit"] is False
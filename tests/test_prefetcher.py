@@ -0,0 +1,113 @@
+"""
+Tests for predictive prefetching of follow-up content
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.assistant import SmartStudyAssistant
+from src.deadline import Deadline, deadline_scope
+from src.prefetcher import Prefetcher, extract_followups, normalize_question
+
+PLAN = """
+# Study Plan: Biology
+
+### Day 1: Cell structure
+- Read chapter 1
+
+### Day 2: Mitosis and meiosis (cell division)
+- Practice diagrams
+"""
+
+EXPLANATION = """
+## Photosynthesis
+Plants turn light into **chemical energy** using **chlorophyll**.
+
+## Related concepts
+- **Cellular respiration**: the reverse process
+- Calvin cycle - the light-independent reactions
+"""
+
+@pytest.fixture
+def assistant():
+    config = {
+        "api_key": "fake_api_key",
+        "model": "gemini-pro",
+        "max_tokens": 2048,
+        "temperature": 0.7,
+        "prefetch": True,
+    }
+    with patch("src.gemini_client.genai"):
+        assistant = SmartStudyAssistant(config)
+    model = assistant.client.model
+    
+    def generate_content(prompt):
+        concept = prompt.split('"')[1]
+        return MagicMock(text=f"Cached: {concept}")
+    
+    model.generate_content.side_effect = generate_content
+    model.start_chat.return_value.send_message.return_value.text = "Live chat answer"
+    return assistant
+
+def test_extract_followups_from_plan_and_explanation():
+    assert extract_followups(PLAN) == ["Cell structure", "Mitosis and meiosis"]
+    assert extract_followups(EXPLANATION, exclude=["Chlorophyll"]) == [
+        "Cellular respiration", "Calvin cycle", "chemical energy",
+    ]
+    assert extract_followups(EXPLANATION, limit=1) == ["Cellular respiration"]
+
+def test_normalize_question():
+    assert normalize_question("What is the Calvin cycle?") == "calvin cycle"
+    assert normalize_question("Tell me about  Mitosis") == "mitosis"
+    assert normalize_question("Mitosis") == "mitosis"
+
+def test_prefetched_follow_up_is_answered_from_cache(assistant):
+    assert assistant.prefetch_followups(EXPLANATION, exclude=["Photosynthesis"]) == 4
+    assert assistant.prefetcher.wait(2.0)
+    calls = assistant.client.model.generate_content.call_count
+    
+    response = assistant.chat("What is cellular respiration?")
+    
+    assert response == "Cached: Cellular respiration"
+    assert assistant.client.model.generate_content.call_count == calls
+    assert assistant.client.history[-1] == {"role": "model", "parts": [response]}
+    stats = assistant.prefetcher.stats()
+    assert stats["warmed"] == 4
+    assert stats["used"] == 1
+    assert stats["hit_rate"] == 0.25
+
+def test_prefetch_limit_caps_the_topics_queued(assistant):
+    assert assistant.prefetch_followups(EXPLANATION, exclude=["Photosynthesis"], limit=2) == 2
+    assert assistant.prefetch_followups(EXPLANATION, exclude=["Photosynthesis"], limit=0) == 0
+    assert assistant.prefetcher.wait(2.0)
+
+def test_unmatched_question_goes_to_chat(assistant):
+    assert assistant.chat("How should I revise?") == "Live chat answer"
+
+def test_prefetch_stops_without_quota_headroom(assistant):
+    assistant.client.key_pool.headroom = lambda: 0.1
+    prefetcher = Prefetcher(assistant.client, budget=3)
+    
+    prefetcher.schedule(["A", "B", "C"], lambda topic: f"Explain {topic}")
+    
+    assert prefetcher.wait(2.0)
+    assert prefetcher.stats()["dropped"] == 3
+    assistant.client.model.generate_content.assert_not_called()
+
+def test_prefetches_follow_the_scheduling_requests_deadline(assistant):
+    prefetcher = Prefetcher(assistant.client, budget=3)
+    deadline = Deadline()
+    deadline.cancel()
+    
+    with deadline_scope(deadline):
+        prefetcher.schedule(["A", "B"], lambda topic: f'Explain "{topic}"')
+    
+    assert prefetcher.wait(2.0)
+    assert prefetcher.stats()["warmed"] == 0
+    assistant.client.model.generate_content.assert_not_called()
+    assert prefetcher.cancel() == 0
@@ -0,0 +1,98 @@
+"""
+Tests for per-phase profiling
+"""
+
+import json
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+import threading
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.concurrency import ordered_map
+from src.profiler import Profiler, current_profiler, phase, profile_scope
+from src.session_manager import SessionManager
+
+def test_phases_are_recorded_across_worker_threads():
+    profiler = Profiler()
+    
+    def work(i):
+        with phase("network"):
+            return i
+    
+    with profile_scope(profiler):
+        with phase("config"):
+            pass
+        assert list(ordered_map(work, range(3), max_workers=3)) == [0, 1, 2]
+    profiler.stop()
+    
+    rows = {row["name"]: row for row in profiler.breakdown()}
+    assert rows["config"]["count"] == 1
+    assert rows["network"]["count"] == 3
+    assert rows["total"]["wall"] >= rows["network"]["wall"] / 3
+
+def test_total_cpu_excludes_other_threads():
+    profiler = Profiler()
+    busy = threading.Thread(target=lambda: sum(i * i for i in range(2_000_000)))
+    busy.start()
+    busy.join()
+    profiler.stop()
+    
+    total = profiler.breakdown()[-1]
+    assert total["cpu"] < 0.05
+    assert total["process_cpu"] > total["cpu"]
+
+def test_phase_is_a_no_op_without_a_profiler():
+    assert current_profiler() is None
+    with phase("render"):
+        pass
+
+def test_chrome_trace_has_a_complete_event_per_phase(tmp_path):
+    profiler = Profiler()
+    with profiler.phase("client_init"):
+        pass
+    profiler.record("imports", profiler.started, 0.25, 0.2)
+    
+    path = tmp_path / "trace.json"
+    profiler.write_trace(str(path))
+    trace = json.loads(path.read_text())
+    
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert [event["name"] for event in events] == ["client_init", "imports"]
+    assert events[1]["ts"] == 0 and events[1]["dur"] == 250000
+    assert events[1]["args"]["cpu_ms"] == 200
+    assert any(event["ph"] == "M" for event in trace["traceEvents"])
+
+def test_cprofile_is_optional(tmp_path):
+    with pytest.raises(ValueError):
+        Profiler().write_cprofile(str(tmp_path / "out.prof"))
+    
+    profiler = Profiler(cprofile=True)
+    profiler.start()
+    sorted(range(1000), key=lambda x: -x)
+    profiler.stop()
+    profiler.write_cprofile(str(tmp_path / "out.prof"))
+    
+    assert os.path.getsize(tmp_path / "out.prof") > 0
+    assert "cumulative" in profiler.hot_functions()
+
+def test_session_manager_profiles_each_request(tmp_path):
+    assistant = MagicMock()
+    
+    def chat(message, history):
+        with phase("network"):
+            return "reply"
+    
+    assistant.chat.side_effect = chat
+    manager = SessionManager(assistant, {"profile": True, "profile_dir": str(tmp_path)})
+    
+    manager.chat("alice", "hi")
+    manager.chat("bob", "hello")
+    
+    phases = manager.stats()["phases"]
+    assert phases["network"]["count"] == 2
+    assert phases["request"]["count"] == 2
+    assert len(os.listdir(tmp_path)) == 2
@@ -0,0 +1,102 @@
+"""
+Tests for the QuestionBank and bank-backed quiz generation
+"""
+
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.features.quiz_generator import QuizGenerator
+from src.question_bank import QuestionBank
+
+def make_question(text, answer="A"):
+    return {
+        "type": "multiple choice",
+        "question": text,
+        "options": ["Mitochondria", "Nucleus", "Ribosome", "Golgi apparatus"],
+        "answer": answer,
+        "explanation": "Because.",
+    }
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"), recent_window=2)
+    yield bank
+    bank.close()
+
+def test_near_duplicates_are_rejected(bank):
+    assert bank.add("Biology", "easy", make_question("Which organelle produces most of the cell's energy?"))
+    assert bank.add("biology", "easy", make_question("Which organelle produces most of the cell's energy ?")) is None
+    assert bank.add("biology", "easy", make_question("Where is the genetic material of a eukaryotic cell stored?"))
+    assert bank.count("BIOLOGY") == 2
+
+def test_sample_skips_recently_served(bank):
+    first = bank.add("biology", "easy", make_question("Which organelle produces most of the cell's energy?"))
+    second = bank.add("biology", "easy", make_question("Where is the genetic material of a eukaryotic cell stored?"))
+    bank.mark_served("biology", [first])
+    
+    sampled = bank.sample("biology", "easy", ["multiple choice"], 5)
+    
+    assert [q["id"] for q in sampled] == [second]
+    assert bank.sample("biology", "hard", ["multiple choice"], 5) == []
+
+def test_generate_quiz_only_generates_shortfall(bank):
+    bank.add("biology", "easy", make_question("Which organelle produces most of the cell's energy?"))
+    client = MagicMock()
+    client.generate_json.return_value = [
+        make_question("Where is the genetic material of a eukaryotic cell stored?", "B"),
+    ]
+    generator = QuizGenerator(client, bank)
+    
+    quiz = generator.generate_quiz("biology", 2, "easy")
+    
+    assert "### Question 2" in quiz
+    assert "A) Mitochondria" in quiz
+    args, _ = client.generate_json.call_args
+    assert "Create 1 easy difficulty quiz questions" in args[0]
+    client.generate_text.assert_not_called()
+    
+    # Both questions are now in the bank, so the next quiz needs no API call
+    client.generate_json.reset_mock()
+    bank.recent_window = 0
+    generator.generate_quiz("biology", 2, "easy")
+    client.generate_json.assert_not_called()
+
+def test_generate_quiz_falls_back_when_response_is_not_json(bank):
+    client = MagicMock()
+    client.generate_json.return_value = None
+    client.generate_text.return_value = "Markdown quiz"
+    
+    assert QuizGenerator(client, bank).generate_quiz("biology", 3, "easy") == "Markdown quiz"
+
+def test_generate_quiz_retries_questions_rejected_as_duplicates(bank):
+    bank.add("biology", "easy", make_question("Which organelle produces most of the cell's energy?"))
+    bank.mark_served("biology", [1])
+    client = MagicMock()
+    client.generate_json.side_effect = [
+        [make_question("Which organelle produces most of the cell's energy?")],
+        [make_question("Where is the genetic material of a eukaryotic cell stored?", "B")],
+    ]
+    
+    quiz = QuizGenerator(client, bank).generate_quiz("biology", 1, "easy")
+    
+    assert "genetic material" in quiz and "Only" not in quiz
+    first, second = [call.args[0] for call in client.generate_json.call_args_list]
+    # The recently served question is avoided from the start
+    assert "- Which organelle produces" in first and "- Which organelle produces" in second
+
+def test_generate_quiz_notes_a_short_quiz(bank):
+    client = MagicMock()
+    client.generate_json.return_value = [
+        make_question("Which organelle produces most of the cell's energy?"),
+    ]
+    
+    quiz = QuizGenerator(client, bank).generate_quiz("biology", 2, "easy")
+    
+    assert "### Question 1" in quiz and "### Question 2" not in quiz
+    assert "Only 1 of the 2 requested questions" in quiz
+    assert client.generate_json.call_count == 3
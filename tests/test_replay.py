@@ -0,0 +1,149 @@
+"""
+Tests for traffic recording and accelerated replay
+"""
+
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.gemini_client import GeminiClient
+from src.replay import percentile, replay, synthetic_prompt
+from src.traffic_recorder import TrafficRecorder, load_traffic
+
+@pytest.fixture
+def client(tmp_path):
+    config = {"api_key": "fake_api_key", "model": "gemini-pro", "max_tokens": 2048,
+              "temperature": 0.7, "cache_ttl": 60, "response_cache": True,
+              "traffic_log": str(tmp_path / "traffic.jsonl"), "traffic_salt": "secret"}
+    with patch("src.gemini_client.genai"):
+        client = GeminiClient(config)
+    client.model.generate_content.return_value = MagicMock(spec=["text"], text="A" * 40)
+    client.model.start_chat.return_value.send_message.return_value = MagicMock(
+        spec=["text"], text="Hello there")
+    return client
+
+def test_recorder_logs_request_shapes_without_prompt_text(client):
+    client.generate_text("What is photosynthesis?")
+    client.generate_text("What is photosynthesis?")
+    client.chat("Tell me about mitosis", history=[{"role": "user", "parts": ["Hi"]},
+                                                  {"role": "model", "parts": ["Hello"]}])
+    client.recorder.close()
+
+    with open(client.config["traffic_log"], encoding="utf-8") as f:
+        assert "photosynthesis" not in f.read()
+    first, second, chat = load_traffic(client.config["traffic_log"])
+    assert [first["status"], second["status"]] == ["fresh", "cached"]
+    assert first["prompt_hash"] == second["prompt_hash"] != chat["prompt_hash"]
+    assert first["prompt_chars"] == len("What is photosynthesis?")
+    assert first["response_chars"] == 40
+    assert first["model"] == "gemini-pro" and first["max_tokens"] == 2048
+    assert chat["method"] == "chat"
+    assert (chat["history_turns"], chat["history_chars"]) == (2, 7)
+
+def test_background_calls_are_recorded_with_their_method(client):
+    client.prefetch("What is osmosis?")
+    client.generate_text("What is osmosis?")
+    client._pending_refresh["key"] = ("What is diffusion?", None)
+    client._refresh_pending()
+    client.recorder.close()
+
+    prefetch, served, refresh = load_traffic(client.config["traffic_log"])
+    assert (prefetch["method"], prefetch["status"]) == ("prefetch", "fresh")
+    assert prefetch["prompt_hash"] == served["prompt_hash"] and served["status"] == "cached"
+    assert (refresh["method"], refresh["status"]) == ("refresh", "fresh")
+
+def test_generated_salt_is_kept_across_runs(tmp_path):
+    config = {"model": "gemini-pro"}
+    salt_path = str(tmp_path / "data" / "traffic_salt")
+    first = TrafficRecorder(str(tmp_path / "a.jsonl"), config, salt_path=salt_path)
+    second = TrafficRecorder(str(tmp_path / "b.jsonl"), config, salt_path=salt_path)
+    other = TrafficRecorder(str(tmp_path / "c.jsonl"), config)
+
+    assert os.path.exists(salt_path)
+    assert first.prompt_hash("What is DNA?") == second.prompt_hash("What is DNA?")
+    assert other.prompt_hash("What is DNA?") != first.prompt_hash("What is DNA?")
+    for recorder in (first, second, other):
+        recorder.close()
+
+def test_load_traffic_skips_truncated_lines(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    path.write_text(json.dumps({"ts": 1.0, "method": "generate_text"}) + "\n{\"ts\": 2.0, \"meth")
+
+    assert len(list(load_traffic(str(path)))) == 1
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3.0], 0.95) == 3.0
+    assert percentile([], 0.5) is None
+
+def test_synthetic_prompts_match_recorded_size_and_hash():
+    record = {"prompt_hash": "ab12", "method": "generate_text", "prompt_chars": 200}
+
+    assert len(synthetic_prompt(record)) == 200
+    assert synthetic_prompt(record) == synthetic_prompt(dict(record))
+    assert synthetic_prompt(dict(record, prompt_hash="cd34")) != synthetic_prompt(record)
+
+def test_replay_reports_cache_hits_latency_and_throughput():
+    # Ten requests over twenty recorded seconds, five of them repeats of one
+    # prompt; the gaps leave room for the cache write after each model call
+    records = [{"ts": 1000.0 + 2 * i, "method": "generate_text",
+                "prompt_hash": "aa" if i % 2 else f"b{i}",
+                "prompt_chars": 100, "status": "cached" if i % 2 and i > 1 else "fresh",
+                "latency": 0.5, "response_chars": 50, "model": "gemini-pro"}
+               for i in range(10)]
+    records.append({"ts": 1020.0, "method": "chat", "prompt_hash": "cc", "prompt_chars": 80,
+                    "status": "fresh", "latency": 0.5, "response_chars": 20,
+                    "history_turns": 2, "history_chars": 30})
+
+    with patch("src.gemini_client.genai"):
+        report = replay(records, speed=20, base_config={"response_cache": True})
+
+    assert report["requests"] == 11 and report["errors"] == 0
+    # One model call per distinct prompt, plus the chat
+    assert report["backend_calls"] == 7
+    assert report["cache_hit_rate"] == pytest.approx(0.4)
+    assert report["recorded_cache_hit_rate"] == pytest.approx(0.4)
+    # Latencies are in recorded time: model calls take the recorded half second
+    latency = report["latency"]
+    assert latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    # (with headroom for a slow first call on a loaded machine)
+    assert 0.5 <= latency["p99"] < 5.0
+    assert report["duration"] < 1.5
+    assert report["throughput"] > 5
+
+def test_requests_that_raise_count_as_errors():
+    records = [{"ts": 1000.0, "method": "chat", "prompt_hash": "cc", "prompt_chars": 80,
+                "status": "fresh", "latency": 0.5, "response_chars": 20,
+                "history_turns": 2, "history_chars": 30}]
+
+    with patch("src.gemini_client.genai"), \
+            patch("src.gemini_client.GeminiClient.chat", side_effect=RuntimeError("no key")):
+        report = replay(records, speed=20)
+
+    assert report["requests"] == 1 and report["errors"] == 1
+    assert report["latency"]["max"] is not None
+
+def test_replayed_prefetches_warm_the_cache_without_counting_as_requests():
+    records = [
+        {"ts": 1000.0, "method": "prefetch", "prompt_hash": "aa", "prompt_chars": 100,
+         "status": "fresh", "latency": 1.0, "response_chars": 50},
+        {"ts": 1002.0, "method": "generate_text", "prompt_hash": "aa", "prompt_chars": 100,
+         "status": "cached", "latency": 0.0, "response_chars": 50},
+        {"ts": 1003.0, "method": "refresh", "prompt_hash": "bb", "prompt_chars": 100,
+         "status": "fresh", "latency": 1.0, "response_chars": 50},
+    ]
+
+    with patch("src.gemini_client.genai"):
+        report = replay(records, speed=50)
+
+    assert report["requests"] == 1 and report["prefetches"] == 1
+    assert report["backend_calls"] == 1
+    assert report["cache_hit_rate"] == 1.0
@@ -0,0 +1,67 @@
+"""
+Tests for the local topic scheduler and StudyPlanner.prioritize_topics
+"""
+
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.features.study_planner import StudyPlanner
+from src.scheduler import TopicInfo, schedule_topics, topological_order
+
+@pytest.fixture
+def topics():
+    return {
+        "Limits": TopicInfo("Limits", importance=6, hours=2),
+        "Derivatives": TopicInfo("Derivatives", importance=9, hours=3, prerequisites=["Limits"]),
+        "Integrals": TopicInfo("Integrals", importance=8, hours=4, prerequisites=["Derivatives"]),
+        "History of calculus": TopicInfo("History of calculus", importance=2, hours=1),
+    }
+
+def test_topological_order_puts_prerequisites_first(topics):
+    order = topological_order(topics)
+    
+    assert order.index("Limits") < order.index("Derivatives") < order.index("Integrals")
+
+def test_topological_order_breaks_cycles(topics):
+    topics["Limits"].prerequisites = ["Integrals"]
+    
+    assert sorted(topological_order(topics)) == sorted(topics)
+
+def test_schedule_respects_time_and_prerequisites(topics):
+    schedule = schedule_topics(topics, time_available=6)
+    
+    # Integrals alone would be worth more than Limits, but needs its prerequisites
+    assert schedule.order == ["Limits", "Derivatives", "History of calculus"]
+    assert sum(schedule.allocation.values()) == 6
+    assert schedule.skipped == ["Integrals"]
+    assert schedule.ranking[0] == "Derivatives"
+
+def test_schedule_spreads_leftover_time(topics):
+    schedule = schedule_topics(topics, time_available=20)
+    
+    assert schedule.skipped == []
+    assert sum(schedule.allocation.values()) == 20
+
+def test_prioritize_topics_reuses_cached_analysis(tmp_path):
+    client = MagicMock()
+    client.generate_json.return_value = {"topics": [
+        {"name": "Limits", "importance": 6, "hours": 2, "prerequisites": [], "reason": "Basis"},
+        {"name": "Derivatives", "importance": 9, "hours": 3,
+         "prerequisites": ["limits"], "reason": "Core"},
+    ]}
+    cache_path = str(tmp_path / "deps.json")
+    
+    result = StudyPlanner(client, cache_path).prioritize_topics(
+        "Calculus", ["Limits", "Derivatives"], 5, "exam")
+    assert "| 1 | Limits | 2 |" in result
+    
+    # A fresh planner with fewer topics and different hours makes no API call
+    client.generate_json.reset_mock()
+    result = StudyPlanner(client, cache_path).prioritize_topics("calculus", ["Derivatives"], 8, "exam")
+    client.generate_json.assert_not_called()
+    assert "| 1 | Derivatives | 8 |" in result
@@ -0,0 +1,51 @@
+"""
+Tests for persistent, resumable interactive sessions
+"""
+
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.session_log import SessionLog, to_history
+
+def test_load_returns_latest_snapshot_and_later_turns(tmp_path):
+    log = SessionLog.for_session(str(tmp_path), "bio 101", snapshot_every=2)
+    log.append_turn("q1", "a1")
+    log.append_turn("q2", "a2")
+    assert log.snapshot_due()
+    log.write_snapshot("Talked about cells")
+    log.append_turn("q3", "a3")
+    
+    summary, turns = SessionLog.for_session(str(tmp_path), "bio 101").load()
+    
+    assert summary == "Talked about cells"
+    assert turns == [{"user": "q3", "model": "a3"}]
+
+def test_load_skips_truncated_last_line(tmp_path):
+    log = SessionLog(str(tmp_path / "s.jsonl"))
+    log.append_turn("q1", "a1")
+    with open(log.path, "a") as f:
+        f.write('{"type": "turn", "user": "q2"')
+    
+    assert log.load() == (None, [{"user": "q1", "model": "a1"}])
+
+def test_append_after_a_crash_starts_a_new_line(tmp_path):
+    path = str(tmp_path / "s.jsonl")
+    SessionLog(path).append_turn("q1", "a1")
+    with open(path, "a") as f:
+        f.write('{"type": "turn", "user": "q2"')
+    
+    SessionLog(path).append_turn("q3", "a3")
+    
+    assert SessionLog(path).load() == (None, [{"user": "q1", "model": "a1"},
+                                              {"user": "q3", "model": "a3"}])
+
+def test_to_history_puts_the_summary_before_the_turns():
+    history = to_history("Talked about cells", [{"user": "q3", "model": "a3"}])
+    
+    assert [entry["role"] for entry in history] == ["user", "model", "user", "model"]
+    assert "Talked about cells" in history[0]["parts"][0]
+    assert history[2:] == [{"role": "user", "parts": ["q3"]}, {"role": "model", "parts": ["a3"]}]
+    assert to_history(None, []) == []
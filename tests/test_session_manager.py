@@ -0,0 +1,132 @@
+"""
+Tests for the multi-tenant SessionManager
+"""
+
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+import time
+import zlib
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.session_manager import SessionManager
+
+@pytest.fixture
+def assistant():
+    assistant = MagicMock()
+    
+    def chat(message, history):
+        reply = f"reply {len(history) // 2 + 1} to {message}"
+        history.append({"role": "user", "parts": [message]})
+        history.append({"role": "model", "parts": [reply]})
+        return reply
+    
+    assistant.chat.side_effect = chat
+    return assistant
+
+def test_sessions_have_independent_histories(assistant):
+    manager = SessionManager(assistant, {})
+    
+    manager.chat("alice", "hi")
+    manager.chat("bob", "hello")
+    assert manager.chat("alice", "again") == "reply 2 to again"
+    
+    assert [entry["parts"][0] for entry in manager.history("bob")] == ["hello", "reply 1 to hello"]
+
+def test_least_recently_used_sessions_spill_and_restore(assistant, tmp_path):
+    manager = SessionManager(assistant, {"max_sessions": 2, "session_spill_dir": str(tmp_path)})
+    
+    for session_id in ["a", "b", "c"]:
+        manager.chat(session_id, "hi")
+    assert manager.stats()["resident"] == 2
+    assert manager.stats()["spilled"] == 1
+    
+    assert manager.chat("a", "back") == "reply 2 to back"
+    assert manager.stats()["restored"] == 1
+
+def test_memory_budget_spills_oldest(assistant, tmp_path):
+    manager = SessionManager(assistant, {"session_memory_budget": 500,
+                                         "session_spill_dir": str(tmp_path)})
+    
+    for session_id in ["a", "b", "c", "d"]:
+        manager.chat(session_id, "x" * 100)
+    
+    assert manager.stats()["memory"] <= 500
+    assert len(manager.history("a")) == 2
+
+def test_idle_sessions_expire(assistant):
+    manager = SessionManager(assistant, {"session_ttl": -1})
+    
+    manager.chat("a", "hi")
+    manager.chat("b", "hi")
+    
+    assert manager.stats()["expired"] >= 1
+    assert manager.history("a") == []
+
+def test_failed_chats_leave_no_turns(assistant):
+    assistant.chat.side_effect = lambda message, history: "Error in chat: timeout"
+    manager = SessionManager(assistant, {})
+    
+    manager.chat("a", "hi")
+    
+    assert manager.history("a") == []
+
+def test_stored_turns_keep_the_raw_message(assistant):
+    def chat(message, history):
+        history.append({"role": "user", "parts": [f"You are a study assistant.\n\nUser: {message}"]})
+        history.append({"role": "model", "parts": ["reply"]})
+        return "reply"
+    assistant.chat.side_effect = chat
+    manager = SessionManager(assistant, {})
+    
+    manager.chat("a", "hi")
+    
+    assert [entry["parts"][0] for entry in manager.history("a")] == ["hi", "reply"]
+
+def test_active_session_does_not_block_expiry_behind_it(assistant):
+    manager = SessionManager(assistant, {"session_ttl": 100})
+    busy = manager._acquire("busy")
+    manager.chat("idle", "hi")
+    busy.last_used = manager._sessions["idle"].last_used = 0
+    
+    manager.chat("new", "hi")
+    
+    assert "idle" not in manager._sessions and "busy" in manager._sessions
+    assert manager.stats()["expired"] == 1
+    manager._release(busy)
+
+def test_spill_io_happens_outside_the_manager_lock(assistant, tmp_path, monkeypatch):
+    manager = SessionManager(assistant, {"max_sessions": 1, "session_spill_dir": str(tmp_path)})
+    held = []
+    
+    def watch(function):
+        def wrapper(data):
+            held.append(manager._lock.locked())
+            return function(data)
+        return wrapper
+    
+    monkeypatch.setattr(zlib, "compress", watch(zlib.compress))
+    monkeypatch.setattr(zlib, "decompress", watch(zlib.decompress))
+    
+    manager.chat("a", "hi")
+    manager.chat("b", "hi")
+    assert manager.chat("a", "back") == "reply 2 to back"
+    
+    assert len(held) >= 3 and not any(held)
+
+def test_old_spill_files_are_swept(assistant, tmp_path):
+    manager = SessionManager(assistant, {"max_sessions": 1, "session_ttl": 3600,
+                                         "session_spill_dir": str(tmp_path)})
+    manager.chat("a", "hi")
+    manager.chat("b", "hi")
+    (path,) = tmp_path.glob("*.session")
+    os.utime(path, (time.time() - 7200, time.time() - 7200))
+    
+    manager._swept = 0.0
+    manager.chat("c", "hi")
+    
+    assert not path.exists()
+    assert manager.stats()["expired"] == 1
@@ -0,0 +1,79 @@
+"""
+Tests for the offline study tips catalog
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.assistant import SmartStudyAssistant
+from src.features.study_tips import StudyTips
+from src.tips_catalog import (TipsCatalog, build_tips_catalog, COMMON_CHALLENGES,
+                              DEFAULT_CATALOG_PATH, LEARNING_STYLES)
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    return str(tmp_path / "tips.json.gz")
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.config = {"model": "gemini-test", "max_concurrency": 4}
+    client.generate_text.side_effect = lambda prompt: f"Tips #{len(prompt)}"
+    return client
+
+def test_build_and_serve_offline(client, catalog_path):
+    result = build_tips_catalog(client, catalog_path, extra_prompts=["General prompt"])
+    
+    assert result["entries"] == 1 + len(LEARNING_STYLES) + len(COMMON_CHALLENGES) + 1
+    assert result["failed"] == 0
+    
+    offline = MagicMock()
+    tips = StudyTips(offline, TipsCatalog(catalog_path))
+    assert tips.get_general_tips().startswith("Tips #")
+    assert tips.get_tips_for_learning_style("visual").startswith("Tips #")
+    assert tips.overcome_challenge("Test  Anxiety").startswith("Tips #")
+    assert TipsCatalog(catalog_path).get("general   PROMPT") is not None
+    offline.generate_text.assert_not_called()
+
+def test_unknown_prompts_fall_back_to_api(client, catalog_path):
+    client.generate_text.side_effect = None
+    client.generate_text.return_value = "Error generating response: offline"
+    result = build_tips_catalog(client, catalog_path)
+    assert result["entries"] == 0
+    
+    client.generate_text.return_value = "Fresh tips"
+    tips = StudyTips(client, TipsCatalog(catalog_path))
+    assert tips.overcome_challenge("imposter syndrome") == "Fresh tips"
+
+def test_missing_catalog_is_empty(tmp_path):
+    assert len(TipsCatalog(str(tmp_path / "missing.json.gz"))) == 0
+
+def test_shipped_catalog_answers_fixed_endpoints_offline(tmp_path):
+    config = {"api_key": "fake_api_key", "model": "gemini-pro", "max_tokens": 2048,
+              "temperature": 0.7, "tips_catalog_path": str(tmp_path / "tips.json.gz")}
+    client = MagicMock()
+    with patch("src.assistant.GeminiClient", return_value=client):
+        assistant = SmartStudyAssistant(config)
+    
+    assert assistant.get_study_tips().startswith("# ")
+    assert "Visual" in assistant.get_tips_for_learning_style("visual")
+    assert "Procrastination" in assistant.overcome_challenge("Procrastination")
+    client.generate_text.assert_not_called()
+
+def test_refresh_writes_to_the_data_directory(tmp_path, client):
+    config = {"api_key": "fake_api_key", "model": "gemini-pro", "max_tokens": 2048,
+              "temperature": 0.7, "tips_catalog_path": str(tmp_path / "tips.json.gz")}
+    shipped = os.path.getmtime(DEFAULT_CATALOG_PATH)
+    with patch("src.assistant.GeminiClient", return_value=client):
+        assistant = SmartStudyAssistant(config)
+    
+    assistant.refresh_tips_catalog()
+    
+    assert os.path.exists(config["tips_catalog_path"])
+    assert os.path.getmtime(DEFAULT_CATALOG_PATH) == shipped
+    assert assistant.overcome_challenge("burnout").startswith("Tips #")